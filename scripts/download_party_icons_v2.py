@@ -1,13 +1,15 @@
+import argparse
+import json
 import requests
-import pandas as pd
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import time
-import warnings
-import csv
 
-# Suppress SSL warnings
-warnings.filterwarnings('ignore', message='Unverified HTTPS request')
+from icon_store import IconStore
+from jne_client import RETRY_STATUS, TokenBucket, get_with_retries, make_session, request_with_retries
+from jne_trace import NULL_TRACER, Tracer
 
 # IDs oficiales de símbolos de partidos desde votoinformado.jne.gob.pe
 # Actualizados: 14 de enero de 2026
@@ -40,89 +42,253 @@ nombres_simplificados = {
     "PARTIDO MORADO": "morado",
 }
 
+SIMBOLO_URL = "https://sroppublico.jne.gob.pe/Consulta/Simbolo/GetSimbolo/{}"
+TAMANO_MINIMO = 100  # bytes; por debajo de esto el JNE devuelve un placeholder vacío
+
 def crear_directorio():
     """Crea el directorio para guardar los iconos"""
     output_dir = Path("iconos_partidos")
     output_dir.mkdir(exist_ok=True)
     return output_dir
 
-def descargar_icono(id_simbolo, nombre_partido, output_dir):
-    """Descarga el icono del partido desde el JNE"""
-    url = f"https://sroppublico.jne.gob.pe/Consulta/Simbolo/GetSimbolo/{id_simbolo}"
-    
-    try:
-        print(f"Descargando: {nombre_partido} (ID: {id_simbolo})...")
-        response = requests.get(url, verify=False, timeout=15)
-        
-        if response.status_code == 200 and len(response.content) > 100:
-            # Determinar la extensión del archivo
-            content_type = response.headers.get('Content-Type', '').lower()
-            
-            if 'image/png' in content_type or response.content[:4] == b'\x89PNG':
-                extension = 'png'
-            elif 'image/jpeg' in content_type or response.content[:2] == b'\xff\xd8':
-                extension = 'jpg'
-            elif 'image/gif' in content_type or response.content[:4] == b'GIF8':
-                extension = 'gif'
-            elif 'image/svg' in content_type or b'<svg' in response.content[:100]:
-                extension = 'svg'
+def abrir_almacen(output_dir):
+    """Almacén de iconos direccionado por contenido dentro de ``output_dir``"""
+    return IconStore(Path(output_dir) / '.store')
+
+
+def descargar_icono(id_simbolo, nombre_partido, output_dir, store=None, session=None, limiter=None,
+                    tracer=NULL_TRACER):
+    """Descarga el icono del partido desde el JNE
+
+    El contenido se guarda en el almacén (``store``); el archivo del partido
+    solo se reescribe si sus bytes cambiaron, y una descarga idéntica a la
+    anterior (o un 304) no toca el disco. Con un ``tracer`` cada descarga
+    queda como un span ('simbolo'), y la descarga y el almacenamiento como las
+    etapas 'fetch' e 'images'.
+    """
+    url = SIMBOLO_URL.format(id_simbolo)
+    nombre = nombres_simplificados.get(nombre_partido, nombre_partido.lower().replace(' ', '_'))
+    store = store or abrir_almacen(output_dir)
+    session = session or make_session(1)
+
+    with tracer.span('simbolo', id=id_simbolo, partido=nombre) as span:
+        try:
+            print(f"Descargando: {nombre_partido} (ID: {id_simbolo})...")
+            headers = store.conditional_headers(nombre) if store.resolve(nombre) else {}
+            with tracer.stage('fetch'):
+                response = get_with_retries(session, url, limiter=limiter, timeout=15, headers=headers,
+                                            span=span)
+            span.response(response)
+
+            if response.status_code == 304:
+                span['cache'] = 'revalidated'
+                with tracer.stage('images'):
+                    filepath = store.export(nombre, output_dir)
+                print(f"  = Sin cambios: {filepath.name}")
+                return True, filepath.suffix[1:]
+
+            if response.status_code == 200 and len(response.content) > TAMANO_MINIMO:
+                with tracer.stage('images'):
+                    resultado = store.put(nombre, response.content, response.headers)
+                    filepath = store.export(nombre, output_dir)
+                span['cache'] = 'hit' if resultado.status == 'unchanged' else 'miss'
+                span['store'] = resultado.status
+
+                size_kb = len(response.content) / 1024
+                if resultado.status == 'unchanged':
+                    print(f"  = Sin cambios: {filepath.name}")
+                elif resultado.canonical:
+                    print(f"  ≈ Igual a {', '.join(store.aliases(resultado.sha))}: {filepath.name}")
+                else:
+                    print(f"  ✓ Guardado: {filepath.name} ({size_kb:.1f} KB)")
+                return True, filepath.suffix[1:]
             else:
-                extension = 'png'
-            
-            # Usar nombre simplificado
-            nombre_archivo = f"{nombres_simplificados.get(nombre_partido, nombre_partido.lower().replace(' ', '_'))}.{extension}"
-            filepath = output_dir / nombre_archivo
-            
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
-            
-            size_kb = len(response.content) / 1024
-            print(f"  ✓ Guardado: {nombre_archivo} ({size_kb:.1f} KB)")
-            return True, extension
-        else:
-            print(f"  ✗ Error {response.status_code} o contenido vacío")
+                span['error'] = 'Placeholder' if response.status_code == 200 else f"HTTP{response.status_code}"
+                print(f"  ✗ Error {response.status_code} o contenido vacío")
+                return False, None
+
+        except Exception as e:
+            span.fail(e)
+            print(f"  ✗ Error: {str(e)}")
             return False, None
-            
-    except Exception as e:
-        print(f"  ✗ Error: {str(e)}")
-        return False, None
 
-def buscar_ids_automaticamente(start_id=2800, end_id=3100, output_dir=None):
+
+class RegistroSondeo:
+    """Registro persistente de IDs ya probados y su resultado (JSON)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        try:
+            self.ids = {int(k): v for k, v in json.loads(self.path.read_text(encoding='utf-8')).items()}
+        except (FileNotFoundError, ValueError):
+            self.ids = {}
+
+    def conocido(self, id_simbolo):
+        return id_simbolo in self.ids
+
+    def existe(self, id_simbolo):
+        return self.ids.get(id_simbolo, {}).get('existe', False)
+
+    def anotar(self, id_simbolo, existe, status, tamano):
+        with self.lock:
+            self.ids[id_simbolo] = {'existe': existe, 'status': status, 'tamano': tamano, 'fecha': int(time.time())}
+
+    def guardar(self):
+        with self.lock:
+            data = json.dumps({str(k): v for k, v in sorted(self.ids.items())}, indent=1)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(data, encoding='utf-8')
+        os.replace(tmp, self.path)
+
+
+class Sondeador:
+    """Comprueba si existe un símbolo sin descargar la imagen completa.
+
+    Usa HEAD si el servidor lo soporta y, si no, un GET con Range de los
+    primeros bytes. El modo se decide una sola vez con decidir_modo(), antes
+    de repartir IDs entre hilos, y se reutiliza. Una respuesta HEAD sin
+    tamaño se confirma con el GET parcial.
+    """
+
+    def __init__(self, session, limiter, timeout=5):
+        self.session = session
+        self.limiter = limiter
+        self.timeout = timeout
+        self.usar_head = None
+
+    def _tamano(self, response):
+        rango = response.headers.get('Content-Range', '')
+        if '/' in rango and rango.rsplit('/', 1)[1].isdigit():
+            return int(rango.rsplit('/', 1)[1])
+        largo = response.headers.get('Content-Length')
+        return int(largo) if largo and largo.isdigit() else None
+
+    def _head(self, url):
+        response = request_with_retries(self.session, 'HEAD', url, limiter=self.limiter, retries=2,
+                                        timeout=self.timeout, allow_redirects=True)
+        return response.status_code, self._tamano(response)
+
+    def _get_parcial(self, url):
+        response = get_with_retries(self.session, url, limiter=self.limiter, retries=2, timeout=self.timeout,
+                                    headers={'Range': f'bytes=0-{TAMANO_MINIMO}'}, stream=True)
+        try:
+            tamano = self._tamano(response)
+            if tamano is None:
+                # Sin Content-Range ni Content-Length: leer solo lo necesario para decidir
+                tamano = len(response.raw.read(TAMANO_MINIMO + 1, decode_content=True))
+        finally:
+            response.close()
+        return response.status_code, tamano
+
+    def decidir_modo(self, id_simbolo):
+        """Prueba HEAD con un ID; HEAD es útil solo si responde bien e informa el tamaño."""
+        try:
+            status, tamano = self._head(SIMBOLO_URL.format(id_simbolo))
+            self.usar_head = status not in (405, 501) and tamano is not None
+        except requests.exceptions.RequestException:
+            self.usar_head = False
+        return self.usar_head
+
+    def probar(self, id_simbolo):
+        """Devuelve (existe, status, tamano) para un ID."""
+        url = SIMBOLO_URL.format(id_simbolo)
+        if self.usar_head is None:
+            self.decidir_modo(id_simbolo)
+        if self.usar_head:
+            status, tamano = self._head(url)
+            if status != 200 or tamano is not None:
+                return status == 200 and tamano > TAMANO_MINIMO, status, tamano
+            # 200 sin Content-Length: el tamaño se mide con el GET parcial
+        status, tamano = self._get_parcial(url)
+        return status in (200, 206) and (tamano or 0) > TAMANO_MINIMO, status, tamano
+
+
+def buscar_ids_automaticamente(start_id=2800, end_id=3100, output_dir=None, workers=8, rate=5.0,
+                               margen=20, guardar=True, registro_path=None):
     """
     Función auxiliar para buscar IDs de símbolos probando rangos
     USAR SOLO SI NECESITAS ENCONTRAR IDs FALTANTES
+
+    Prueba los IDs en paralelo (``workers``) sin pasar de ``rate`` peticiones
+    por segundo. Los IDs ya probados se leen del registro y no se vuelven a
+    pedir. Si hay aciertos a menos de ``margen`` IDs de un borde, el rango se
+    amplía ``margen`` IDs más en esa dirección hasta que deje de haberlos.
     """
     if output_dir is None:
         output_dir = crear_directorio()
-    
+
+    registro = RegistroSondeo(registro_path or output_dir / '.sondeo_ids.json')
+    session = make_session(workers)
+    limiter = TokenBucket(rate)
+    sondeador = Sondeador(session, limiter)
+
     print(f"\n🔍 Buscando símbolos en rango {start_id}-{end_id}...")
-    print("(Esto puede tardar varios minutos)\n")
-    
-    encontrados = []
-    for id_test in range(start_id, end_id + 1):
-        url = f"https://sroppublico.jne.gob.pe/Consulta/Simbolo/GetSimbolo/{id_test}"
+    print(f"({workers} en paralelo, máx. {rate} peticiones/s, {len(registro.ids)} IDs ya en el registro)\n")
+
+    def probar(id_test):
         try:
-            response = requests.get(url, verify=False, timeout=5)
-            if response.status_code == 200 and len(response.content) > 100:
-                print(f"✓ Encontrado ID {id_test} ({len(response.content)} bytes)")
-                encontrados.append(id_test)
-                
-                # Guardar para inspección
-                filepath = output_dir / f"simbolo_{id_test}.png"
-                with open(filepath, 'wb') as f:
-                    f.write(response.content)
-        except:
-            pass
-        
-        if id_test % 10 == 0:
-            print(f"  ... probado hasta {id_test}")
-        
-        time.sleep(0.2)
-    
-    print(f"\n✓ Encontrados {len(encontrados)} símbolos: {encontrados}")
+            existe, status, tamano = sondeador.probar(id_test)
+        except requests.exceptions.RequestException as e:
+            print(f"  ✗ ID {id_test}: {e}")
+            return
+        if status in RETRY_STATUS:
+            # Error transitorio: no se anota para reintentarlo en la próxima corrida
+            print(f"  ✗ ID {id_test}: error {status}")
+            return
+        registro.anotar(id_test, existe, status, tamano)
+        if existe:
+            print(f"✓ Encontrado ID {id_test} ({tamano} bytes)")
+
+    bajo, alto = start_id, end_id
+    pendientes = range(bajo, alto + 1)
+    # Una vez, antes del pool: si no, el modo dependería del hilo que responda primero
+    sondeador.decidir_modo(start_id)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            nuevos = [i for i in pendientes if not registro.conocido(i)]
+            list(pool.map(probar, nuevos))
+            registro.guardar()
+
+            # Expansión adaptativa alrededor de aciertos cerca de los bordes
+            extender = []
+            if any(registro.existe(i) for i in range(max(0, bajo), bajo + margen)) and bajo > 0:
+                extender.extend(range(max(0, bajo - margen), bajo))
+                bajo = max(0, bajo - margen)
+            if any(registro.existe(i) for i in range(alto - margen + 1, alto + 1)):
+                extender.extend(range(alto + 1, alto + margen + 1))
+                alto += margen
+            if not extender:
+                break
+            print(f"  ... ampliando búsqueda a {bajo}-{alto}")
+            pendientes = extender
+
+    encontrados = sorted(i for i in range(bajo, alto + 1) if registro.existe(i))
+
+    if guardar:
+        # Guardar para inspección: un archivo por símbolo distinto; los IDs que
+        # sirven el mismo símbolo (o uno casi idéntico) se agrupan en el almacén
+        store = abrir_almacen(output_dir)
+        for id_test in encontrados:
+            nombre = f"simbolo_{id_test}"
+            if store.resolve(nombre):
+                continue
+            response = get_with_retries(session, SIMBOLO_URL.format(id_test), limiter=limiter, timeout=15)
+            if response.status_code == 200 and len(response.content) > TAMANO_MINIMO:
+                resultado = store.put(nombre, response.content, response.headers)
+                if resultado.status == 'new':
+                    store.export(nombre, output_dir)
+        store.save()
+
+        for sha in sorted({store.resolve(f"simbolo_{i}") for i in encontrados} - {None}):
+            ids = [n for n in store.aliases(sha) if n.startswith('simbolo_')]
+            if len(ids) > 1:
+                print(f"  ≈ Mismo símbolo: {', '.join(ids)}")
+
+    print(f"\n✓ Encontrados {len(encontrados)} símbolos en {bajo}-{alto}: {encontrados}")
     return encontrados
 
-def main():
+def main(tracer=NULL_TRACER):
     """Función principal"""
     print("=" * 70)
     print(" DESCARGA DE ICONOS DE PARTIDOS POLÍTICOS - ELECCIONES PERÚ 2026")
@@ -130,6 +296,9 @@ def main():
     print()
     
     output_dir = crear_directorio()
+    store = abrir_almacen(output_dir)
+    session = tracer.instrument(make_session(1))
+    limiter = TokenBucket(2.0, burst=1)
     
     # Estadísticas
     exitosos = 0
@@ -142,13 +311,14 @@ def main():
             sin_id += 1
             continue
         
-        exito, ext = descargar_icono(id_simbolo, partido, output_dir)
+        exito, ext = descargar_icono(id_simbolo, partido, output_dir, store, session, limiter, tracer)
         if exito:
             exitosos += 1
         else:
             fallidos += 1
-        
-        time.sleep(0.5)
+    
+    store.save()
+    tracer.close()
     
     print()
     print("=" * 70)
@@ -165,12 +335,25 @@ def main():
         print("  Para encontrar IDs faltantes, puedes:")
         print("  1. Visitar: https://plataformaelectoral.jne.gob.pe/")
         print("  2. Buscar el partido y encontrar su símbolo")
-        print("  3. O descomentar la línea al final para búsqueda automática")
+        print("  3. O usar la búsqueda automática: --buscar INICIO FIN")
         print()
 
 if __name__ == "__main__":
-    main()
-    
-    # DESCOMENTAR LA SIGUIENTE LÍNEA SOLO SI NECESITAS BUSCAR IDs AUTOMÁTICAMENTE
-    # ADVERTENCIA: Esto hará muchas peticiones al servidor del JNE
-    # buscar_ids_automaticamente(start_id=2880, end_id=2960)
+    parser = argparse.ArgumentParser(description="Descarga los iconos de partidos desde el JNE.")
+    parser.add_argument('--buscar', nargs=2, type=int, metavar=('INICIO', 'FIN'),
+                        help="Buscar IDs de símbolos en un rango en lugar de descargar los iconos")
+    parser.add_argument('--workers', type=int, default=8, help="Sondeos en paralelo (default: %(default)s)")
+    parser.add_argument('--rate', type=float, default=5.0, help="Máx. peticiones por segundo (default: %(default)s)")
+    parser.add_argument('--trace', default=None,
+                        help="Agregar los spans de cada descarga y los tiempos por etapa a este archivo JSON-lines")
+    parser.add_argument('--metrics', default=None,
+                        help="Escribir un resumen en formato textfile de Prometheus en esta ruta")
+    args = parser.parse_args()
+
+    if args.buscar:
+        # ADVERTENCIA: Esto hace peticiones al servidor del JNE; los IDs ya probados
+        # quedan en iconos_partidos/.sondeo_ids.json y no se repiten
+        buscar_ids_automaticamente(start_id=args.buscar[0], end_id=args.buscar[1],
+                                   workers=args.workers, rate=args.rate)
+    else:
+        main(Tracer(args.trace, args.metrics, job='party_icons'))
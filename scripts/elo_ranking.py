@@ -0,0 +1,354 @@
+"""Offline Elo / Bradley-Terry rankings from exported vote logs.
+
+/api/ranking/personal replays updateElo() (api/elo.ts) over every vote blob
+of a session on each request. This script does the same work once, in
+batches, over an export of the blob store:
+
+    <votes-dir>/sessions/<sessionId>/votes/<timestamp>-<suffix>.json
+
+(or the compacted log written by vote_compactor.py) and writes a static
+snapshot the CDN can serve:
+
+    <output-dir>/global.json              GlobalRatingSnapshot + ranked entries
+    <output-dir>/personal/<xx>.json       personal rankings, keyed and sharded
+                                          by sessionKey (see below)
+
+The snapshot is public, and a sessionId is all /api/game/vote needs to add
+votes to a session, so raw ids are never written. Personal rankings are keyed
+by sessionKey = sha256(salt + sessionId) as hex, sharded by its first two
+characters. The salt is random per snapshot (or --salt) and published as
+"sessionSalt" in global.json so a client can find its own entry.
+
+Personal ratings are sequential Elo with the semantics of
+calculatePersonalRanking() over getVotes(): the first MAX_VOTES_PER_USER
+blobs of a session by key, sorted by timestamp, K=32, initial 1200,
+only candidates from api/candidates-data.ts are rated (unknown ids play at
+1200 and are never stored). All sessions are replayed in lockstep as one
+NumPy array, one vote index at a time. The global snapshot carries both a
+sequential Elo over all votes in time order and a Bradley-Terry
+maximum-likelihood fit, which doesn't depend on vote order.
+
+Usage:
+    python elo_ranking.py exported-blobs/ --output-dir public/data/ranking
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import secrets
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+CANDIDATES_TS = ROOT / 'api' / 'candidates-data.ts'
+OUTPUT_DIR = ROOT / 'public' / 'data' / 'ranking'
+
+# Keep in sync with api/elo.ts
+ELO_K = 32
+INITIAL_ELO = 1200
+
+SHARD_LENGTH = 2
+MAX_VOTES_PER_USER = 1000  # api/storage.ts: getVotes() lists at most this many blobs
+
+
+# --- Inputs ---
+
+_CANDIDATE = re.compile(r"^  '([^']+)': \{(.*?)^  \},", re.M | re.S)
+_FIELD = re.compile(r"^\s+(\w+): '((?:[^'\\]|\\.)*)',", re.M)
+
+
+def load_candidates(path=CANDIDATES_TS):
+    """[{'id', 'nombre', 'ideologia'?}] in api/candidates-data.ts order."""
+    text = Path(path).read_text(encoding='utf-8')
+    candidates = []
+    for candidate_id, body in _CANDIDATE.findall(text):
+        fields = {key: value.replace("\\'", "'") for key, value in _FIELD.findall(body)}
+        entry = {'id': candidate_id, 'nombre': fields.get('nombre', candidate_id)}
+        if 'ideologia' in fields:
+            entry['ideologia'] = fields['ideologia']
+        candidates.append(entry)
+    return candidates
+
+
+def load_votes(votes_dir):
+    """{sessionId: [(timestamp, winnerId, loserId), ...]} sorted like BlobStorageAdapter.getVotes().
+
+    ``votes_dir`` is either an export of the blob store or a log written by
+    vote_compactor.py.
+    """
+    from vote_compactor import VoteLog
+
+    if VoteLog.exists(votes_dir):
+        # Blob keys start with the timestamp, so the log's order is the listing order
+        return {session_id: [(v['timestamp'], v['winnerId'], v['loserId']) for v in votes[:MAX_VOTES_PER_USER]]
+                for session_id, votes in VoteLog(votes_dir).sessions().items()}
+
+    sessions_dir = Path(votes_dir) / 'sessions'
+    if not sessions_dir.is_dir():
+        sessions_dir = Path(votes_dir)
+    sessions = {}
+    with os.scandir(sessions_dir) as entries:
+        for session in entries:
+            votes_path = os.path.join(session.path, 'votes')
+            if not session.is_dir() or not os.path.isdir(votes_path):
+                continue
+            votes = []
+            # Blob listing order (by key) is the tie-break of the stable timestamp sort
+            # and, like list({limit}), only the first MAX_VOTES_PER_USER blobs count
+            for name in sorted(os.listdir(votes_path))[:MAX_VOTES_PER_USER]:
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(votes_path, name), encoding='utf-8') as f:
+                        vote = json.load(f)
+                    votes.append((vote['timestamp'], vote['winnerId'], vote['loserId']))
+                except (ValueError, KeyError, TypeError):
+                    continue  # getVotes() drops votes it cannot fetch or parse
+            votes.sort(key=lambda v: v[0])
+            if votes:
+                sessions[session.name] = votes
+    return sessions
+
+
+# --- Elo ---
+
+def expected(rating_a, rating_b):
+    """calculateExpected() from api/elo.ts, element-wise."""
+    return 1 / (1 + np.power(10.0, (rating_b - rating_a) / 400))
+
+
+def update_elo(rating_a, rating_b, a_won):
+    """updateElo() from api/elo.ts, element-wise."""
+    score = np.asarray(a_won, dtype=np.float64)
+    new_a = rating_a + ELO_K * (score - expected(rating_a, rating_b))
+    new_b = rating_b + ELO_K * ((1 - score) - expected(rating_b, rating_a))
+    return new_a, new_b
+
+
+def encode_sessions(sessions, index):
+    """Pad every session's votes into (S, T) winner/loser index arrays.
+
+    Candidates not in ``index`` map to the extra column len(index), which is
+    reset to INITIAL_ELO after every step; padding also points there.
+    """
+    unknown = len(index)
+    lengths = np.fromiter((len(v) for v in sessions.values()), dtype=np.int64, count=len(sessions))
+    steps = int(lengths.max()) if len(lengths) else 0
+    winners = np.full((len(sessions), steps), unknown, dtype=np.int32)
+    losers = np.full((len(sessions), steps), unknown, dtype=np.int32)
+    for row, votes in enumerate(sessions.values()):
+        winners[row, :len(votes)] = [index.get(w, unknown) for _, w, _ in votes]
+        losers[row, :len(votes)] = [index.get(l, unknown) for _, _, l in votes]
+    return winners, losers, lengths
+
+
+def personal_elo(winners, losers, lengths, n_candidates):
+    """Replay every session at once; returns ratings, wins and losses of shape (S, C)."""
+    sessions = winners.shape[0]
+    ratings = np.full((sessions, n_candidates + 1), float(INITIAL_ELO))
+    wins = np.zeros((sessions, n_candidates + 1), dtype=np.int32)
+    losses = np.zeros_like(wins)
+    rows = np.arange(sessions)
+    for step in range(winners.shape[1]):
+        active = rows[lengths > step]
+        w, l = winners[active, step], losers[active, step]
+        new_a, new_b = update_elo(ratings[active, w], ratings[active, l], True)
+        # Same write order as processVoteHistory(): winner first, then loser
+        ratings[active, w] = new_a
+        ratings[active, l] = new_b
+        ratings[:, n_candidates] = INITIAL_ELO
+        np.add.at(wins, (active, w), 1)
+        np.add.at(losses, (active, l), 1)
+    return ratings[:, :n_candidates], wins[:, :n_candidates], losses[:, :n_candidates]
+
+
+def global_elo(sessions, index):
+    """Sequential Elo over all votes in timestamp order (scalar: each vote depends on the last).
+
+    Votes cast in the same millisecond are ordered by sessionId, then by
+    their order within the session, so the result doesn't depend on how the
+    export was listed.
+    """
+    votes = sorted((t, session_id, n, winner, loser)
+                   for session_id, session in sessions.items()
+                   for n, (t, winner, loser) in enumerate(session))
+    ratings = [float(INITIAL_ELO)] * len(index)
+    for _, _, _, winner, loser in votes:
+        w, l = index.get(winner), index.get(loser)
+        rating_a = INITIAL_ELO if w is None else ratings[w]
+        rating_b = INITIAL_ELO if l is None else ratings[l]
+        expected_a = 1 / (1 + math.pow(10, (rating_b - rating_a) / 400))
+        expected_b = 1 / (1 + math.pow(10, (rating_a - rating_b) / 400))
+        if w is not None:
+            ratings[w] = rating_a + ELO_K * (1 - expected_a)
+        if l is not None:
+            ratings[l] = rating_b + ELO_K * (0 - expected_b)
+    return np.array(ratings)
+
+
+# --- Bradley-Terry ---
+
+def bradley_terry(wins_matrix, prior=1.0, iterations=1000, tolerance=1e-10):
+    """MM fit (Hunter 2004) of strengths from a (C, C) matrix of wins[i, j] = i beat j.
+
+    ``prior`` adds that many virtual wins and losses against an average
+    opponent so candidates without wins (or losses) stay finite. Returns
+    ratings on the Elo scale, centred on INITIAL_ELO.
+    """
+    wins_matrix = np.asarray(wins_matrix, dtype=np.float64)
+    games = wins_matrix + wins_matrix.T
+    total_wins = wins_matrix.sum(axis=1) + prior
+    strength = np.ones(len(wins_matrix))
+    for _ in range(iterations):
+        denominator = (games / (strength[:, None] + strength[None, :])).sum(axis=1) + 2 * prior / (strength + 1)
+        updated = total_wins / denominator
+        updated /= np.exp(np.log(updated).mean())
+        if np.max(np.abs(updated - strength)) < tolerance:
+            strength = updated
+            break
+        strength = updated
+    return INITIAL_ELO + 400 * np.log10(strength)
+
+
+def pair_wins(winners, losers, n_candidates):
+    """(C, C) matrix of how often each known candidate beat each other one."""
+    w, l = winners.ravel(), losers.ravel()
+    known = (w < n_candidates) & (l < n_candidates) & (w != l)
+    matrix = np.zeros((n_candidates, n_candidates), dtype=np.int64)
+    np.add.at(matrix, (w[known], l[known]), 1)
+    return matrix
+
+
+# --- Output ---
+
+def ranking_entries(candidates, ratings, wins, losses):
+    """RankingEntry[] (api/types.ts) sorted like sortAndRankEntries()."""
+    entries = []
+    for i, candidate in enumerate(candidates):
+        rating = int(math.floor(ratings[i] + 0.5))  # Math.round
+        games = int(wins[i] + losses[i])
+        entry = {
+            'candidateId': candidate['id'],
+            'name': candidate['nombre'],
+            'rating': rating,
+            'score': rating,
+            'wins': int(wins[i]),
+            'losses': int(losses[i]),
+            'games': games,
+            'winRate': int(math.floor(wins[i] / games * 100 + 0.5)) if games else 0,
+            'rd': 0,
+        }
+        if 'ideologia' in candidate:
+            entry['ideologia'] = candidate['ideologia']
+        entries.append(entry)
+    # Array.prototype.sort is stable, so ties keep candidate order
+    entries.sort(key=lambda e: -e['rating'])
+    for rank, entry in enumerate(entries, 1):
+        entry['rank'] = rank
+    return entries
+
+
+def _write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def session_key(salt, session_id):
+    """Public key of a session's personal ranking; the sessionId itself is never published."""
+    return hashlib.sha256(f"{salt}{session_id}".encode('utf-8')).hexdigest()
+
+
+def write_snapshot(output_dir, candidates, session_ids, personal, global_ratings, bt_ratings, totals, salt=None):
+    """Write global.json and the personal/<shard>.json files; returns the paths written."""
+    output_dir = Path(output_dir)
+    salt = salt or secrets.token_hex(16)
+    updated_at = int(time.time() * 1000)
+    ratings, wins, losses = personal
+    total_wins, total_losses = totals
+
+    snapshot = {
+        'updatedAt': updated_at,
+        'ratings': {
+            c['id']: {'elo': round(float(global_ratings[i]), 2), 'bt': round(float(bt_ratings[i]), 2),
+                      'wins': int(total_wins[i]), 'losses': int(total_losses[i]),
+                      'matches': int(total_wins[i] + total_losses[i])}
+            for i, c in enumerate(candidates)
+        },
+        'ranking': ranking_entries(candidates, global_ratings, total_wins, total_losses),
+        'sessions': len(session_ids),
+        'sessionSalt': salt,
+    }
+    paths = [output_dir / 'global.json']
+    _write_json(paths[0], snapshot)
+
+    # Personal rankings: per session, [rating, wins, losses] per candidate in
+    # the order of "candidates"; the client ranks them like personal.ts does
+    shards = {}
+    rounded = np.floor(ratings + 0.5).astype(np.int32)
+    for row, session_id in enumerate(session_ids):
+        key = session_key(salt, session_id)
+        shard = shards.setdefault(key[:SHARD_LENGTH], {})
+        shard[key] = np.stack([rounded[row], wins[row], losses[row]], axis=1).tolist()
+    header = {'updatedAt': updated_at, 'sessionSalt': salt, 'candidates': [c['id'] for c in candidates]}
+    # Shards named after raw sessionIds by earlier snapshots must not stay published
+    for old in (output_dir / 'personal').glob('*.json'):
+        if old.stem not in shards:
+            old.unlink()
+    for name, sessions in sorted(shards.items()):
+        path = output_dir / 'personal' / f"{name}.json"
+        _write_json(path, {**header, 'sessions': sessions})
+        paths.append(path)
+    return paths
+
+
+def compute(votes_dir, candidates):
+    """Load an export and compute every rating; returns a dict of arrays."""
+    sessions = load_votes(votes_dir)
+    index = {c['id']: i for i, c in enumerate(candidates)}
+    winners, losers, lengths = encode_sessions(sessions, index)
+    personal = personal_elo(winners, losers, lengths, len(index))
+    return {
+        'session_ids': list(sessions),
+        'personal': personal,
+        'global': global_elo(sessions, index),
+        'bt': bradley_terry(pair_wins(winners, losers, len(index))),
+        'totals': (personal[1].sum(axis=0), personal[2].sum(axis=0)),
+        'votes': int(lengths.sum()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute Elo / Bradley-Terry rankings from exported vote blobs.")
+    parser.add_argument('votes_dir', help="Export of the blob store (sessions/<id>/votes/*.json) "
+                                          "or a vote_compactor.py log")
+    parser.add_argument('--output-dir', default=str(OUTPUT_DIR), help="Snapshot directory (default: %(default)s)")
+    parser.add_argument('--candidates', default=str(CANDIDATES_TS), help="Candidate list (default: %(default)s)")
+    parser.add_argument('--salt', default=None,
+                        help="Salt of the published session keys (default: random for every snapshot)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    candidates = load_candidates(args.candidates)
+    result = compute(args.votes_dir, candidates)
+    paths = write_snapshot(args.output_dir, candidates, result['session_ids'], result['personal'],
+                           result['global'], result['bt'], result['totals'], args.salt)
+
+    print(f"[OK] {result['votes']} votes from {len(result['session_ids'])} sessions, {len(candidates)} candidates")
+    print(f"[OK] Wrote {paths[0]} and {len(paths) - 1} personal shards")
+    print(f"[OK] Done in {time.perf_counter() - start:.2f}s")
+    print("\nTop 5 (Elo / Bradley-Terry):")
+    order = np.argsort(-result['global'])[:5]
+    for i in order:
+        print(f"  {candidates[i]['nombre']}: {result['global'][i]:.0f} / {result['bt'][i]:.0f}")
+    return paths
+
+
+if __name__ == "__main__":
+    main()
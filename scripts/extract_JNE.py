@@ -1,12 +1,17 @@
+import argparse
 import requests
-import pandas as pd
 import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import time
-import warnings
 
-# Suppress SSL warnings
-warnings.filterwarnings('ignore', message='Unverified HTTPS request')
+from jne_cache import DEFAULT_CACHE_DIR, DEFAULT_TTL, ResponseCache
+from jne_client import DEFAULT_RATE, DEFAULT_WORKERS, TokenBucket, get_with_retries, make_session
+from jne_discovery import load_candidates
+from jne_fields import extract_hoja_vida
+from jne_sinks import COLUMN_ORDER, DEFAULT_FORMATS, FORMATS, SinkWriter, open_sinks
+from jne_snapshots import DEFAULT_SNAPSHOT_DIR, SnapshotStore
+from jne_trace import NULL_TRACER, Tracer
 
 # Define the candidates data
 candidates_data = [
@@ -45,232 +50,205 @@ candidates_data = [
     {"partido": "PARTIDO MORADO", "persona": "Marisol Liñan", "candidatura": "2do Vicepresidente", "api": "https://apiplataformaelectoral8.jne.gob.pe/api/v1/candidato/hoja-vida?idHojaVida=252097"},
 ]
 
-def fetch_candidate_data(url):
-    """Fetch data from the API endpoint."""
-    try:
-        response = requests.get(url, verify=False,  timeout=10)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching {url}: {e}")
-        return None
+def hoja_vida_id(url):
+    """idHojaVida from a hoja-vida API URL."""
+    return url.split('=')[-1]
+
+def fetch_candidate_data(url, session=None, limiter=None, cache=None, offline=False, tracer=NULL_TRACER):
+    """Fetch data from the API endpoint, going through the response cache if given."""
+    key = hoja_vida_id(url)
+    with tracer.span('hoja_vida', id=key) as span:
+        entry = cache.get(key) if cache else None
+        if entry and (offline or cache.is_fresh(entry)):
+            data = cache.load(key)
+            if data is not None:
+                span['cache'] = 'hit'
+                return data
+        if offline:
+            print(f"Not cached (offline): {url}")
+            span['cache'] = 'miss'
+            span['error'] = 'NotCached'
+            return None
+
+        headers = cache.conditional_headers(entry) if cache else {}
+        try:
+            response = get_with_retries(session or make_session(1), url, limiter=limiter,
+                                        timeout=10, headers=headers, span=span)
+            span.response(response)
+            if response.status_code == 304 and entry:
+                span['cache'] = 'revalidated'
+                cache.touch(key)
+                return cache.load(key)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error fetching {url}: {e}")
+            span.fail(e)
+            # A stale copy beats no data when the JNE is slow or down
+            if entry:
+                span['cache'] = 'stale'
+                return cache.load(key)
+            return None
+
+        if cache:
+            span['cache'] = 'miss'
+            cache.store(key, response.content, response.headers, url)
+        return data
 
 def extract_relevant_fields(api_data):
-    """Extract relevant fields from the API response."""
+    """Extract relevant fields from the API response (columns defined in jne_fields.HOJA_VIDA_FIELDS)."""
     if not api_data:
         return {}
-    
-    extracted = {}
-    
-    # Extract basic information from datoGeneral
-    dato_general = api_data.get('datoGeneral', {})
-    if dato_general:
-        extracted['nombres'] = dato_general.get('nombres', '')
-        extracted['apellido_paterno'] = dato_general.get('apellidoPaterno', '')
-        extracted['apellido_materno'] = dato_general.get('apellidoMaterno', '')
-        extracted['dni'] = dato_general.get('numeroDocumento', '')
-        sexo_code = dato_general.get('sexo', '')
-        extracted['sexo'] = 'FEMENINO' if sexo_code == '2' else 'MASCULINO' if sexo_code == '1' else ''
-        extracted['fecha_nacimiento'] = dato_general.get('feNacimiento', '')
-        extracted['lugar_nacimiento'] = f"{dato_general.get('naciDistrito', '')} - {dato_general.get('naciProvincia', '')} - {dato_general.get('naciDepartamento', '')}"
-        extracted['domicilio'] = f"{dato_general.get('domiDistrito', '')} - {dato_general.get('domiProvincia', '')} - {dato_general.get('domiDepartamento', '')}"
-        extracted['estado_candidatura'] = dato_general.get('estado', '')
-    
-    # Extract education - Universidad
-    educacion_universitaria = api_data.get('formacionAcademica', {}).get('educacionUniversitaria', [])
-    if educacion_universitaria:
-        edu_uni = []
-        for edu in educacion_universitaria:
-            universidad = edu.get('universidad', '')
-            carrera = edu.get('carreraUni', '')
-            concluido = 'Concluido' if edu.get('concluidoEduUni') == 'SI' else 'En curso'
-            edu_uni.append(f"{universidad} - {carrera} ({concluido})")
-        extracted['educacion_universitaria'] = ' | '.join(edu_uni)
-    else:
-        extracted['educacion_universitaria'] = ''
-    
-    # Extract education - Posgrado
-    educacion_posgrado = api_data.get('formacionAcademica', {}).get('educacionPosgrado', [])
-    if educacion_posgrado:
-        posgrados = []
-        for pg in educacion_posgrado:
-            centro = pg.get('txCenEstudioPosgrado', '')
-            especialidad = pg.get('txEspecialidadPosgrado', '')
-            posgrados.append(f"{centro} - {especialidad}")
-        extracted['posgrados'] = ' | '.join(posgrados)
-    else:
-        extracted['posgrados'] = ''
-    
-    # Extract work experience
-    experiencia_list = api_data.get('experienciaLaboral', [])
-    if experiencia_list:
-        experiencia = []
-        for exp in experiencia_list[:5]:  # Limit to first 5
-            empresa = exp.get('centroTrabajo', '')
-            cargo = exp.get('ocupacionProfesion', '')
-            desde = exp.get('anioTrabajoDesde', '')
-            hasta = exp.get('anioTrabajoHasta', '')
-            experiencia.append(f"{cargo} en {empresa} ({desde}-{hasta})")
-        extracted['experiencia_laboral'] = ' | '.join(experiencia)
-    else:
-        extracted['experiencia_laboral'] = ''
-    
-    # Extract political party experience
-    cargo_partidario = api_data.get('trayectoria', {}).get('cargoPartidario', [])
-    if cargo_partidario:
-        cargos_part = []
-        for cargo in cargo_partidario:
-            org = cargo.get('orgPolCargoPartidario', '')
-            cargo_nombre = cargo.get('cargoPartidario', '')
-            desde = cargo.get('anioCargoPartiDesde', '')
-            hasta = cargo.get('anioCargoPartiHasta', '')
-            cargos_part.append(f"{cargo_nombre} en {org} ({desde}-{hasta})")
-        extracted['cargos_partidarios'] = ' | '.join(cargos_part)
-    else:
-        extracted['cargos_partidarios'] = ''
-    
-    # Extract electoral positions held
-    cargo_eleccion = api_data.get('trayectoria', {}).get('cargoEleccion', [])
-    if cargo_eleccion:
-        cargos_elec = []
-        for cargo in cargo_eleccion:
-            cargo_nombre = cargo.get('cargoEleccion', '')
-            org = cargo.get('orgPolCargoElec', '')
-            desde = cargo.get('anioCargoElecDesde', '')
-            hasta = cargo.get('anioCargoElecHasta', '')
-            cargos_elec.append(f"{cargo_nombre} por {org} ({desde}-{hasta})")
-        extracted['cargos_eleccion_previos'] = ' | '.join(cargos_elec)
-    else:
-        extracted['cargos_eleccion_previos'] = ''
-    
-    # Extract penal sentences
-    sentencia_penal = api_data.get('sentenciaPenal', [])
-    extracted['tiene_sentencias_penales'] = 'SÍ' if sentencia_penal else 'NO'
-    extracted['num_sentencias_penales'] = len(sentencia_penal)
-    if sentencia_penal:
-        sentencias = []
-        for sent in sentencia_penal:
-            delito = sent.get('delito', '')
-            fallo = sent.get('fallo', '')
-            sentencias.append(f"{delito} - {fallo}")
-        extracted['detalle_sentencias_penales'] = ' | '.join(sentencias)
-    else:
-        extracted['detalle_sentencias_penales'] = ''
-    
-    # Extract civil sentences
-    sentencia_obliga = api_data.get('sentenciaObliga', [])
-    extracted['tiene_sentencias_civiles'] = 'SÍ' if sentencia_obliga else 'NO'
-    extracted['num_sentencias_civiles'] = len(sentencia_obliga)
-    
-    # Extract income information
-    ingresos = api_data.get('declaracionJurada', {}).get('ingreso', [])
-    if ingresos:
-        ultimo_ingreso = ingresos[0]
-        extracted['año_ingresos'] = ultimo_ingreso.get('anioIngresos', '')
-        extracted['ingreso_total'] = ultimo_ingreso.get('totalIngresos', 0)
-        extracted['ingreso_publico'] = ultimo_ingreso.get('remuBrutaPublico', 0)
-        extracted['ingreso_privado'] = ultimo_ingreso.get('remuBrutaPrivado', 0)
-    else:
-        extracted['año_ingresos'] = ''
-        extracted['ingreso_total'] = 0
-        extracted['ingreso_publico'] = 0
-        extracted['ingreso_privado'] = 0
-    
-    # Extract real estate
-    bienes_inmuebles = api_data.get('declaracionJurada', {}).get('bienInmueble', [])
-    extracted['num_bienes_inmuebles'] = len(bienes_inmuebles)
-    if bienes_inmuebles:
-        valor_inmuebles = sum(float(b.get('autoavaluo', 0) or 0) for b in bienes_inmuebles)
-        extracted['valor_total_inmuebles'] = valor_inmuebles
-    else:
-        extracted['valor_total_inmuebles'] = 0
-    
-    # Extract vehicles and other movable property
-    bienes_muebles = api_data.get('declaracionJurada', {}).get('bienMueble', [])
-    extracted['num_vehiculos'] = len(bienes_muebles)
-    if bienes_muebles:
-        valor_vehiculos = sum(float(v.get('valor', 0) or 0) for v in bienes_muebles)
-        extracted['valor_total_vehiculos'] = valor_vehiculos
-    else:
-        extracted['valor_total_vehiculos'] = 0
-    
-    return extracted
+    return extract_hoja_vida(api_data)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract candidate data from the JNE API.")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="Concurrent requests in flight (default: %(default)s)")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help="Max requests per second sent to the JNE, 0 disables (default: %(default)s)")
+    parser.add_argument('--burst', type=int, default=None,
+                        help="Token bucket burst size (default: same as --rate)")
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR),
+                        help="Raw response cache directory (default: %(default)s)")
+    parser.add_argument('--ttl', type=float, default=DEFAULT_TTL / 3600,
+                        help="Hours a cached response is used without revalidation (default: %(default)s)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Always download, ignoring and not updating the cache")
+    parser.add_argument('--offline', action='store_true',
+                        help="Build the output from cached responses only, without network calls")
+    parser.add_argument('--candidates', default=None,
+                        help="NDJSON file written by jne_discovery.py (default: built-in presidential list)")
+    parser.add_argument('--snapshot-dir', default=str(DEFAULT_SNAPSHOT_DIR),
+                        help="Versioned snapshot store for this run (default: %(default)s)")
+    parser.add_argument('--no-snapshot', action='store_true',
+                        help="Don't record this run as a snapshot")
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(DEFAULT_FORMATS),
+                        help="Output files to write (default: %(default)s)")
+    parser.add_argument('--output', default=None,
+                        help="Basename of the output files (default: candidatos_jne_<timestamp>)")
+    parser.add_argument('--fetch-only', action='store_true',
+                        help="Only bring the response cache (and snapshot) up to date, without writing rows")
+    parser.add_argument('--trace', default=None,
+                        help="Append per-request spans and stage timings to this JSON-lines file")
+    parser.add_argument('--metrics', default=None,
+                        help="Write a Prometheus textfile summary of the run to this path")
+    return parser.parse_args(argv)
+
+def iter_rows(candidates, responses, tracer=NULL_TRACER):
+    """Yield one output row per candidate as its API response arrives."""
+    for i, (candidate, api_response) in enumerate(zip(candidates, responses), 1):
+        print(f"Processing {i}/{len(candidates)}: {candidate['persona']} ({candidate['partido']})")
 
-def main():
-    print("Starting data extraction from JNE API...")
-    print(f"Total candidates to process: {len(candidates_data)}\n")
-    
-    all_data = []
-    
-    for i, candidate in enumerate(candidates_data, 1):
-        print(f"Processing {i}/{len(candidates_data)}: {candidate['persona']} ({candidate['partido']})")
-        
-        # Fetch API data
-        api_response = fetch_candidate_data(candidate['api'])
-        
         # Extract relevant fields
-        extracted_data = extract_relevant_fields(api_response)
-        
+        with tracer.stage('extract'):
+            extracted_data = extract_relevant_fields(api_response)
+
         # Combine with base data
-        row_data = {
+        yield {
             'Partido': candidate['partido'],
             'Persona': candidate['persona'],
             'Candidatura': candidate['candidatura'],
-            'ID_HojaVida': candidate['api'].split('=')[-1],
+            'ID_HojaVida': hoja_vida_id(candidate['api']),
             **extracted_data
         }
-        
-        all_data.append(row_data)
-        
-        # Be nice to the API - wait a bit between requests
-        time.sleep(0.5)
-    
-    # Create DataFrame
-    df = pd.DataFrame(all_data)
-    
-    # Reorder columns for better readability
-    column_order = [
-        'Partido', 'Candidatura', 'Persona', 
-        'nombres', 'apellido_paterno', 'apellido_materno',
-        'dni', 'sexo', 'fecha_nacimiento', 'lugar_nacimiento', 'domicilio',
-        'estado_candidatura',
-        'educacion_universitaria', 'posgrados',
-        'experiencia_laboral', 'cargos_partidarios', 'cargos_eleccion_previos',
-        'tiene_sentencias_penales', 'num_sentencias_penales', 'detalle_sentencias_penales',
-        'tiene_sentencias_civiles', 'num_sentencias_civiles',
-        'año_ingresos', 'ingreso_total', 'ingreso_publico', 'ingreso_privado',
-        'num_bienes_inmuebles', 'valor_total_inmuebles',
-        'num_vehiculos', 'valor_total_vehiculos',
-        'ID_HojaVida'
-    ]
-    
-    # Only include columns that exist
-    column_order = [col for col in column_order if col in df.columns]
-    df = df[column_order]
-    
-    # Export to Excel
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.fetch_only and (args.no_cache or args.offline):
+        raise SystemExit("--fetch-only fills the response cache; it cannot be combined with --no-cache or --offline")
+    candidates = load_candidates(args.candidates) if args.candidates else candidates_data
+    print("Starting data extraction from JNE API...")
+    print(f"Total candidates to process: {len(candidates)}")
+    if args.offline:
+        print("Offline mode: reading cached responses only\n")
+    else:
+        print(f"Workers: {args.workers}, rate limit: {args.rate} req/s\n")
+
+    tracer = Tracer(args.trace, args.metrics, job='extract_jne')
+    session = tracer.instrument(make_session(args.workers))
+    limiter = TokenBucket(args.rate, args.burst)
+    cache = None if args.no_cache else ResponseCache(args.cache_dir, ttl=args.ttl * 3600)
+
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    excel_filename = f'candidatos_jne_{timestamp}.xlsx'
-    
-    df.to_excel(excel_filename, index=False, engine='openpyxl')
+    basename = args.output or f'candidatos_jne_{timestamp}'
+    sinks = [] if args.fetch_only else open_sinks(basename, args.formats)
+    snapshots = None if args.no_snapshot else SnapshotStore(args.snapshot_dir)
+    snapshot = snapshots.begin(source=basename) if snapshots else None
+
+    parties = set()
+    positions = Counter()
+    fetched = 0
+
+    # Rows stream to the sinks (on their own thread) while later requests are still in flight;
+    # the token bucket (not a fixed sleep) keeps us within the JNE's tolerated rate
+    def fetch(candidate):
+        with tracer.stage('fetch'):
+            return fetch_candidate_data(candidate['api'], session, limiter, cache, args.offline, tracer)
+
+    with SinkWriter(sinks, tracer=tracer) as writer, ThreadPoolExecutor(max_workers=args.workers) as pool:
+        # map() yields responses in candidate order while requests run concurrently
+        responses = pool.map(fetch, candidates)
+        if snapshot:
+            # Section hashes are taken as responses stream past, in candidate order
+            responses = map(snapshot.add, [hoja_vida_id(c['api']) for c in candidates], responses,
+                            [c['persona'] for c in candidates])
+        try:
+            if args.fetch_only:
+                for response in responses:
+                    fetched += response is not None
+            else:
+                for row in iter_rows(candidates, responses, tracer):
+                    writer.put(row)
+                    parties.add(row['Partido'])
+                    positions[row['Candidatura']] += 1
+        except KeyboardInterrupt:
+            print("\n[!] Interrupted, keeping the rows exported so far")
+            pool.shutdown(wait=False, cancel_futures=True)
+            snapshot = None  # a partial run would look like removed candidates
+
+    if cache:
+        # Offline hits don't refresh fetched_at: evicting would delete the entries being replayed
+        if not args.offline:
+            cache.evict()
+        cache.save()
+
+    if snapshot:
+        previous = snapshots.latest()
+        snapshot_id = snapshot.commit()
+        if snapshot_id:
+            diff = snapshots.diff(previous, snapshot_id)
+            print(f"[OK] Snapshot {snapshot_id}: {len(diff['added'])} added, {len(diff['removed'])} removed, "
+                  f"{len(diff['changed'])} changed since {previous or 'the first run'}")
+        else:
+            print(f"[OK] No changes since snapshot {previous}")
+
+    if tracer.enabled:
+        tracer.close()
+        summary = tracer.summary()
+        print("[OK] Busy time per stage: " + ", ".join(
+            f"{name} {stage['seconds']:.1f}s" for name, stage in summary['stages'].items())
+            + f" (wall {summary['wall']:.1f}s)")
+
+    if args.fetch_only:
+        print(f"\n[OK] {fetched}/{len(candidates)} hojas de vida in the cache at {args.cache_dir}")
+        return []
+
     print(f"\n[OK] Data extracted successfully!")
-    print(f"[OK] Excel file saved as: {excel_filename}")
-    print(f"[OK] Total rows: {len(df)}")
-    print(f"[OK] Total columns: {len(df.columns)}")
-    
-    # Also save as CSV for easier inspection
-    csv_filename = f'candidatos_jne_{timestamp}.csv'
-    df.to_csv(csv_filename, index=False, encoding='utf-8-sig')
-    print(f"[OK] CSV file saved as: {csv_filename}")
-    
+    for sink in sinks:
+        print(f"[OK] {sink.extension.upper()} file saved as: {sink.path}")
+    print(f"[OK] Total rows: {writer.rows}")
+    print(f"[OK] Total columns: {len(COLUMN_ORDER)}")
+
     # Print summary
     print("\n--- Summary ---")
-    print(f"Parties: {df['Partido'].nunique()}")
-    print(f"Candidates: {len(df)}")
+    print(f"Parties: {len(parties)}")
+    print(f"Candidates: {writer.rows}")
     print("\nCandidates by position:")
-    print(df['Candidatura'].value_counts())
-    
-    return df
+    for position, count in positions.most_common():
+        print(f"  {position}: {count}")
+
+    return [sink.path for sink in sinks]
 
 if __name__ == "__main__":
-    df = main()
+    main()
@@ -0,0 +1,439 @@
+"""Generate src/data/domains/*.ts and per-candidate JSON chunks from JNE data.
+
+Reads raw hojas de vida from the extract_JNE.py response cache and writes
+the JNE-backed domain modules (ingresos, propiedades, sentencias,
+educacion, experienciaLaboral). Generation is incremental: a state file
+keeps a hash of the source sections behind every (candidate, domain)
+entry, and only entries whose source changed are re-rendered. Every
+other entry, including hand-edited ones, is kept byte for byte.
+
+Each candidate can also be written as one JSON chunk
+(public/data/candidatos/<id>.json) that the frontend can lazy-load
+instead of bundling every domain module.
+
+Usage:
+    python extract_JNE.py                       # fills the response cache
+    python generate_domains.py --baseline       # first run: adopt current TS as-is
+    python generate_domains.py                  # later runs: rewrite changed entries
+    python generate_domains.py --chunks         # also write JSON chunks
+
+When extract_JNE.py records snapshots (jne_snapshots.py), candidates whose
+domain sections have not changed since the last run are not even loaded.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from collections import namedtuple
+from pathlib import Path
+
+from jne_cache import DEFAULT_CACHE_DIR, ResponseCache
+from jne_snapshots import DEFAULT_SNAPSHOT_DIR, SnapshotStore, section_name
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPTS_DIR.parent
+DOMAINS_DIR = REPO_ROOT / 'src' / 'data' / 'domains'
+CHUNKS_DIR = REPO_ROOT / 'public' / 'data' / 'candidatos'
+STATE_FILE = SCRIPTS_DIR / '.codegen_state.json'
+SNAPSHOT_STAGE = 'codegen'
+
+# idHojaVida -> id used in src/data/domains/base.ts (names there are not derivable)
+SLUGS = {
+    '245741': 'keiko-fujimori',
+    '245620': 'rafael-lopezaliaga',
+    '245572': 'yonhy-lescano',
+    '247143': 'carlos-alvarez',
+    '245682': 'cesar-acuna',
+    '248006': 'lopez-chau',
+    '251773': 'ricardo-belmont',
+    '244668': 'vladimir-cerron',
+    '252450': 'luis-olivera',
+    '246281': 'roberto-sanchez',
+    '246025': 'mesias-guevara',
+}
+
+# JNE hoja-vida keys read by the builders below, kept in one place so a
+# schema change on the JNE side is a one-line fix.
+KEYS = {
+    'basica': ('formacionAcademica', 'educacionBasica'),
+    'primaria': 'concluidoEduPrimaria',
+    'secundaria': 'concluidoEduSecundaria',
+    'universitaria': ('formacionAcademica', 'educacionUniversitaria'),
+    'uni_anio': 'anioBachiller',
+    'posgrado': ('formacionAcademica', 'educacionPosgrado'),
+    'posgrado_anio': 'txAnioPosgrado',
+    'experiencia': ('experienciaLaboral',),
+    'trabajo_lugar': ('trabajoDistrito', 'trabajoProvincia', 'trabajoPais'),
+    'sentencias': ('sentenciaPenal',),
+    'sentencia_fecha': 'fechaSentencia',
+    'sentencia_organo': 'organoJudicial',
+    'ingresos': ('declaracionJurada', 'ingreso'),
+    'inmuebles': ('declaracionJurada', 'bienInmueble'),
+    'muebles': ('declaracionJurada', 'bienMueble'),
+    'otros': ('declaracionJurada', 'otroBienMueble'),
+}
+
+Domain = namedtuple('Domain', 'name filename sources build render')
+
+
+def _at(payload, path):
+    for key in path:
+        if not isinstance(payload, dict):
+            return None
+        payload = payload.get(key)
+    return payload
+
+
+def _items(payload, path):
+    return _at(payload, path) or []
+
+
+def _text(value):
+    return '' if value is None else str(value)
+
+
+def _year(value):
+    match = re.search(r'(\d{4})', _text(value))
+    return match.group(1) if match else _text(value)
+
+
+def _si(value):
+    return 'Sí' if value == 'SI' else 'No'
+
+
+def build_ingresos(payload):
+    return [
+        {
+            'año': _text(item.get('anioIngresos')),
+            'publico': float(item.get('remuBrutaPublico') or 0),
+            'privado': float(item.get('remuBrutaPrivado') or 0),
+            'total': float(item.get('totalIngresos') or 0),
+        }
+        for item in _items(payload, KEYS['ingresos'])
+    ]
+
+
+def build_propiedades(payload):
+    return {
+        'inmuebles': len(_items(payload, KEYS['inmuebles'])),
+        'vehiculos': len(_items(payload, KEYS['muebles'])),
+        'otros': len(_items(payload, KEYS['otros'])),
+    }
+
+
+def build_sentencias(payload):
+    return [
+        {
+            'delito': _text(item.get('delito')),
+            'año': _year(item.get(KEYS['sentencia_fecha'])),
+            'fallo': _text(item.get('fallo')),
+            'organo': _text(item.get(KEYS['sentencia_organo'])),
+        }
+        for item in _items(payload, KEYS['sentencias'])
+    ]
+
+
+def _posgrado_tipo(item):
+    if item.get('esDoctor') == '1':
+        return 'Doctorado'
+    if item.get('esMaestro') == '1':
+        return 'Maestría'
+    return 'Diplomado'
+
+
+def build_educacion(payload):
+    basica = _at(payload, KEYS['basica']) or {}
+    return {
+        'basica': {
+            'primaria': _si(basica.get(KEYS['primaria'])),
+            'secundaria': _si(basica.get(KEYS['secundaria'])),
+        },
+        'universitaria': [
+            {
+                'universidad': _text(item.get('universidad')),
+                'carrera': _text(item.get('carreraUni')),
+                'año': _text(item.get(KEYS['uni_anio'])),
+            }
+            for item in _items(payload, KEYS['universitaria'])
+        ],
+        'postgrado': [
+            {
+                'tipo': _posgrado_tipo(item),
+                'institucion': _text(item.get('txCenEstudioPosgrado')),
+                'especialidad': _text(item.get('txEspecialidadPosgrado')),
+                'año': _text(item.get(KEYS['posgrado_anio'])),
+            }
+            for item in _items(payload, KEYS['posgrado'])
+        ],
+    }
+
+
+def build_experiencia(payload):
+    return [
+        {
+            'puesto': _text(item.get('ocupacionProfesion')),
+            'empresa': _text(item.get('centroTrabajo')),
+            'periodo': f"{_text(item.get('anioTrabajoDesde'))} - {_text(item.get('anioTrabajoHasta'))}",
+            'ubicacion': ', '.join(_text(item.get(k)) for k in KEYS['trabajo_lugar'] if item.get(k)),
+        }
+        for item in _items(payload, KEYS['experiencia'])
+    ]
+
+
+# --- TypeScript rendering (matches the layout of the hand-written modules) ---
+
+def ts_string(value):
+    escaped = value.replace('\\', '\\\\').replace("'", "\\'").replace('\n', '\\n')
+    return f"'{escaped}'"
+
+
+def ts_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if value is None:
+        return 'null'
+    return ts_string(value)
+
+
+def ts_block(obj, indent):
+    pad = ' ' * indent
+    lines = [f"{pad}  {key}: {ts_value(value)}," for key, value in obj.items()]
+    return '{\n' + '\n'.join(lines) + f"\n{pad}}}"
+
+
+def ts_inline(obj):
+    return '{ ' + ', '.join(f"{key}: {ts_value(value)}" for key, value in obj.items()) + ' }'
+
+
+def render_block(value):
+    return ts_block(value, 2)
+
+
+def render_block_list(items):
+    if not items:
+        return '[]'
+    return '[\n' + ''.join(f"    {ts_block(item, 4)},\n" for item in items) + '  ]'
+
+
+def render_educacion(value):
+    def inline_list(items):
+        return '[\n' + ''.join(f"      {ts_inline(item)},\n" for item in items) + '    ]'
+
+    return (
+        '{\n'
+        f"    basica: {ts_inline(value['basica'])},\n"
+        f"    universitaria: {inline_list(value['universitaria'])},\n"
+        f"    postgrado: {inline_list(value['postgrado'])},\n"
+        '  }'
+    )
+
+
+DOMAINS = [
+    Domain('ingresos', 'ingresos.ts', [KEYS['ingresos']], build_ingresos, render_block_list),
+    Domain('propiedades', 'propiedades.ts', [KEYS['inmuebles'], KEYS['muebles'], KEYS['otros']],
+           build_propiedades, render_block),
+    Domain('sentencias', 'sentencias.ts', [KEYS['sentencias']], build_sentencias, render_block_list),
+    Domain('educacion', 'educacion.ts', [('formacionAcademica',)], build_educacion, render_educacion),
+    Domain('experienciaLaboral', 'experienciaLaboral.ts', [KEYS['experiencia']],
+           build_experiencia, render_block_list),
+]
+
+
+def source_hash(payload, domain):
+    """Stable hash of the raw sections a domain is built from."""
+    sections = [_at(payload, path) for path in domain.sources]
+    canonical = json.dumps(sections, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+# --- Incremental module rewriting ---
+
+_ENTRY = re.compile(r"^\s*'([^']+)': ")
+# String literals and line comments, ignored when counting braces
+_NOT_CODE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`(?:[^`\\]|\\.)*`|//.*$")
+
+
+class TsModule:
+    """A domain module split into header, ordered entries and footer."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.original = self.path.read_text(encoding='utf-8')
+        lines = self.original.split('\n')
+        start = next(i for i, line in enumerate(lines) if line.startswith('export const ') and line.endswith('{'))
+        end = max(i for i, line in enumerate(lines) if line == '};')
+        self.header = '\n'.join(lines[:start + 1])
+        self.footer = '\n'.join(lines[end:])
+        self.entries = {}
+
+        # Entries are the keys at the top level of the object, whatever their indentation
+        current, depth = None, 0
+        for line in lines[start + 1:end]:
+            match = _ENTRY.match(line) if depth == 0 else None
+            if match:
+                current = match.group(1)
+                self.entries[current] = [line]
+            elif current is not None:
+                self.entries[current].append(line)
+            code = _NOT_CODE.sub('', line)
+            depth += code.count('{') + code.count('[') - code.count('}') - code.count(']')
+        self.entries = {key: '\n'.join(body).rstrip().rstrip(',') for key, body in self.entries.items()}
+
+    def set(self, slug, literal):
+        self.entries[slug] = f"  '{slug}': {literal}"
+
+    def render(self):
+        return f"{self.header}\n" + ',\n'.join(self.entries.values()) + f"\n{self.footer}"
+
+    def save(self):
+        """Write the module if it changed; returns True when written."""
+        text = self.render()
+        if text == self.original:
+            return False
+        self.path.write_text(text, encoding='utf-8')
+        return True
+
+
+def base_ids(domains_dir=DOMAINS_DIR):
+    """Candidate ids present in base.ts (the ones the frontend lists)."""
+    return set(TsModule(Path(domains_dir) / 'base.ts').entries)
+
+
+def slugify(name):
+    ascii_name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '-', ascii_name.lower()).strip('-')
+
+
+def slug_for(candidate):
+    id_hoja_vida = str(candidate.get('id') or candidate['api'].split('=')[-1])
+    return SLUGS.get(id_hoja_vida) or slugify(candidate['persona'])
+
+
+def load_state(path=STATE_FILE):
+    try:
+        return json.loads(Path(path).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(state, path=STATE_FILE):
+    path = Path(path)
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def write_chunk(chunks_dir, slug, sections):
+    """Write public/data/candidatos/<slug>.json if its content changed."""
+    path = Path(chunks_dir) / f"{slug}.json"
+    text = json.dumps({'id': slug, **sections}, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    if path.exists() and path.read_text(encoding='utf-8') == text:
+        return False
+    path.write_text(text, encoding='utf-8')
+    return True
+
+
+def domain_sections(domains=DOMAINS):
+    """Snapshot sections (see jne_snapshots.py) the given domains are built from."""
+    return sorted({section_name(path) for domain in domains for path in domain.sources})
+
+
+def generate(candidates, cache, domains_dir=DOMAINS_DIR, state_path=STATE_FILE,
+             chunks_dir=None, include_all=False, baseline=False, domains=DOMAINS, snapshots=None):
+    """Regenerate changed entries. Returns {'entries': n, 'modules': [...], 'chunks': n}.
+
+    With a SnapshotStore, candidates whose domain sections did not change
+    since the last codegen run are skipped without loading their payload.
+    """
+    state = load_state(state_path)
+    pending = snapshots.changed_since(SNAPSHOT_STAGE, domain_sections(domains)) if snapshots else None
+    known = None if include_all else base_ids(domains_dir)
+    modules = {domain.name: TsModule(Path(domains_dir) / domain.filename) for domain in domains}
+    entries = chunks = 0
+
+    if chunks_dir:
+        Path(chunks_dir).mkdir(parents=True, exist_ok=True)
+
+    for candidate in candidates:
+        slug = slug_for(candidate)
+        key = str(candidate.get('id') or candidate['api'].split('=')[-1])
+        in_module = known is None or slug in known
+        # 'listed': the recorded hashes were rendered into the modules, not only seen
+        if pending is not None and key not in pending and state.get(slug, {}).get('listed') == in_module \
+                and not (chunks_dir and not (Path(chunks_dir) / f"{slug}.json").exists()):
+            continue
+        payload = cache.load(key)
+        if not payload:
+            continue
+
+        hashes = state.setdefault(slug, {})
+        changed = {}
+        listed = hashes.get('listed') == in_module
+        hashes['listed'] = in_module
+        for domain in domains:
+            digest = source_hash(payload, domain)
+            module = modules[domain.name]
+            if hashes.get(domain.name) == digest and listed and (slug in module.entries or not in_module):
+                continue
+            hashes[domain.name] = digest
+            if baseline and slug in module.entries:
+                continue
+            changed[domain.name] = True
+            if in_module:
+                module.set(slug, domain.render(domain.build(payload)))
+                entries += 1
+
+        if chunks_dir and (changed or not (Path(chunks_dir) / f"{slug}.json").exists()):
+            sections = {domain.name: domain.build(payload) for domain in domains}
+            chunks += write_chunk(chunks_dir, slug, sections)
+
+    written = [module.path.name for module in modules.values() if module.save()]
+    save_state(state, state_path)
+    if snapshots and snapshots.latest():
+        snapshots.mark(SNAPSHOT_STAGE)
+    return {'entries': entries, 'modules': written, 'chunks': chunks}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate src/data/domains modules from cached JNE data.")
+    parser.add_argument('--candidates', default=None,
+                        help="NDJSON from jne_discovery.py (default: extract_JNE.candidates_data)")
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR))
+    parser.add_argument('--domains-dir', default=str(DOMAINS_DIR))
+    parser.add_argument('--state', default=str(STATE_FILE))
+    parser.add_argument('--chunks', nargs='?', const=str(CHUNKS_DIR), default=None,
+                        help=f"Also write per-candidate JSON chunks (default dir: {CHUNKS_DIR})")
+    parser.add_argument('--all', action='store_true',
+                        help="Add every candidate to the TS modules, not only those in base.ts")
+    parser.add_argument('--baseline', action='store_true',
+                        help="Record source hashes without touching existing entries")
+    parser.add_argument('--snapshot-dir', default=str(DEFAULT_SNAPSHOT_DIR),
+                        help="Skip candidates whose sections are unchanged in this snapshot store (default: %(default)s)")
+    parser.add_argument('--no-snapshot', action='store_true',
+                        help="Check every cached candidate, ignoring snapshots")
+    args = parser.parse_args(argv)
+
+    if args.candidates:
+        from jne_discovery import load_candidates
+        candidates = load_candidates(args.candidates)
+    else:
+        from extract_JNE import candidates_data as candidates
+
+    result = generate(candidates, ResponseCache(args.cache_dir), args.domains_dir, args.state,
+                      args.chunks, args.all, args.baseline,
+                      snapshots=None if args.no_snapshot else SnapshotStore(args.snapshot_dir))
+
+    print(f"[OK] {result['entries']} entries regenerated")
+    for name in result['modules']:
+        print(f"[OK] Updated {name}")
+    if args.chunks:
+        print(f"[OK] {result['chunks']} JSON chunks written to {args.chunks}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
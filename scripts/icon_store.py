@@ -0,0 +1,207 @@
+"""Content-addressed store for party symbols downloaded from the JNE.
+
+Blobs live under ``<root>/objects/<sha[:2]>/<sha>.<ext>`` and are written
+once. index.json maps names (party file stem or ``simbolo_<id>``) to the
+blob they resolve to, together with the validators of the last download,
+and records a dHash and pHash for every blob seen. A download whose bytes
+are already known is collapsed onto the existing blob instead of adding a
+new file. Probe results (``simbolo_<id>``) are also collapsed when they are
+perceptually within a few bits of a stored symbol (same logo re-encoded or
+resized by another ID); named party downloads only match on exact bytes,
+so a slightly retouched logo is still stored and two parties with similar
+simple logos keep their own files.
+
+    store = IconStore('iconos_partidos/.store')
+    result = store.put('fuerza_popular', response.content, response.headers)
+    store.export('fuerza_popular', 'iconos_partidos')   # fuerza_popular.png
+    store.save()
+"""
+import hashlib
+import json
+import os
+import shutil
+from collections import namedtuple
+from io import BytesIO
+from pathlib import Path
+
+# Max differing bits (of 64) for two symbols to count as the same logo.
+# Both hashes have to agree; dHash catches re-encodes, pHash resizes/recolourings.
+DHASH_DISTANCE = 6
+PHASH_DISTANCE = 8
+
+# unchanged: name already resolved to these bytes; duplicate: bytes known under another
+# name; similar: collapsed onto a perceptually equal blob; new: stored as a new blob
+PutResult = namedtuple('PutResult', 'name sha status canonical')
+
+
+def sniff_extension(data, content_type=''):
+    """File extension from the Content-Type or the magic bytes (png by default)."""
+    content_type = (content_type or '').lower()
+    if 'image/png' in content_type or data[:4] == b'\x89PNG':
+        return 'png'
+    if 'image/jpeg' in content_type or data[:2] == b'\xff\xd8':
+        return 'jpg'
+    if 'image/gif' in content_type or data[:4] == b'GIF8':
+        return 'gif'
+    if 'image/svg' in content_type or b'<svg' in data[:100]:
+        return 'svg'
+    return 'png'
+
+
+def _grayscale(data):
+    from PIL import Image
+
+    with Image.open(BytesIO(data)) as image:
+        image = image.convert('RGBA')
+    # Transparent symbols are hashed as shown on a white card
+    background = Image.new('RGBA', image.size, (255, 255, 255, 255))
+    return Image.alpha_composite(background, image).convert('L')
+
+
+def dhash(gray):
+    """64-bit difference hash: brightness gradient between neighbouring pixels."""
+    from PIL import Image
+
+    pixels = list(gray.resize((9, 8), Image.LANCZOS).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+def phash(gray):
+    """64-bit perceptual hash: low-frequency DCT coefficients above their median."""
+    import numpy as np
+    from PIL import Image
+
+    pixels = np.asarray(gray.resize((32, 32), Image.LANCZOS), dtype=np.float64)
+    n = np.arange(32)
+    dct = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / 64)
+    low = (dct @ pixels @ dct.T)[:8, :8].ravel()
+    bits = 0
+    for value in low > np.median(low[1:]):
+        bits = (bits << 1) | int(value)
+    return bits
+
+
+def perceptual_hashes(data):
+    """(dhash, phash) of an image, or (None, None) if Pillow can't decode it (e.g. SVG)."""
+    try:
+        gray = _grayscale(data)
+    except Exception:
+        return None, None
+    return dhash(gray), phash(gray)
+
+
+def _distance(a, b):
+    return (a ^ b).bit_count()
+
+
+class IconStore:
+    """sha256-addressed blobs plus name and perceptual-hash indexes."""
+
+    def __init__(self, root, dhash_distance=DHASH_DISTANCE, phash_distance=PHASH_DISTANCE):
+        self.root = Path(root)
+        self.objects = self.root / 'objects'
+        self.index_path = self.root / 'index.json'
+        self.dhash_distance = dhash_distance
+        self.phash_distance = phash_distance
+        try:
+            index = json.loads(self.index_path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            index = {}
+        self.names = index.get('names', {})
+        self.blobs = index.get('blobs', {})
+
+    def path(self, sha):
+        """On-disk file of a stored blob."""
+        return self.objects / sha[:2] / f"{sha}.{self.blobs[sha]['ext']}"
+
+    def resolve(self, name):
+        """sha of the blob ``name`` points to (after collapsing near-duplicates)."""
+        entry = self.names.get(name)
+        return entry['sha'] if entry else None
+
+    def conditional_headers(self, name):
+        """If-None-Match/If-Modified-Since for re-downloading ``name``."""
+        entry = self.names.get(name) or {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def similar(self, dh, ph):
+        """Stored blob perceptually equal to the given hashes, if any."""
+        if dh is None:
+            return None
+        best = None
+        for sha, blob in self.blobs.items():
+            if blob.get('canonical') or blob.get('dhash') is None:
+                continue
+            d = _distance(dh, blob['dhash'])
+            if d <= self.dhash_distance and _distance(ph, blob['phash']) <= self.phash_distance:
+                if best is None or d < best[0]:
+                    best = (d, sha)
+        return best and best[1]
+
+    def put(self, name, data, headers=None):
+        """Record ``data`` as the current content of ``name``; returns a PutResult."""
+        headers = headers or {}
+        sha = hashlib.sha256(data).hexdigest()
+        known = self.blobs.get(sha)
+        previous = self.resolve(name)
+        probe = name.startswith('simbolo_')
+        if known and known.get('canonical') and not probe:
+            known = None  # bytes only seen as a probe's near-duplicate: a named icon needs its own blob
+
+        if known:
+            canonical = known.get('canonical', sha)
+            status = 'unchanged' if previous == canonical else 'duplicate'
+        else:
+            dh, ph = perceptual_hashes(data)
+            canonical = self.similar(dh, ph) if probe else None
+            if canonical:
+                # Remember the variant's hashes only, so seeing it again is a lookup
+                self.blobs[sha] = {'canonical': canonical, 'bytes': len(data)}
+                status = 'unchanged' if previous == canonical else 'similar'
+            else:
+                canonical = sha
+                ext = sniff_extension(data, headers.get('Content-Type', ''))
+                self.blobs[sha] = {'ext': ext, 'bytes': len(data), 'dhash': dh, 'phash': ph}
+                path = self.path(sha)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(path.name + '.tmp')
+                tmp.write_bytes(data)
+                os.replace(tmp, path)
+                status = 'new'
+
+        self.names[name] = {
+            'sha': canonical,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+        }
+        return PutResult(name, canonical, status, canonical if canonical != sha else None)
+
+    def aliases(self, sha):
+        """Names resolving to ``sha``."""
+        return sorted(name for name, entry in self.names.items() if entry['sha'] == sha)
+
+    def export(self, name, directory, stem=None):
+        """Copy the blob behind ``name`` to ``<directory>/<stem>.<ext>`` unless already identical."""
+        sha = self.resolve(name)
+        source = self.path(sha)
+        target = Path(directory) / f"{stem or name}.{self.blobs[sha]['ext']}"
+        if not (target.exists() and target.stat().st_size == source.stat().st_size
+                and hashlib.sha256(target.read_bytes()).hexdigest() == sha):
+            shutil.copyfile(source, target)
+        return target
+
+    def save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_name(self.index_path.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'names': self.names, 'blobs': self.blobs}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.index_path)
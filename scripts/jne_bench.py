@@ -0,0 +1,604 @@
+"""Benchmark the JNE pipeline against a local stub server.
+
+StubJNE is a threaded HTTP server that answers the JNE endpoints the
+scripts use: hoja-vida (?idHojaVida=) and GetSimbolo/<id>, with recorded
+responses from a ResponseCache directory when given (--fixtures
+scripts/.jne_cache) and deterministic synthetic payloads otherwise, so
+any number of candidates can be served, and the paginated candidate
+listing jne_discovery.py walks (--listing candidates per election type). Latency, 5xx errors and 429s
+(with Retry-After) are configurable and it honours If-None-Match.
+
+Benchmarks (each runs in its own process, so peak RSS is per benchmark):
+
+    fetch      fetch_candidate_data() throughput against the stub
+    extract    extract_relevant_fields() records/s on synthetic payloads
+    export     SinkWriter time and file size per output format
+    pipeline   extract_JNE.main() end to end (fetch + extract + export)
+    icons      descargar_icono() into an IconStore against the stub
+    discovery  jne_discovery.discover() over the listing, interrupted with a
+               partially written record, resumed from its checkpoint and
+               re-run; 'complete' is false if the output lost or repeated
+               IDs or the finished run left its checkpoint behind
+
+Results are saved as JSON (with the git commit) in scripts/.jne_bench/ so
+runs can be compared across commits:
+
+    python jne_bench.py run --candidates 10000 --latency 0.05 --throttle-rate 0.02
+    python jne_bench.py compare .jne_bench/<old>.json .jne_bench/<new>.json
+    python jne_bench.py serve --port 8800 --write-candidates stub.ndjson
+    python extract_JNE.py --candidates stub.ndjson --no-cache --no-snapshot
+    python jne_discovery.py --base-url http://127.0.0.1:8800 --tipos presidencial senado
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from jne_discovery import HOJA_VIDA_PATH, LISTING_PATH, TIPOS_ELECCION, hoja_vida_url
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = SCRIPTS_DIR / '.jne_bench'
+SIMBOLO_PATH = '/Consulta/Simbolo/GetSimbolo/'
+BENCHMARKS = ('fetch', 'extract', 'export', 'pipeline', 'icons', 'discovery')
+LISTING_FIRST_ID = 400000
+
+# --- Synthetic payloads ---
+
+_NOMBRES = ('JOSE', 'MARIA', 'LUIS', 'ROSA', 'CARLOS', 'ANA', 'JORGE', 'CARMEN', 'JUAN', 'LUZ',
+            'MIGUEL', 'ELENA', 'CESAR', 'NELLY', 'VICTOR', 'SONIA', 'RAUL', 'GLADYS', 'ÁNGEL', 'MÓNICA')
+_APELLIDOS = ('QUISPE', 'FLORES', 'SÁNCHEZ', 'RODRÍGUEZ', 'GARCÍA', 'MAMANI', 'HUAMÁN', 'CHÁVEZ',
+              'TORRES', 'RAMÍREZ', 'VARGAS', 'CASTILLO', 'ESPINOZA', 'MENDOZA', 'CONDORI', 'ROJAS')
+_DEPARTAMENTOS = ('LIMA', 'AREQUIPA', 'CUSCO', 'PUNO', 'PIURA', 'LA LIBERTAD', 'JUNÍN', 'LORETO',
+                  'ÁNCASH', 'CAJAMARCA', 'ICA', 'TACNA', 'SAN MARTÍN', 'UCAYALI', 'AYACUCHO')
+_UNIVERSIDADES = ('UNIVERSIDAD NACIONAL MAYOR DE SAN MARCOS', 'PONTIFICIA UNIVERSIDAD CATÓLICA DEL PERÚ',
+                  'UNIVERSIDAD NACIONAL DE SAN AGUSTÍN', 'UNIVERSIDAD DE LIMA', 'UNIVERSIDAD CÉSAR VALLEJO',
+                  'UNIVERSIDAD NACIONAL DE INGENIERÍA', 'UNIVERSIDAD SAN MARTÍN DE PORRES')
+_CARRERAS = ('DERECHO', 'ECONOMÍA', 'INGENIERÍA CIVIL', 'MEDICINA HUMANA', 'EDUCACIÓN',
+             'ADMINISTRACIÓN', 'CONTABILIDAD', 'SOCIOLOGÍA')
+_CARGOS = ('PRESIDENTE', 'DIPUTADO', 'SENADOR', 'PARLAMENTARIO ANDINO')
+_PARTIDOS = tuple(f"PARTIDO SINTÉTICO {n:02d}" for n in range(1, 41))
+
+
+def _choices(rng, options, low, high):
+    return [rng.choice(options) for _ in range(rng.randint(low, high))]
+
+
+def synthetic_candidate(id_hoja_vida, base_url):
+    """candidates_data-shaped record for a synthetic idHojaVida."""
+    rng = random.Random(f"candidate-{id_hoja_vida}")
+    return {
+        'id': str(id_hoja_vida),
+        'partido': rng.choice(_PARTIDOS),
+        'persona': f"{rng.choice(_NOMBRES).title()} {rng.choice(_APELLIDOS).title()}",
+        'candidatura': rng.choice(_CARGOS),
+        'api': hoja_vida_url(id_hoja_vida, base_url),
+    }
+
+
+def synthetic_listing_item(id_hoja_vida):
+    """Candidate listing row (the keys jne_discovery.normalize_listing_item reads first)."""
+    candidate = synthetic_candidate(id_hoja_vida, '')
+    return {'idHojaVida': int(id_hoja_vida), 'strOrganizacionPolitica': candidate['partido'],
+            'strCargo': candidate['candidatura'], 'strNombreCompleto': candidate['persona'].upper()}
+
+
+def listing_ids(id_tipo, listing_size):
+    """idHojaVida values the stub lists for one idTipoEleccion."""
+    first = LISTING_FIRST_ID + id_tipo * 10000
+    return range(first, first + listing_size)
+
+
+def synthetic_hoja_vida(id_hoja_vida):
+    """Deterministic hoja de vida payload with the shape (and roughly the size) of a real one."""
+    rng = random.Random(f"hoja-vida-{id_hoja_vida}")
+    year = lambda: rng.randint(1980, 2025)
+    lugar = lambda: {'Distrito': rng.choice(_DEPARTAMENTOS), 'Provincia': rng.choice(_DEPARTAMENTOS),
+                     'Departamento': rng.choice(_DEPARTAMENTOS)}
+    nacimiento, domicilio = lugar(), lugar()
+    return {
+        'datoGeneral': {
+            'idHojaVida': int(id_hoja_vida),
+            'nombres': f"{rng.choice(_NOMBRES)} {rng.choice(_NOMBRES)}",
+            'apellidoPaterno': rng.choice(_APELLIDOS),
+            'apellidoMaterno': rng.choice(_APELLIDOS),
+            'numeroDocumento': f"{rng.randint(10_000_000, 79_999_999)}",
+            'sexo': rng.choice('12'),
+            'feNacimiento': f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1945, 1995)}",
+            **{f"naci{k}": v for k, v in nacimiento.items()},
+            **{f"domi{k}": v for k, v in domicilio.items()},
+            'domicilioDireccion': f"AV. {rng.choice(_APELLIDOS)} {rng.randint(100, 2999)}",
+            'estado': rng.choice(('INSCRITO', 'EN PROCESO', 'IMPROCEDENTE')),
+        },
+        'formacionAcademica': {
+            'educacionUniversitaria': [
+                {'universidad': rng.choice(_UNIVERSIDADES), 'carreraUni': rng.choice(_CARRERAS),
+                 'concluidoEduUni': rng.choice(('SI', 'NO')), 'anioBachiller': str(year())}
+                for _ in range(rng.randint(0, 3))],
+            'educacionPosgrado': [
+                {'txCenEstudioPosgrado': rng.choice(_UNIVERSIDADES),
+                 'txEspecialidadPosgrado': f"MAESTRÍA EN {rng.choice(_CARRERAS)}"}
+                for _ in range(rng.randint(0, 2))],
+        },
+        'experienciaLaboral': [
+            {'ocupacionProfesion': rng.choice(_CARRERAS), 'centroTrabajo': f"EMPRESA {rng.choice(_APELLIDOS)} S.A.C.",
+             'anioTrabajoDesde': str(year()), 'anioTrabajoHasta': str(year()),
+             'direccionTrabajo': f"JR. {rng.choice(_APELLIDOS)} {rng.randint(100, 999)}"}
+            for _ in range(rng.randint(0, 8))],
+        'trayectoria': {
+            'cargoPartidario': [
+                {'cargoPartidario': 'SECRETARIO GENERAL', 'orgPolCargoPartidario': rng.choice(_PARTIDOS),
+                 'anioCargoPartiDesde': str(year()), 'anioCargoPartiHasta': str(year())}
+                for _ in range(rng.randint(0, 3))],
+            'cargoEleccion': [
+                {'cargoEleccion': rng.choice(('ALCALDE PROVINCIAL', 'REGIDOR', 'CONGRESISTA')),
+                 'orgPolCargoElec': rng.choice(_PARTIDOS),
+                 'anioCargoElecDesde': str(year()), 'anioCargoElecHasta': str(year())}
+                for _ in range(rng.randint(0, 2))],
+        },
+        'sentenciaPenal': [
+            {'delito': 'PECULADO', 'fallo': 'CONDENATORIA'} for _ in range(rng.choice((0, 0, 0, 0, 1, 2)))],
+        'sentenciaObliga': [
+            {'materia': 'ALIMENTOS', 'fallo': 'FUNDADA'} for _ in range(rng.choice((0, 0, 0, 1)))],
+        'declaracionJurada': {
+            'ingreso': [{'anioIngresos': str(2024 - i), 'totalIngresos': round(rng.uniform(0, 900_000), 2),
+                         'remuBrutaPublico': round(rng.uniform(0, 300_000), 2),
+                         'remuBrutaPrivado': round(rng.uniform(0, 600_000), 2)} for i in range(2)],
+            'bienInmueble': [{'tipoBien': 'CASA', 'autoavaluo': round(rng.uniform(20_000, 900_000), 2)}
+                             for _ in range(rng.randint(0, 5))],
+            'bienMueble': [{'vehiculo': 'AUTOMÓVIL', 'valor': round(rng.uniform(5_000, 120_000), 2)}
+                           for _ in range(rng.randint(0, 3))],
+        },
+        'informacionAdicional': [{'texto': ' '.join(_choices(rng, _CARRERAS, 20, 60))}],
+    }
+
+
+def synthetic_simbolo(id_simbolo, size=96):
+    """Distinct PNG party symbol for an id (random blocks, so icons do not look alike)."""
+    rng = random.Random(f"simbolo-{id_simbolo}")
+    blocks = [[bytes(rng.randrange(256) for _ in range(3)) for _ in range(8)] for _ in range(8)]
+    cell = size // 8
+    raw = b''.join(b'\x00' + b''.join(blocks[y // cell][x // cell] for x in range(size)) for y in range(size))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw, 6)) + chunk(b'IEND', b''))
+
+
+# --- Stub server ---
+
+class StubJNE:
+    """Threaded local stand-in for the JNE endpoints."""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.02, jitter=0.005, error_rate=0.0,
+                 throttle_rate=0.0, retry_after=1.0, missing_rate=0.0, fixtures=None, listing_size=250):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.missing_rate = missing_rate
+        self.listing_size = listing_size
+        self.fixtures = None
+        if fixtures:
+            from jne_cache import ResponseCache
+
+            self.fixtures = ResponseCache(fixtures)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'bytes': 0, 'status': {}}
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _record(self, status, size):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['bytes'] += size
+            self.stats['status'][str(status)] = self.stats['status'].get(str(status), 0) + 1
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = {'requests': 0, 'bytes': 0, 'status': {}}
+
+    def hoja_vida(self, id_hoja_vida):
+        payload = self.fixtures.load(id_hoja_vida) if self.fixtures else None
+        if payload is None:
+            payload = synthetic_hoja_vida(id_hoja_vida)
+        return json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8'
+
+    def listing(self, id_tipo, page, size):
+        ids = listing_ids(id_tipo, self.listing_size)[(page - 1) * size:page * size]
+        payload = {'success': True, 'data': [synthetic_listing_item(i) for i in ids]}
+        return json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8'
+
+    def simbolo(self, id_simbolo):
+        if random.Random(f"missing-{id_simbolo}").random() < self.missing_rate:
+            return b'', 'image/png'  # the JNE answers unknown ids with an empty 200
+        return synthetic_simbolo(id_simbolo), 'image/png'
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the JNE
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b'', headers=None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body)
+                stub._record(status, len(body))
+
+            def do_GET(self):
+                if stub.latency or stub.jitter:
+                    time.sleep(max(0.0, random.gauss(stub.latency, stub.jitter)))
+                roll = random.random()
+                if roll < stub.throttle_rate:
+                    return self._send(429, b'Too Many Requests', {'Retry-After': f"{stub.retry_after:g}"})
+                if roll < stub.throttle_rate + stub.error_rate:
+                    return self._send(503, b'Service Unavailable')
+
+                parts = urlsplit(self.path)
+                if parts.path == HOJA_VIDA_PATH:
+                    key = parse_qs(parts.query).get('idHojaVida', [''])[0]
+                    if not key.isdigit():
+                        return self._send(400, b'idHojaVida requerido')
+                    body, content_type = stub.hoja_vida(key)
+                elif parts.path == LISTING_PATH:
+                    query = parse_qs(parts.query)
+                    try:
+                        id_tipo, page, size = (int(query[k][0]) for k in ('idTipoEleccion', 'pagina', 'tamanio'))
+                    except (KeyError, ValueError):
+                        return self._send(400, b'idTipoEleccion, pagina y tamanio requeridos')
+                    if page < 1 or size < 1:
+                        return self._send(400, b'pagina y tamanio deben ser positivos')
+                    body, content_type = stub.listing(id_tipo, page, size)
+                elif parts.path.startswith(SIMBOLO_PATH) and parts.path[len(SIMBOLO_PATH):].isdigit():
+                    body, content_type = stub.simbolo(parts.path[len(SIMBOLO_PATH):])
+                else:
+                    return self._send(404, b'Not Found')
+
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    return self._send(304, b'', {'ETag': etag})
+                self._send(200, body, {'Content-Type': content_type, 'ETag': etag})
+
+            do_HEAD = do_GET
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def write_candidates(path, count, base_url, first_id=300000):
+    with open(path, 'w', encoding='utf-8') as f:
+        for id_hoja_vida in range(first_id, first_id + count):
+            f.write(json.dumps(synthetic_candidate(id_hoja_vida, base_url), ensure_ascii=False) + '\n')
+    return path
+
+
+# --- Benchmarks (each runs in a child process) ---
+
+def bench_fetch(opts):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from extract_JNE import fetch_candidate_data
+    from jne_client import TokenBucket, make_session
+
+    urls = [hoja_vida_url(i, opts['url']) for i in range(300000, 300000 + opts['candidates'])]
+    session, limiter = make_session(opts['workers']), TokenBucket(opts['rate'])
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=opts['workers']) as pool:
+        results = list(pool.map(lambda url: fetch_candidate_data(url, session, limiter), urls))
+    seconds = time.perf_counter() - start
+    failed = sum(1 for r in results if r is None)
+    return {'candidates': len(urls), 'seconds': seconds, 'candidates_per_s': len(urls) / seconds,
+            'failed': failed}
+
+
+def bench_extract(opts):
+    from extract_JNE import extract_relevant_fields
+    from jne_fields import extract_hoja_vida
+
+    payloads = [synthetic_hoja_vida(i) for i in range(300000, 300000 + opts['candidates'])]
+    start = time.perf_counter()
+    rows = [extract_relevant_fields(p) for p in payloads]
+    seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    extract_hoja_vida.batch(payloads)
+    batch_seconds = time.perf_counter() - start
+    return {'records': len(rows), 'seconds': seconds, 'records_per_s': len(rows) / seconds,
+            'batch_records_per_s': len(rows) / batch_seconds,
+            'payload_bytes_avg': sum(len(json.dumps(p)) for p in payloads[:200]) / min(200, len(payloads))}
+
+
+def bench_export(opts):
+    from extract_JNE import extract_relevant_fields
+    from jne_sinks import SinkWriter, open_sinks
+
+    rows = []
+    for i in range(300000, 300000 + opts['candidates']):
+        candidate = synthetic_candidate(i, 'http://stub')
+        rows.append({'Partido': candidate['partido'], 'Persona': candidate['persona'],
+                     'Candidatura': candidate['candidatura'], 'ID_HojaVida': str(i),
+                     **extract_relevant_fields(synthetic_hoja_vida(i))})
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in opts['formats']:
+            start = time.perf_counter()
+            sinks = open_sinks(os.path.join(tmp, f"bench_{fmt}"), [fmt])
+            with SinkWriter(sinks) as writer:
+                for row in rows:
+                    writer.put(row)
+            seconds = time.perf_counter() - start
+            results[fmt] = {'seconds': seconds, 'rows_per_s': len(rows) / seconds,
+                            'bytes': os.path.getsize(sinks[0].path)}
+    return {'rows': len(rows), 'formats': results}
+
+
+def bench_pipeline(opts):
+    import extract_JNE
+
+    with tempfile.TemporaryDirectory() as tmp:
+        candidates = write_candidates(os.path.join(tmp, 'candidates.ndjson'), opts['candidates'], opts['url'])
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            start = time.perf_counter()
+            paths = extract_JNE.main(['--candidates', candidates, '--no-cache', '--no-snapshot',
+                                      '--workers', str(opts['workers']), '--rate', str(opts['rate']),
+                                      '--formats', *opts['formats']])
+            seconds = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+    return {'candidates': opts['candidates'], 'seconds': seconds,
+            'candidates_per_s': opts['candidates'] / seconds, 'outputs': len(paths)}
+
+
+def bench_icons(opts):
+    import download_party_icons_v2 as icons
+    from jne_client import TokenBucket, make_session
+
+    icons.SIMBOLO_URL = opts['url'] + SIMBOLO_PATH + '{}'
+    session, limiter = make_session(1), TokenBucket(opts['rate'])
+    with tempfile.TemporaryDirectory() as tmp:
+        store = icons.abrir_almacen(tmp)
+        start = time.perf_counter()
+        ok = sum(icons.descargar_icono(2800 + n, f"PARTIDO {n}", tmp, store, session, limiter)[0]
+                 for n in range(opts['icons']))
+        seconds = time.perf_counter() - start
+        store.save()
+        start = time.perf_counter()
+        unchanged = sum(icons.descargar_icono(2800 + n, f"PARTIDO {n}", tmp, store, session, limiter)[0]
+                        for n in range(opts['icons']))
+        revalidate_seconds = time.perf_counter() - start
+    return {'icons': opts['icons'], 'stored': ok, 'seconds': seconds, 'icons_per_s': opts['icons'] / seconds,
+            'revalidated': unchanged, 'revalidate_seconds': revalidate_seconds}
+
+
+def bench_discovery(opts):
+    from jne_client import TokenBucket, make_session
+    from jne_discovery import discover, load_candidates
+
+    tipos = list(TIPOS_ELECCION)
+    expected = len(tipos) * opts['listing']
+    session, limiter = make_session(1), TokenBucket(opts['rate'])
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / 'descubiertos.ndjson'
+        start = time.perf_counter()
+        # First run dies halfway through a page, mid-write of a record
+        first = 0
+        for _ in discover(tipos, output, base_url=opts['url'], page_size=opts['page_size'],
+                          session=session, limiter=limiter):
+            first += 1
+            if first >= expected // 2:
+                break
+        with open(output, 'a', encoding='utf-8') as f:
+            f.write('{"id": "4')
+        resumed = sum(1 for _ in discover(tipos, output, base_url=opts['url'], page_size=opts['page_size'],
+                                          session=session, limiter=limiter))
+        seconds = time.perf_counter() - start
+        # A finished run drops its checkpoint: the next one lists again and adds nothing new
+        cleared = not output.with_suffix('.checkpoint.json').exists()
+        rerun = sum(1 for _ in discover(tipos, output, base_url=opts['url'], page_size=opts['page_size'],
+                                        session=session, limiter=limiter))
+        ids = [record['id'] for record in load_candidates(output)]
+    listed = {str(i) for tipo in tipos for i in listing_ids(TIPOS_ELECCION[tipo], opts['listing'])}
+    return {'records': len(ids), 'expected': expected, 'first_run': first, 'resumed': resumed, 'rerun': rerun,
+            'complete': len(ids) == len(set(ids)) == expected and set(ids) == listed and cleared,
+            'seconds': seconds, 'records_per_s': len(ids) / seconds}
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _child(name, opts, queue):
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = globals()[f"bench_{name}"](opts)
+        result['peak_rss_mb'] = _peak_rss_mb()
+        queue.put(result)
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def run_benchmark(name, opts, stub=None):
+    """Run one benchmark in a fresh process; server-side counters are added when a stub is used."""
+    if stub:
+        stub.reset_stats()
+    context = multiprocessing.get_context('fork' if hasattr(os, 'fork') else 'spawn')
+    queue = context.Queue()
+    process = context.Process(target=_child, args=(name, opts, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    if stub and 'error' not in result:
+        stats = stub.stats
+        result['server'] = {'requests': stats['requests'], 'bytes': stats['bytes'], 'status': stats['status']}
+    return result
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPTS_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=SCRIPTS_DIR,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    opts = {'candidates': args.candidates, 'workers': args.workers, 'rate': args.rate,
+            'icons': args.icons, 'formats': args.formats, 'listing': args.listing, 'page_size': args.page_size}
+    stub_opts = {'latency': args.latency, 'jitter': args.jitter, 'error_rate': args.error_rate,
+                 'throttle_rate': args.throttle_rate, 'retry_after': args.retry_after,
+                 'listing_size': args.listing}
+    report = {'created': datetime.now().isoformat(timespec='seconds'), 'commit': _git_commit(),
+              'python': platform.python_version(), 'platform': platform.platform(),
+              'options': opts, 'stub': stub_opts, 'results': {}}
+
+    with StubJNE(fixtures=args.fixtures, **stub_opts) as stub:
+        opts['url'] = stub.url
+        for name in args.only or BENCHMARKS:
+            print(f"Running {name}...", flush=True)
+            result = run_benchmark(name, opts, stub if name in ('fetch', 'pipeline', 'icons', 'discovery') else None)
+            report['results'][name] = result
+            print('  ' + ', '.join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+                                   for k, v in result.items() if not isinstance(v, dict)))
+    opts.pop('url')
+
+    results_dir = Path(args.results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    path = results_dir / f"{datetime.now():%Y%m%d_%H%M%S}-{report['commit'] or 'nogit'}.json"
+    path.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(f"\n[OK] Results saved to {path}")
+    return report
+
+
+def _flatten(data, prefix=''):
+    for key, value in data.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}{key}", value
+
+
+def compare(old_path, new_path):
+    old, new = (json.loads(Path(p).read_text(encoding='utf-8')) for p in (old_path, new_path))
+    print(f"{old.get('commit')} -> {new.get('commit')}\n")
+    before = dict(_flatten(old['results']))
+    for key, value in _flatten(new['results']):
+        if key in before and before[key]:
+            change = (value / before[key] - 1) * 100
+            print(f"{key:<45} {before[key]:>12.4g} {value:>12.4g} {change:>+8.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the JNE pipeline against a local stub server.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def stub_options(command):
+        command.add_argument('--latency', type=float, default=0.02, help="Mean response latency in s (default: %(default)s)")
+        command.add_argument('--jitter', type=float, default=0.005, help="Latency std deviation in s (default: %(default)s)")
+        command.add_argument('--error-rate', type=float, default=0.0, help="Share of 503 responses (default: %(default)s)")
+        command.add_argument('--throttle-rate', type=float, default=0.0, help="Share of 429 responses (default: %(default)s)")
+        command.add_argument('--retry-after', type=float, default=1.0, help="Retry-After sent with 429s (default: %(default)s)")
+        command.add_argument('--listing', type=int, default=250,
+                             help="Candidates the listing returns per election type (default: %(default)s)")
+        command.add_argument('--fixtures', default=None,
+                             help="ResponseCache directory with recorded hoja-vida responses (e.g. scripts/.jne_cache)")
+
+    bench = commands.add_parser('run', help="Run the benchmarks and save the results")
+    stub_options(bench)
+    bench.add_argument('--only', nargs='+', choices=BENCHMARKS, help="Benchmarks to run (default: all)")
+    bench.add_argument('--candidates', type=int, default=2000, help="Synthetic candidates (default: %(default)s)")
+    bench.add_argument('--icons', type=int, default=100, help="Party symbols to download (default: %(default)s)")
+    bench.add_argument('--workers', type=int, default=16, help="Fetch workers (default: %(default)s)")
+    bench.add_argument('--rate', type=float, default=0, help="Client rate limit, 0 disables (default: %(default)s)")
+    bench.add_argument('--page-size', type=int, default=40, help="Listing page size for discovery (default: %(default)s)")
+    bench.add_argument('--formats', nargs='+', default=['ndjson', 'csv', 'xlsx'],
+                       help="Export formats to time (default: %(default)s)")
+    bench.add_argument('--results-dir', default=str(RESULTS_DIR), help="Where results go (default: %(default)s)")
+
+    cmp = commands.add_parser('compare', help="Compare two result files")
+    cmp.add_argument('old')
+    cmp.add_argument('new')
+
+    serve = commands.add_parser('serve', help="Run the stub server in the foreground")
+    stub_options(serve)
+    serve.add_argument('--port', type=int, default=8800, help="Port (default: %(default)s)")
+    serve.add_argument('--write-candidates', default=None, help="Write a candidates NDJSON pointing at the stub")
+    serve.add_argument('--candidates', type=int, default=1000, help="Candidates to write (default: %(default)s)")
+
+    args = parser.parse_args(argv)
+    if args.command == 'compare':
+        return compare(args.old, args.new)
+    if args.command == 'run':
+        return run(args)
+
+    stub = StubJNE(port=args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                   throttle_rate=args.throttle_rate, retry_after=args.retry_after, fixtures=args.fixtures,
+                   listing_size=args.listing)
+    if args.write_candidates:
+        write_candidates(args.write_candidates, args.candidates, stub.url)
+        print(f"[OK] {args.candidates} candidates written to {args.write_candidates}")
+    print(f"[OK] Stub JNE listening on {stub.url} (Ctrl+C to stop)")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""On-disk cache of raw JNE hoja-de-vida responses.
+
+Bodies are stored content-addressed (objects/<sha[:2]>/<sha>.json) and an
+index.json maps each idHojaVida to its current object plus the validators
+(ETag / Last-Modified) needed for conditional revalidation.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / '.jne_cache'
+DEFAULT_TTL = 24 * 3600          # seconds an entry is served without revalidation
+DEFAULT_MAX_AGE = 30 * 24 * 3600  # entries untouched for longer are evicted
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class ResponseCache:
+    """Thread-safe raw JSON cache keyed by idHojaVida."""
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL,
+                 max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.root = Path(root)
+        self.objects = self.root / 'objects'
+        self.index_path = self.root / 'index.json'
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _object_path(self, digest):
+        return self.objects / digest[:2] / f"{digest}.json"
+
+    def get(self, key):
+        """Index entry for ``key`` or None."""
+        with self.lock:
+            entry = self.index.get(str(key))
+            return dict(entry) if entry else None
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry['fetched_at'] < self.ttl
+
+    def conditional_headers(self, entry):
+        """If-None-Match / If-Modified-Since headers for a cached entry."""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def load(self, key):
+        """Parsed JSON body cached for ``key`` or None."""
+        entry = self.get(key)
+        if not entry:
+            return None
+        try:
+            with open(self._object_path(entry['sha256']), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            with self.lock:
+                self.index.pop(str(key), None)
+            return None
+
+    def store(self, key, body, headers=None, url=None):
+        """Save a raw response body (bytes) and its validators."""
+        headers = headers or {}
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f'.{threading.get_ident()}.tmp')
+            tmp.write_bytes(body)
+            os.replace(tmp, path)
+        with self.lock:
+            self.index[str(key)] = {
+                'sha256': digest,
+                'size': len(body),
+                'url': url,
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'fetched_at': time.time(),
+            }
+        return digest
+
+    def touch(self, key):
+        """Mark an entry as revalidated (e.g. after a 304)."""
+        with self.lock:
+            entry = self.index.get(str(key))
+            if entry:
+                entry['fetched_at'] = time.time()
+
+    def keys(self):
+        with self.lock:
+            return list(self.index)
+
+    def evict(self):
+        """Drop expired entries, then the oldest ones until under max_bytes.
+
+        Objects no longer referenced by any entry are deleted from disk.
+        """
+        now = time.time()
+        with self.lock:
+            for key in [k for k, e in self.index.items() if now - e['fetched_at'] > self.max_age]:
+                del self.index[key]
+
+            live = {}
+            for key, entry in self.index.items():
+                live.setdefault(entry['sha256'], entry['size'])
+            total = sum(live.values())
+            for key, entry in sorted(self.index.items(), key=lambda kv: kv[1]['fetched_at']):
+                if total <= self.max_bytes:
+                    break
+                del self.index[key]
+                if not any(e['sha256'] == entry['sha256'] for e in self.index.values()):
+                    total -= live.pop(entry['sha256'])
+
+            referenced = {e['sha256'] for e in self.index.values()}
+
+        removed = 0
+        if self.objects.exists():
+            for path in self.objects.glob('*/*.json'):
+                if path.stem not in referenced:
+                    path.unlink()
+                    removed += 1
+        return removed
+
+    def save(self):
+        """Persist the index atomically."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            data = json.dumps(self.index, indent=2, sort_keys=True)
+        tmp = self.index_path.with_suffix('.tmp')
+        tmp.write_text(data, encoding='utf-8')
+        os.replace(tmp, self.index_path)
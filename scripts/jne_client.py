@@ -0,0 +1,119 @@
+"""Shared HTTP plumbing for the JNE scraping scripts.
+
+Pooled requests.Session, a thread-safe token-bucket rate limiter and
+retries with jittered exponential backoff on 429/5xx.
+"""
+import random
+import threading
+import time
+import warnings
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Suppress SSL warnings (JNE endpoints are queried with verify=False)
+warnings.filterwarnings('ignore', message='Unverified HTTPS request')
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+DEFAULT_WORKERS = 8
+DEFAULT_RATE = 4.0  # requests per second tolerated by the JNE
+
+
+class TokenBucket:
+    """Blocking token bucket shared by every worker thread."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(pool_size=DEFAULT_WORKERS):
+    """Create a session whose connection pool matches the worker count."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.verify = False
+    return session
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """Full-jitter exponential backoff for the given (0-based) attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _retry_after(response):
+    """Seconds requested by a Retry-After header, if any."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def request_with_retries(session, method, url, limiter=None, retries=4, timeout=10,
+                         backoff=0.5, max_backoff=30.0, span=None, **kwargs):
+    """Send ``method`` to ``url`` honouring the rate limiter, retrying 429/5xx and network errors.
+
+    Returns the last response (which may still be an error status once the
+    retries are exhausted) and re-raises the last network error. A
+    jne_trace span, if given, gets the retry count, rate-limiter wait and
+    backoff sleeps.
+    """
+    for attempt in range(retries + 1):
+        if span is not None:
+            span.attempt(attempt)
+        if limiter is not None:
+            start = time.perf_counter()
+            limiter.acquire()
+            if span is not None:
+                span.add('wait', time.perf_counter() - start)
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == retries:
+                raise
+            delay = backoff_delay(attempt, backoff, max_backoff)
+            if span is not None:
+                span.add('backoff', delay)
+            time.sleep(delay)
+            continue
+
+        if response.status_code not in RETRY_STATUS or attempt == retries:
+            return response
+
+        delay = _retry_after(response)
+        if delay is None:
+            delay = backoff_delay(attempt, backoff, max_backoff)
+        response.close()
+        delay = min(delay, max_backoff)
+        if span is not None:
+            span.add('backoff', delay)
+        time.sleep(delay)
+    return response
+
+
+def get_with_retries(session, url, limiter=None, **kwargs):
+    """GET with request_with_retries()."""
+    return request_with_retries(session, 'GET', url, limiter=limiter, **kwargs)
@@ -0,0 +1,279 @@
+"""Discover every idHojaVida on the JNE platform, by election type and party.
+
+Pages through the candidate listing endpoint for each election type and
+streams one NDJSON record per candidate. A checkpoint file records the
+next page per election type, so an interrupted run resumes where it
+stopped instead of starting over. It is dropped once a run completes, so
+the next run lists everything again and appends only IDs not seen yet.
+
+The listing path and page parameters are kept as constants because the
+JNE changes them between processes; point --base-url at a local stub to
+run offline (jne_bench.py serve answers the listing with synthetic pages).
+
+Usage:
+    python jne_discovery.py --tipos presidencial senado diputados --catalogue
+    python extract_JNE.py --candidates candidatos_descubiertos.ndjson
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+
+import requests
+
+from jne_client import DEFAULT_RATE, TokenBucket, get_with_retries, make_session
+
+API_BASE = 'https://apiplataformaelectoral8.jne.gob.pe'
+HOJA_VIDA_PATH = '/api/v1/candidato/hoja-vida'
+LISTING_PATH = '/api/v1/candidato/listado'
+
+# idTipoEleccion used by the JNE platform
+TIPOS_ELECCION = {
+    'presidencial': 1,
+    'senado': 20,
+    'diputados': 15,
+    'parlamento_andino': 3,
+}
+
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_OUTPUT = 'candidatos_descubiertos.ndjson'
+CATALOGUE = Path(__file__).resolve().parent / 'JNE_APIendpoints.xlsx'
+
+# The listing has used different key names over time; first match wins
+_ID_KEYS = ('idHojaVida', 'IdHojaVida', 'idHojaDeVida')
+_PARTY_KEYS = ('strOrganizacionPolitica', 'organizacionPolitica', 'partido')
+_POSITION_KEYS = ('strCargo', 'cargo', 'candidatura')
+_NAME_KEYS = ('strNombreCompleto', 'nombreCompleto')
+
+
+def _first(item, keys, default=''):
+    for key in keys:
+        value = item.get(key)
+        if value not in (None, ''):
+            return value
+    return default
+
+
+def hoja_vida_url(id_hoja_vida, base_url=API_BASE):
+    return f"{base_url}{HOJA_VIDA_PATH}?idHojaVida={id_hoja_vida}"
+
+
+def normalize_listing_item(item, tipo, base_url=API_BASE):
+    """Turn a listing row into a candidates_data-shaped record."""
+    id_hoja_vida = _first(item, _ID_KEYS, None)
+    if id_hoja_vida is None:
+        return None
+    persona = _first(item, _NAME_KEYS) or ' '.join(
+        str(item.get(k, '')) for k in ('strNombres', 'strApellidoPaterno', 'strApellidoMaterno')
+    ).strip()
+    return {
+        'id': str(id_hoja_vida),
+        'tipo_eleccion': tipo,
+        'partido': _first(item, _PARTY_KEYS),
+        'persona': persona,
+        'candidatura': _first(item, _POSITION_KEYS),
+        'api': hoja_vida_url(id_hoja_vida, base_url),
+    }
+
+
+def _page_items(payload):
+    """List of rows from a listing response, whatever its envelope."""
+    if isinstance(payload, list):
+        return payload
+    for key in ('data', 'items', 'resultado'):
+        if isinstance(payload.get(key), list):
+            return payload[key]
+    return []
+
+
+class Checkpoint:
+    """Next page to fetch per election type, persisted atomically."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            self.state = json.loads(self.path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            self.state = {}
+
+    def next_page(self, tipo):
+        return self.state.get(tipo, {}).get('next_page', 1)
+
+    def is_done(self, tipo):
+        return self.state.get(tipo, {}).get('done', False)
+
+    def advance(self, tipo, next_page, done=False):
+        self.state[tipo] = {'next_page': next_page, 'done': done}
+        self._save()
+
+    def clear(self, tipos):
+        """Forget ``tipos`` once a run has finished them all, so the next run lists them again."""
+        for tipo in tipos:
+            self.state.pop(tipo, None)
+        if self.state:
+            self._save()
+        else:
+            self.path.unlink(missing_ok=True)
+
+    def _save(self):
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.state, indent=2), encoding='utf-8')
+        os.replace(tmp, self.path)
+
+
+def load_candidates(path):
+    """Read discovered records back from an NDJSON file.
+
+    A last line without its newline is what a crash mid-write leaves
+    behind; it is skipped if it doesn't parse.
+    """
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                if line.endswith('\n'):
+                    raise
+    return records
+
+
+def truncate_partial_line(path):
+    """Cut a trailing line without newline off ``path``; returns the bytes removed."""
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            step = min(4096, end)
+            f.seek(end - step)
+            block = f.read(step)
+            newline = block.rfind(b'\n')
+            if newline >= 0:
+                end = end - step + newline + 1
+                break
+            end -= step
+        if end < size:
+            f.truncate(end)
+        return size - end
+
+
+def load_catalogue(xlsx_path=CATALOGUE):
+    """Records from the hand-maintained endpoint catalogue (Partido/Persona/Candidatura/API)."""
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(xlsx_path, read_only=True)
+    records = []
+    for sheet in workbook.worksheets:
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(h).strip().lower() if h else '' for h in next(rows, [])]
+        if 'api' not in header:
+            continue
+        for row in rows:
+            item = dict(zip(header, row))
+            if not item.get('api'):
+                continue
+            records.append({
+                'id': str(item['api']).split('=')[-1],
+                'tipo_eleccion': sheet.title,
+                'partido': item.get('partido') or '',
+                'persona': item.get('persona') or '',
+                'candidatura': item.get('candidatura') or '',
+                'api': item['api'],
+            })
+    workbook.close()
+    return records
+
+
+def discover(tipos, output=DEFAULT_OUTPUT, checkpoint_path=None, base_url=API_BASE,
+             page_size=DEFAULT_PAGE_SIZE, session=None, limiter=None, seed=()):
+    """Page through the listing for each election type, appending new records to ``output``.
+
+    Yields every newly written record. Safe to call again after a crash:
+    finished election types are skipped and the rest resume from the
+    checkpointed page, with already-written IDs deduplicated. ``seed``
+    records (e.g. from load_catalogue) are written first.
+    """
+    output = Path(output)
+    checkpoint = Checkpoint(checkpoint_path or output.with_suffix('.checkpoint.json'))
+    session = session or make_session()
+    if output.exists() and truncate_partial_line(output):
+        print(f"[!] Dropped a partially written record at the end of {output}")
+    seen = {r['id'] for r in load_candidates(output)} if output.exists() else set()
+
+    with open(output, 'a', encoding='utf-8') as out:
+        for record in seed:
+            if record['id'] not in seen:
+                seen.add(record['id'])
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                yield record
+
+        for tipo in tipos:
+            if checkpoint.is_done(tipo):
+                continue
+            page = checkpoint.next_page(tipo)
+            while True:
+                params = {'idTipoEleccion': TIPOS_ELECCION[tipo], 'pagina': page, 'tamanio': page_size}
+                response = get_with_retries(session, f"{base_url}{LISTING_PATH}",
+                                            limiter=limiter, params=params)
+                response.raise_for_status()
+                items = _page_items(response.json())
+
+                for item in items:
+                    record = normalize_listing_item(item, tipo, base_url)
+                    if record is None or record['id'] in seen:
+                        continue
+                    seen.add(record['id'])
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    yield record
+                # Records hit the disk before the checkpoint moves past their page
+                out.flush()
+                os.fsync(out.fileno())
+
+                done = len(items) < page_size
+                checkpoint.advance(tipo, page + 1, done)
+                if done:
+                    break
+                page += 1
+
+    # The checkpoint only covers resuming an interrupted run: once every type
+    # is complete, a later run walks the listing again for new registrations
+    checkpoint.clear(tipos)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Discover JNE hojas de vida by election type.")
+    parser.add_argument('--tipos', nargs='+', default=list(TIPOS_ELECCION), choices=list(TIPOS_ELECCION))
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--checkpoint', default=None,
+                        help="Checkpoint file (default: <output>.checkpoint.json)")
+    parser.add_argument('--base-url', default=API_BASE,
+                        help="JNE API base URL, e.g. a local stub server")
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE)
+    parser.add_argument('--catalogue', action='store_true',
+                        help=f"Also include the hoja-vida URLs listed in {CATALOGUE.name}")
+    args = parser.parse_args(argv)
+
+    print(f"Discovering candidates: {', '.join(args.tipos)}")
+    limiter = TokenBucket(args.rate)
+    seed = load_catalogue() if args.catalogue else ()
+    count = 0
+    try:
+        for record in discover(args.tipos, args.output, args.checkpoint, args.base_url,
+                               args.page_size, limiter=limiter, seed=seed):
+            count += 1
+            if count % 500 == 0:
+                print(f"  ... {count} new records ({record['tipo_eleccion']})")
+    except requests.exceptions.RequestException as e:
+        print(f"\n[ERROR] {e}")
+        print(f"[!] Stopped after {count} new records; re-run to resume from the checkpoint")
+        return count
+
+    print(f"\n[OK] {count} new records written to {args.output}")
+    return count
+
+
+if __name__ == "__main__":
+    main()
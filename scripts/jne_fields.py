@@ -0,0 +1,202 @@
+"""Declarative mapping from a JNE hoja de vida payload to output columns.
+
+Each column is one spec entry in HOJA_VIDA_FIELDS. compile_fields() turns
+the whole spec into a single generated Python function once (shared path
+lookups hoisted, templates turned into f-strings), so
+extracting a record costs no per-field dispatch. Adding a column is one
+more entry in the list.
+
+    extract = compile_fields(HOJA_VIDA_FIELDS)
+    row = extract(payload)                  # one dict per hoja de vida
+    columns = extract.batch(payloads)       # {column: [values...]}
+"""
+import string
+from collections import namedtuple
+
+_formatter = string.Formatter()
+
+# Spec entries. ``path`` is a dotted path from the payload root.
+Field = namedtuple('Field', 'name path default transform', defaults=('', None))
+Template = namedtuple('Template', 'name path template')
+Join = namedtuple('Join', 'name path template values sep limit', defaults=(None, ' | ', None))
+Aggregate = namedtuple('Aggregate', 'name path how key', defaults=(None,))
+First = namedtuple('First', 'name path key default', defaults=('',))
+
+
+def _fstring(template, item, convert=lambda key, expr: expr):
+    """Turn a named template into f-string source reading keys from ``item``."""
+    parts = []
+    for literal, name, _, _ in _formatter.parse(template):
+        literal = literal.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(literal.replace('{', '{{').replace('}', '}}'))
+        if name:
+            if not name.isidentifier():
+                raise ValueError(f"Template key must be an identifier: {name!r}")
+            parts.append('{' + convert(name, f"{item}.get('{name}', '')") + '}')
+    return 'f"' + ''.join(parts) + '"'
+
+
+class _Codegen:
+    """Emit the body of one extractor function for a whole spec."""
+
+    def __init__(self):
+        self.lines = []
+        self.consts = {}
+        self.nodes = {}
+
+    def const(self, value):
+        name = f"_c{len(self.consts)}"
+        self.consts[name] = value
+        return name
+
+    def _var(self, path, expr):
+        var = f"_n{len(self.nodes)}"
+        self.nodes[path] = var
+        self.lines.append(f"{var} = {expr}")
+        return var
+
+    def _lookup(self, path):
+        *head, key = path.split('.')
+        parent = self.dict_node('.'.join(head)) if head else 'data'
+        return f"{parent}.get({key!r})"
+
+    def dict_node(self, path):
+        """Local variable holding the object at ``path``, {} if it is not a dict."""
+        key = ('dict', path)
+        if key not in self.nodes:
+            var = self._var(key, self._lookup(path))
+            self.lines.append(f"if {var}.__class__ is not dict: {var} = _EMPTY")
+        return self.nodes[key]
+
+    def value(self, path):
+        """Local variable holding the raw value at ``path`` (None if absent)."""
+        if path not in self.nodes:
+            self._var(path, self._lookup(path))
+        return self.nodes[path]
+
+    def render(self, template, item, values=None):
+        if not values:
+            return _fstring(template, item)
+        return _fstring(template, item,
+                        lambda key, expr: f"{self.const(values[key])}({expr})" if key in values else expr)
+
+    def expression(self, entry):
+        if isinstance(entry, Field):
+            node = self.value(entry.path)
+            value = f"({self.const(entry.default)} if {node} is None else {node})"
+            return f"{self.const(entry.transform)}({value})" if entry.transform else value
+
+        if isinstance(entry, Template):
+            return self.render(entry.template, self.dict_node(entry.path))
+
+        items = f"({self.value(entry.path)} or ())"
+        if isinstance(entry, Join):
+            if entry.limit is not None:
+                items = f"{items}[:{int(entry.limit)}]"
+            return f"{entry.sep!r}.join([{self.render(entry.template, '_i', entry.values)} for _i in {items}])"
+
+        if isinstance(entry, Aggregate):
+            if entry.how == 'count':
+                return f"len({items})"
+            if entry.how == 'flag':
+                return f"('SÍ' if {items} else 'NO')"
+            if entry.how == 'sum':
+                return f"sum([float(_i.get({entry.key!r}, 0) or 0) for _i in {items}])"
+            raise ValueError(f"Unknown aggregate: {entry.how!r}")
+
+        if isinstance(entry, First):
+            default = self.const(entry.default)
+            return f"({items}[0].get({entry.key!r}, {default}) if {items} else {default})"
+
+        raise TypeError(f"Unknown field spec: {entry!r}")
+
+
+def _compile(spec):
+    gen = _Codegen()
+    values = [(entry.name, gen.expression(entry)) for entry in spec]
+    body = gen.lines + ['return {'] + [f"    {name!r}: {expr}," for name, expr in values] + ['}']
+    source = 'def extract(data):\n' + ''.join(f"    {line}\n" for line in body)
+    namespace = {'_EMPTY': {}, **gen.consts}
+    exec(compile(source, '<jne_fields>', 'exec'), namespace)
+    return namespace['extract'], source
+
+
+class CompiledFields:
+    """Callable extractor built by compile_fields()."""
+
+    def __init__(self, spec):
+        self.columns = [entry.name for entry in spec]
+        self.extract, self.source = _compile(spec)
+
+    def __call__(self, payload):
+        return self.extract(payload)
+
+    def batch(self, payloads):
+        """Normalize many payloads at once into column lists."""
+        rows = list(map(self.extract, payloads))
+        return {name: [row[name] for row in rows] for name in self.columns}
+
+    def batch_frame(self, payloads):
+        """Same as batch() but as a pandas DataFrame (pandas imported lazily)."""
+        import pandas as pd
+
+        return pd.DataFrame(self.batch(payloads), columns=self.columns)
+
+
+def compile_fields(spec):
+    return CompiledFields(spec)
+
+
+def _sexo(code):
+    return 'FEMENINO' if code == '2' else 'MASCULINO' if code == '1' else ''
+
+
+def _concluido(flag):
+    return 'Concluido' if flag == 'SI' else 'En curso'
+
+
+HOJA_VIDA_FIELDS = [
+    # datoGeneral
+    Field('nombres', 'datoGeneral.nombres'),
+    Field('apellido_paterno', 'datoGeneral.apellidoPaterno'),
+    Field('apellido_materno', 'datoGeneral.apellidoMaterno'),
+    Field('dni', 'datoGeneral.numeroDocumento'),
+    Field('sexo', 'datoGeneral.sexo', transform=_sexo),
+    Field('fecha_nacimiento', 'datoGeneral.feNacimiento'),
+    Template('lugar_nacimiento', 'datoGeneral', '{naciDistrito} - {naciProvincia} - {naciDepartamento}'),
+    Template('domicilio', 'datoGeneral', '{domiDistrito} - {domiProvincia} - {domiDepartamento}'),
+    Field('estado_candidatura', 'datoGeneral.estado'),
+
+    # formacionAcademica
+    Join('educacion_universitaria', 'formacionAcademica.educacionUniversitaria',
+         '{universidad} - {carreraUni} ({concluidoEduUni})', values={'concluidoEduUni': _concluido}),
+    Join('posgrados', 'formacionAcademica.educacionPosgrado',
+         '{txCenEstudioPosgrado} - {txEspecialidadPosgrado}'),
+
+    # experienciaLaboral / trayectoria
+    Join('experiencia_laboral', 'experienciaLaboral',
+         '{ocupacionProfesion} en {centroTrabajo} ({anioTrabajoDesde}-{anioTrabajoHasta})'),
+    Join('cargos_partidarios', 'trayectoria.cargoPartidario',
+         '{cargoPartidario} en {orgPolCargoPartidario} ({anioCargoPartiDesde}-{anioCargoPartiHasta})'),
+    Join('cargos_eleccion_previos', 'trayectoria.cargoEleccion',
+         '{cargoEleccion} por {orgPolCargoElec} ({anioCargoElecDesde}-{anioCargoElecHasta})'),
+
+    # sentencias
+    Aggregate('tiene_sentencias_penales', 'sentenciaPenal', 'flag'),
+    Aggregate('num_sentencias_penales', 'sentenciaPenal', 'count'),
+    Join('detalle_sentencias_penales', 'sentenciaPenal', '{delito} - {fallo}'),
+    Aggregate('tiene_sentencias_civiles', 'sentenciaObliga', 'flag'),
+    Aggregate('num_sentencias_civiles', 'sentenciaObliga', 'count'),
+
+    # declaracionJurada (latest income declaration first)
+    First('año_ingresos', 'declaracionJurada.ingreso', 'anioIngresos'),
+    First('ingreso_total', 'declaracionJurada.ingreso', 'totalIngresos', 0),
+    First('ingreso_publico', 'declaracionJurada.ingreso', 'remuBrutaPublico', 0),
+    First('ingreso_privado', 'declaracionJurada.ingreso', 'remuBrutaPrivado', 0),
+    Aggregate('num_bienes_inmuebles', 'declaracionJurada.bienInmueble', 'count'),
+    Aggregate('valor_total_inmuebles', 'declaracionJurada.bienInmueble', 'sum', 'autoavaluo'),
+    Aggregate('num_vehiculos', 'declaracionJurada.bienMueble', 'count'),
+    Aggregate('valor_total_vehiculos', 'declaracionJurada.bienMueble', 'sum', 'valor'),
+]
+
+extract_hoja_vida = compile_fields(HOJA_VIDA_FIELDS)
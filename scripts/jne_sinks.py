@@ -0,0 +1,249 @@
+"""Streaming output sinks for extract_JNE.py.
+
+Each extracted row is handed to every sink as soon as it is ready, on a
+background writer thread, so exporting overlaps with fetching and nothing
+is held in memory. NDJSON and CSV are flushed per batch, so even a killed
+process leaves every batch written so far. Parquet writes one row group
+per batch but its footer only on close, and the XLSX workbook is saved
+from the write-only buffer on close: both are complete after an
+interrupted (Ctrl+C) run, which still closes the sinks, but not after
+the process is killed.
+
+An NDJSON export can be turned into the other formats later without
+touching the JNE again:
+
+    python jne_sinks.py candidatos_jne.ndjson --formats csv xlsx
+"""
+import argparse
+import csv
+import json
+import queue
+import threading
+from pathlib import Path
+
+from jne_trace import NULL_TRACER
+
+COLUMN_ORDER = [
+    'Partido', 'Candidatura', 'Persona',
+    'nombres', 'apellido_paterno', 'apellido_materno',
+    'dni', 'sexo', 'fecha_nacimiento', 'lugar_nacimiento', 'domicilio',
+    'estado_candidatura',
+    'educacion_universitaria', 'posgrados',
+    'experiencia_laboral', 'cargos_partidarios', 'cargos_eleccion_previos',
+    'tiene_sentencias_penales', 'num_sentencias_penales', 'detalle_sentencias_penales',
+    'tiene_sentencias_civiles', 'num_sentencias_civiles',
+    'año_ingresos', 'ingreso_total', 'ingreso_publico', 'ingreso_privado',
+    'num_bienes_inmuebles', 'valor_total_inmuebles',
+    'num_vehiculos', 'valor_total_vehiculos',
+    'ID_HojaVida'
+]
+
+INT_COLUMNS = {'num_sentencias_penales', 'num_sentencias_civiles', 'num_bienes_inmuebles', 'num_vehiculos'}
+FLOAT_COLUMNS = {'ingreso_total', 'ingreso_publico', 'ingreso_privado',
+                 'valor_total_inmuebles', 'valor_total_vehiculos'}
+
+FORMATS = ('ndjson', 'csv', 'xlsx', 'parquet')
+DEFAULT_FORMATS = ('ndjson', 'csv', 'xlsx')
+
+
+def _coerce(column, value):
+    """Typed value for columnar formats (empty rows stay null)."""
+    if value is None or value == '':
+        return None
+    if column in INT_COLUMNS:
+        return int(value)
+    if column in FLOAT_COLUMNS:
+        return float(value)
+    return str(value)
+
+
+class NdjsonSink:
+    """JSON lines, one object per row; an existing file is replaced like the other sinks do."""
+
+    extension = 'ndjson'
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.file = open(self.path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class CsvSink:
+    """Same layout as the historical candidatos_jne_*.csv exports."""
+
+    extension = 'csv'
+
+    def __init__(self, path, columns=COLUMN_ORDER):
+        self.path = Path(path)
+        self.file = open(self.path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.DictWriter(self.file, fieldnames=columns, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            # Numeric columns keep the float formatting of the old pandas export
+            self.writer.writerow({
+                col: float(value) if col in FLOAT_COLUMNS and value not in (None, '') else value
+                for col, value in row.items()
+            })
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class XlsxSink:
+    """openpyxl write-only workbook: rows are streamed, not kept as cells."""
+
+    extension = 'xlsx'
+
+    def __init__(self, path, columns=COLUMN_ORDER):
+        from openpyxl import Workbook
+
+        self.path = Path(path)
+        self.columns = columns
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet('Sheet1')
+        self.sheet.append(columns)
+
+    def write(self, rows):
+        for row in rows:
+            self.sheet.append([row.get(col) for col in self.columns])
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+class ParquetSink:
+    """Parquet file written one row group per SinkWriter batch; the footer is written on close."""
+
+    extension = 'parquet'
+
+    def __init__(self, path, columns=COLUMN_ORDER):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.path = Path(path)
+        self.columns = columns
+        self.schema = pa.schema([
+            (col, pa.int64() if col in INT_COLUMNS else pa.float64() if col in FLOAT_COLUMNS else pa.string())
+            for col in columns
+        ])
+        self.writer = pq.ParquetWriter(self.path, self.schema, compression='zstd')
+
+    def write(self, rows):
+        if not rows:
+            return
+        arrays = {col: [_coerce(col, row.get(col)) for row in rows] for col in self.columns}
+        self.writer.write_table(self.pa.table(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+SINKS = {sink.extension: sink for sink in (NdjsonSink, CsvSink, XlsxSink, ParquetSink)}
+
+
+def open_sinks(basename, formats=DEFAULT_FORMATS):
+    """One sink per format, writing to ``<basename>.<ext>``."""
+    return [SINKS[fmt](f"{basename}.{fmt}") for fmt in formats]
+
+
+class SinkWriter:
+    """Fan rows out to several sinks from a background thread.
+
+    Use as a context manager; rows put() after entering are written in
+    batches while the caller keeps fetching and extracting.
+    """
+
+    _DONE = object()
+
+    def __init__(self, sinks, batch_size=200, max_pending=10000, tracer=NULL_TRACER):
+        self.sinks = sinks
+        self.tracer = tracer
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(target=self._run, name='sink-writer', daemon=True)
+        self.error = None
+        self.rows = 0
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def put(self, row):
+        if self.error:
+            raise self.error
+        self.queue.put(row)
+
+    def _run(self):
+        batch = []
+        while True:
+            item = self.queue.get()
+            if item is not self._DONE:
+                batch.append(item)
+            if self.error:
+                batch = []
+            elif batch and (item is self._DONE or len(batch) >= self.batch_size or self.queue.empty()):
+                try:
+                    for sink in self.sinks:
+                        with self.tracer.stage(f'export_{sink.extension}'):
+                            sink.write(batch)
+                    self.rows += len(batch)
+                except Exception as e:
+                    self.error = e
+                batch = []
+            if item is self._DONE:
+                return
+
+    def close(self):
+        """Drain the queue and close every sink, even after an error."""
+        if self.thread.is_alive():
+            self.queue.put(self._DONE)
+            self.thread.join()
+        for sink in self.sinks:
+            with self.tracer.stage(f'export_{sink.extension}'):
+                sink.close()
+        if self.error:
+            raise self.error
+
+
+def convert(source, basename=None, formats=('csv', 'xlsx')):
+    """Re-export the rows of an NDJSON file to ``<basename>.<fmt>``; returns (rows, paths)."""
+    source = Path(source)
+    basename = basename or str(source.with_suffix(''))
+    sinks = open_sinks(basename, [fmt for fmt in formats if fmt != 'ndjson'])
+    with SinkWriter(sinks) as writer, open(source, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                writer.put(json.loads(line))
+    return writer.rows, [sink.path for sink in sinks]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-export an extract_JNE.py NDJSON file to other formats.")
+    parser.add_argument('source', help="NDJSON written by extract_JNE.py")
+    parser.add_argument('--output', default=None, help="Output basename (default: the source without .ndjson)")
+    parser.add_argument('--formats', nargs='+', choices=[f for f in FORMATS if f != 'ndjson'], default=['csv', 'xlsx'],
+                        help="Formats to write (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    rows, paths = convert(args.source, args.output, args.formats)
+    for path in paths:
+        print(f"[OK] {path}: {rows} rows")
+    return paths
+
+
+if __name__ == "__main__":
+    main()
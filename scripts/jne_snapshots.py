@@ -0,0 +1,408 @@
+"""Versioned snapshots of JNE extractions with per-section hashes.
+
+Each extract_JNE.py run is recorded as one snapshot: for every hoja de vida
+a hash of each section (datoGeneral, declaracionJurada.ingreso,
+sentenciaPenal, ...) plus a hash over all of them. Section contents are
+stored once, content-addressed, so a snapshot only costs its hash table and
+history queries can still show what a section looked like.
+
+    .jne_snapshots/
+        snapshots/<YYYYmmdd_HHMMSS>.json   {"candidates": {id: hash}, "names": {id: name}}
+        objects/<h[:2]>/<h>.json           section contents, and each candidate's
+                                           {section: hash} table under its own hash
+        stages.json                        last snapshot consumed by each downstream stage
+
+Comparing two snapshots compares their id -> hash maps and only opens the
+section tables of candidates whose hash differs, so it takes
+milliseconds. Downstream stages (generate_domains.py, or any shell step
+through ``pending``/``mark``) ask which candidates changed in the
+sections they read since they last ran, and skip everything else.
+
+Usage:
+    python jne_snapshots.py list
+    python jne_snapshots.py diff [OLD] [NEW]          # default: previous vs latest
+    python jne_snapshots.py history 245741 --section ingreso --show
+    python jne_snapshots.py take                      # snapshot the response cache as-is
+    python jne_snapshots.py pending images --sections datoGeneral && ... && \\
+        python jne_snapshots.py mark images
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_SNAPSHOT_DIR = Path(__file__).resolve().parent / '.jne_snapshots'
+
+# Top-level keys whose children are versioned as separate sections
+SPLIT_SECTIONS = ('declaracionJurada', 'formacionAcademica', 'trayectoria')
+
+HASH_LENGTH = 20
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def section_name(path):
+    """Section a dotted/tuple payload path belongs to (e.g. ('declaracionJurada', 'ingreso'))."""
+    parts = path.split('.') if isinstance(path, str) else list(path)
+    return '.'.join(parts[:2]) if parts[0] in SPLIT_SECTIONS and len(parts) > 1 else parts[0]
+
+
+def split_sections(payload):
+    """{section name: value} for one hoja de vida payload."""
+    sections = {}
+    for key, value in (payload or {}).items():
+        if key in SPLIT_SECTIONS and isinstance(value, dict):
+            for sub, sub_value in value.items():
+                sections[f"{key}.{sub}"] = sub_value
+        else:
+            sections[key] = value
+    return sections
+
+
+def match_sections(names, wanted):
+    """Sections in ``names`` selected by ``wanted`` (full name or last component, e.g. 'ingreso')."""
+    if not wanted:
+        return set(names)
+    return {name for name in names
+            for w in wanted if name == w or name.rsplit('.', 1)[-1] == w or name.startswith(w + '.')}
+
+
+class SnapshotBuilder:
+    """Collects one extraction; returned by SnapshotStore.begin()."""
+
+    def __init__(self, store, source=None):
+        self.store = store
+        self.source = source
+        self.candidates = {}
+        self.names = {}
+        self.failed = set()
+
+    def add(self, key, payload, name=None):
+        """Record the payload of hoja de vida ``key``; returns ``payload`` unchanged.
+
+        Meant to be mapped over a stream of responses, e.g.
+        ``responses = map(builder.add, ids, responses)``.
+        """
+        key = str(key)
+        if not payload:
+            self.failed.add(key)
+            return payload
+        hashes = {}
+        for section, value in split_sections(payload).items():
+            data = _canonical(value)
+            digest = _digest(data)
+            self.store._put_object(digest, data)
+            hashes[section] = digest
+        data = _canonical(hashes)
+        digest = _digest(data)
+        self.store._put_object(digest, data)
+        self.candidates[key] = digest
+        if name:
+            self.names[key] = name
+        return payload
+
+    def commit(self):
+        """Write the snapshot; returns its id, or None if identical to the latest one.
+
+        Candidates whose download failed keep their entry from the latest snapshot.
+        """
+        latest = self.store.latest()
+        previous = self.store.load(latest) if latest else {'candidates': {}, 'names': {}}
+        candidates = dict(self.candidates)
+        names = dict(self.names)
+        for key in self.failed - candidates.keys():
+            if key in previous['candidates']:
+                candidates[key] = previous['candidates'][key]
+                if key in previous['names']:
+                    names[key] = previous['names'][key]
+        if latest and candidates == previous['candidates']:
+            return None
+        return self.store._write(candidates, names, self.source)
+
+
+class SnapshotStore:
+    """Snapshots directory: hash tables, section objects and stage markers."""
+
+    def __init__(self, root=DEFAULT_SNAPSHOT_DIR):
+        self.root = Path(root)
+        self.objects = self.root / 'objects'
+        self.snapshots = self.root / 'snapshots'
+        self.stages_path = self.root / 'stages.json'
+        self._loaded = {}
+
+    # --- storage ---
+
+    def _object_path(self, digest):
+        return self.objects / digest[:2] / f"{digest}.json"
+
+    def _put_object(self, digest, data):
+        path = self._object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+
+    def section(self, digest):
+        """Stored contents of a section hash."""
+        with open(self._object_path(digest), encoding='utf-8') as f:
+            return json.load(f)
+
+    def sections(self, snapshot_id, key):
+        """{section: hash} of candidate ``key`` in a snapshot ({} if absent)."""
+        digest = self.load(snapshot_id)['candidates'].get(str(key)) if snapshot_id else None
+        return self.section(digest) if digest else {}
+
+    def _write(self, candidates, names, source=None):
+        self.snapshots.mkdir(parents=True, exist_ok=True)
+        snapshot_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        existing = set(self.ids())
+        base, n = snapshot_id, 1
+        while snapshot_id in existing:
+            snapshot_id = f"{base}_{n}"
+            n += 1
+        snapshot = {'id': snapshot_id, 'created': time.time(), 'source': source,
+                    'candidates': dict(sorted(candidates.items())), 'names': names}
+        path = self.snapshots / f"{snapshot_id}.json"
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, path)
+        self._loaded[snapshot_id] = snapshot
+        return snapshot_id
+
+    def begin(self, source=None):
+        return SnapshotBuilder(self, source)
+
+    # --- lookup ---
+
+    def ids(self):
+        """Snapshot ids, oldest first (ids sort chronologically)."""
+        if not self.snapshots.exists():
+            return []
+        return sorted(path.stem for path in self.snapshots.glob('*.json'))
+
+    def latest(self):
+        ids = self.ids()
+        return ids[-1] if ids else None
+
+    def resolve(self, ref):
+        """Snapshot id for 'latest', a negative index ('-2' = previous) or an id prefix."""
+        ids = self.ids()
+        if ref in (None, 'latest'):
+            return ids[-1] if ids else None
+        if ref.lstrip('-').isdigit() and ref.startswith('-'):
+            return ids[int(ref)] if len(ids) >= -int(ref) else None
+        matches = [i for i in ids if i.startswith(ref)]
+        if len(matches) != 1:
+            raise KeyError(f"Snapshot {ref!r} matches {len(matches)} snapshots")
+        return matches[0]
+
+    def load(self, snapshot_id):
+        if snapshot_id not in self._loaded:
+            with open(self.snapshots / f"{snapshot_id}.json", encoding='utf-8') as f:
+                self._loaded[snapshot_id] = json.load(f)
+        return self._loaded[snapshot_id]
+
+    # --- queries ---
+
+    def diff(self, old_id, new_id, sections=None):
+        """{'added': [...], 'removed': [...], 'changed': {id: [sections]}} between two snapshots."""
+        old = self.load(old_id)['candidates'] if old_id else {}
+        new = self.load(new_id)['candidates']
+        changed = {}
+        for key in old.keys() & new.keys():
+            if old[key] == new[key]:
+                continue
+            a, b = self.section(old[key]), self.section(new[key])
+            diff = sorted(s for s in match_sections(a.keys() | b.keys(), sections) if a.get(s) != b.get(s))
+            if diff:
+                changed[key] = diff
+        return {
+            'added': sorted(new.keys() - old.keys()),
+            'removed': sorted(old.keys() - new.keys()),
+            'changed': dict(sorted(changed.items())),
+        }
+
+    def history(self, key, sections=None):
+        """[(snapshot id, changed sections)] for every snapshot where ``key`` changed."""
+        key = str(key)
+        history = []
+        previous = None
+        for snapshot_id in self.ids():
+            digest = self.load(snapshot_id)['candidates'].get(key)
+            if digest is None:
+                if previous is not None:
+                    history.append((snapshot_id, ['<removed>']))
+                previous = None
+                continue
+            if previous is not None and digest == previous[0]:
+                continue
+            before = previous[1] if previous else {}
+            after = self.section(digest)
+            diff = sorted(s for s in match_sections(before.keys() | after.keys(), sections)
+                          if before.get(s) != after.get(s))
+            if diff:
+                history.append((snapshot_id, diff))
+            previous = (digest, after)
+        return history
+
+    # --- downstream stages ---
+
+    def _stages(self):
+        try:
+            with open(self.stages_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def changed_since(self, stage, sections=None, snapshot_id=None):
+        """Candidate ids whose ``sections`` changed since ``stage`` last ran.
+
+        Returns None when ``stage`` has never run (everything is pending).
+        """
+        snapshot_id = snapshot_id or self.latest()
+        consumed = self._stages().get(stage)
+        if snapshot_id is None:
+            return set()
+        if consumed is None or not (self.snapshots / f"{consumed}.json").exists():
+            return None
+        diff = self.diff(consumed, snapshot_id, sections)
+        return set(diff['added']) | set(diff['changed'])
+
+    def mark(self, stage, snapshot_id=None):
+        """Record that ``stage`` is up to date with ``snapshot_id`` (default: latest)."""
+        stages = self._stages()
+        stages[stage] = snapshot_id or self.latest()
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.stages_path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(stages, indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(tmp, self.stages_path)
+
+
+def snapshot_cache(store, cache, candidates=None, source='cache'):
+    """Snapshot every response currently in a ResponseCache (optionally limited to ``candidates``)."""
+    builder = store.begin(source)
+    if candidates is None:
+        keys, names = cache.keys(), {}
+    else:
+        keys = [str(c.get('id') or c['api'].split('=')[-1]) for c in candidates]
+        names = dict(zip(keys, (c.get('persona') for c in candidates)))
+    for key in keys:
+        builder.add(key, cache.load(key), names.get(key))
+    return builder.commit()
+
+
+def _name(store, snapshot_id, key):
+    for sid in (snapshot_id, store.latest()):
+        name = store.load(sid)['names'].get(key) if sid else None
+        if name:
+            return name
+    return ''
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Versioned snapshots of JNE extractions.")
+    parser.add_argument('--dir', default=str(DEFAULT_SNAPSHOT_DIR), help="Snapshot store (default: %(default)s)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('list', help="List snapshots")
+
+    diff = commands.add_parser('diff', help="Candidates and sections changed between two snapshots")
+    diff.add_argument('old', nargs='?', default='-2', help="Older snapshot (default: previous)")
+    diff.add_argument('new', nargs='?', default='latest', help="Newer snapshot (default: latest)")
+    diff.add_argument('--sections', nargs='+', help="Only report these sections")
+    diff.add_argument('--json', action='store_true', help="Print the diff as JSON")
+
+    history = commands.add_parser('history', help="Snapshots in which a candidate changed")
+    history.add_argument('id', help="idHojaVida")
+    history.add_argument('--section', nargs='+', dest='sections')
+    history.add_argument('--show', action='store_true', help="Print the section contents at each change")
+
+    take = commands.add_parser('take', help="Snapshot the extract_JNE.py response cache")
+    take.add_argument('--cache-dir', default=None)
+    take.add_argument('--candidates', default=None, help="NDJSON from jne_discovery.py (default: whole cache)")
+
+    pending = commands.add_parser('pending', help="Candidates a stage still has to process (exit 1 if none)")
+    pending.add_argument('stage')
+    pending.add_argument('--sections', nargs='+')
+
+    mark = commands.add_parser('mark', help="Mark a stage as up to date with a snapshot")
+    mark.add_argument('stage')
+    mark.add_argument('snapshot', nargs='?', default='latest')
+
+    args = parser.parse_args(argv)
+    store = SnapshotStore(args.dir)
+
+    if args.command == 'list':
+        for snapshot_id in store.ids():
+            snapshot = store.load(snapshot_id)
+            print(f"{snapshot_id}  {len(snapshot['candidates']):6d} candidates  {snapshot.get('source') or ''}")
+
+    elif args.command == 'diff':
+        start = time.perf_counter()
+        old, new = store.resolve(args.old), store.resolve(args.new)
+        if new is None:
+            sys.exit("No snapshots yet")
+        result = store.diff(old, new, args.sections)
+        if args.json:
+            print(json.dumps({'old': old, 'new': new, **result}, ensure_ascii=False, indent=1))
+            return result
+        print(f"{old or '(empty)'} -> {new}")
+        for label, keys in (('+', result['added']), ('-', result['removed'])):
+            for key in keys:
+                print(f"  {label} {key}  {_name(store, new if label == '+' else old, key)}")
+        for key, sections in result['changed'].items():
+            print(f"  ~ {key}  {_name(store, new, key)}: {', '.join(sections)}")
+        print(f"{len(result['added'])} added, {len(result['removed'])} removed, "
+              f"{len(result['changed'])} changed ({(time.perf_counter() - start) * 1000:.0f} ms)")
+        return result
+
+    elif args.command == 'history':
+        for snapshot_id, sections in store.history(args.id, args.sections):
+            print(f"{snapshot_id}: {', '.join(sections)}")
+            if args.show:
+                hashes = store.sections(snapshot_id, args.id)
+                for section in sections:
+                    if section in hashes:
+                        value = store.section(hashes[section])
+                        print(f"  {section} = {json.dumps(value, ensure_ascii=False)}")
+
+    elif args.command == 'take':
+        from jne_cache import DEFAULT_CACHE_DIR, ResponseCache
+
+        candidates = None
+        if args.candidates:
+            from jne_discovery import load_candidates
+            candidates = load_candidates(args.candidates)
+        snapshot_id = snapshot_cache(store, ResponseCache(args.cache_dir or DEFAULT_CACHE_DIR), candidates)
+        print(f"[OK] Snapshot {snapshot_id}" if snapshot_id else "[OK] No changes since the latest snapshot")
+
+    elif args.command == 'pending':
+        keys = store.changed_since(args.stage, args.sections)
+        if keys is None:
+            print(f"{args.stage}: never run, everything pending")
+            return
+        for key in sorted(keys):
+            print(key)
+        if not keys:
+            sys.exit(1)
+
+    elif args.command == 'mark':
+        snapshot_id = store.resolve(args.snapshot)
+        store.mark(args.stage, snapshot_id)
+        print(f"[OK] {args.stage} -> {snapshot_id}")
+
+
+if __name__ == "__main__":
+    main()
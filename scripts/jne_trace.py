@@ -0,0 +1,323 @@
+"""Request spans, stage timers and a Prometheus summary for the JNE scripts.
+
+    tracer = Tracer('trace.jsonl', metrics='jne.prom', job='extract_jne')
+    tracer.instrument(session)                 # DNS/connect/TLS of new connections
+    with tracer.span('hoja_vida', id=key) as span:
+        response = get_with_retries(session, url, span=span)
+        span.response(response)
+        span['cache'] = 'miss'
+    with tracer.stage('extract'):
+        row = extract(payload)
+    tracer.close()
+
+Every span is one JSON line in the trace: wait (rate limiter), backoff
+(sleeps between retries), dns, connect, tls (only when a new connection
+was opened), ttfb, total, status, bytes, cache, retries and the error that
+ended it, if any. Stages
+accumulate busy time across threads, so fetch, extract and export can be
+compared even though they overlap. close() appends the stage totals to the
+trace and writes a Prometheus textfile (node_exporter textfile collector
+format) with the aggregates.
+
+NULL_TRACER records nothing and is what the scripts use without --trace.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PHASES = ('wait', 'backoff', 'dns', 'connect', 'tls', 'ttfb')
+
+_local = threading.local()
+
+
+def current_span():
+    return getattr(_local, 'span', None)
+
+
+class Span(dict):
+    """One logical request (all its retries), as a dict of trace fields."""
+
+    def __init__(self, tracer, kind, **attrs):
+        super().__init__(type='span', kind=kind, **attrs)
+        self.tracer = tracer
+
+    def __enter__(self):
+        self._parent = current_span()
+        _local.span = self
+        self['ts'] = round(time.time(), 3)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _local.span = self._parent
+        self['total'] = round(time.perf_counter() - self._start, 6)
+        if exc is not None:
+            self.fail(exc)
+        self.tracer._finish(self)
+        return False
+
+    def add(self, phase, seconds):
+        self[phase] = round(self.get(phase, 0.0) + seconds, 6)
+
+    def attempt(self, number):
+        """Called by request_with_retries() before each attempt (0-based)."""
+        self['retries'] = number
+
+    def response(self, response):
+        self['status'] = response.status_code
+        self['bytes'] = len(response.content)
+        self['ttfb'] = round(response.elapsed.total_seconds(), 6)
+
+    def fail(self, exc):
+        self['error'] = type(exc).__name__
+        self['detail'] = str(exc)[:200]
+
+
+class _Stage:
+    __slots__ = ('tracer', 'name', 'start')
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer._stage_done(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullContext:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _NullSpan(dict, _NullContext):
+    def add(self, phase, seconds):
+        pass
+
+    def attempt(self, number):
+        pass
+
+    def response(self, response):
+        pass
+
+    def fail(self, exc):
+        pass
+
+
+class Tracer:
+    """Thread-safe span/stage recorder writing a JSON-lines trace and a Prometheus textfile."""
+
+    def __init__(self, path=None, metrics=None, job='jne'):
+        self.enabled = bool(path or metrics)
+        self.path = Path(path) if path else None
+        self.metrics = Path(metrics) if metrics else None
+        self.job = job
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.file = open(self.path, 'a', encoding='utf-8') if self.path else None
+        self.requests = {}   # (kind, status) -> count
+        self.durations = {}  # kind -> [bucket counts..., +Inf, sum]
+        self.phases = {}     # (kind, phase) -> seconds
+        self.totals = {}     # (kind, 'bytes' | 'retries' | 'errors') -> n
+        self.cache = {}      # (kind, result) -> count
+        self.stages = {}     # name -> [seconds, calls]
+
+    def span(self, kind, **attrs):
+        return Span(self, kind, **attrs) if self.enabled else _NullSpan()
+
+    def stage(self, name):
+        return _Stage(self, name) if self.enabled else _NULL_CONTEXT
+
+    def instrument(self, session):
+        """Time DNS, TCP connect and TLS for connections opened by ``session``."""
+        if not self.enabled:
+            return session
+        for adapter in session.adapters.values():
+            poolmanager = getattr(adapter, 'poolmanager', None)
+            if poolmanager is not None:
+                poolmanager.pool_classes_by_scheme = _timed_pool_classes()
+        return session
+
+    def _finish(self, span):
+        kind = span['kind']
+        status = str(span.get('status', span.get('error', 'none')))
+        with self.lock:
+            self.requests[(kind, status)] = self.requests.get((kind, status), 0) + 1
+            buckets = self.durations.setdefault(kind, [0] * (len(DURATION_BUCKETS) + 2))
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if span['total'] <= bound:
+                    buckets[i] += 1
+            buckets[-2] += 1
+            buckets[-1] += span['total']
+            for phase in PHASES:
+                if phase in span:
+                    self.phases[(kind, phase)] = self.phases.get((kind, phase), 0.0) + span[phase]
+            for key in ('bytes', 'retries'):
+                self.totals[(kind, key)] = self.totals.get((kind, key), 0) + span.get(key, 0)
+            if 'error' in span:
+                self.totals[(kind, 'errors')] = self.totals.get((kind, 'errors'), 0) + 1
+            if 'cache' in span:
+                self.cache[(kind, span['cache'])] = self.cache.get((kind, span['cache']), 0) + 1
+            if self.file:
+                self.file.write(json.dumps(span, ensure_ascii=False, default=str) + '\n')
+
+    def _stage_done(self, name, seconds):
+        with self.lock:
+            stage = self.stages.setdefault(name, [0.0, 0])
+            stage[0] += seconds
+            stage[1] += 1
+
+    def summary(self):
+        """{stage: {'seconds': busy seconds, 'calls': n}} plus the run's wall time."""
+        with self.lock:
+            stages = {name: {'seconds': round(s, 6), 'calls': n} for name, (s, n) in self.stages.items()}
+        return {'job': self.job, 'wall': round(time.perf_counter() - self._start, 6), 'stages': stages}
+
+    def close(self):
+        if not self.enabled:
+            return
+        summary = self.summary()
+        with self.lock:
+            if self.file:
+                for name, stage in summary['stages'].items():
+                    self.file.write(json.dumps({'type': 'stage', 'stage': name, **stage}) + '\n')
+                self.file.write(json.dumps({'type': 'run', 'job': self.job, 'ts': round(self.started, 3),
+                                            'wall': summary['wall']}) + '\n')
+                self.file.close()
+                self.file = None
+        if self.metrics:
+            write_textfile(self.metrics, self.prometheus(summary))
+
+    def prometheus(self, summary=None):
+        """The aggregates in Prometheus text exposition format."""
+        summary = summary or self.summary()
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def sample(name, labels, value):
+            labels = ','.join(f'{k}="{_escape(v)}"' for k, v in (('job', self.job), *labels))
+            lines.append(f"{name}{{{labels}}} {value!r}")
+
+        def counter(name, help_text, samples, kind='counter'):
+            header(name, kind, help_text)
+            for labels, value in samples:
+                sample(name, labels, value)
+
+        with self.lock:
+            counter('jne_requests_total', "Requests by endpoint and final status or error.",
+                    [((('endpoint', k), ('status', s)), n) for (k, s), n in sorted(self.requests.items())])
+            name = 'jne_request_duration_seconds'
+            header(name, 'histogram', "Request time including retries and rate limiting.")
+            for kind, buckets in sorted(self.durations.items()):
+                for bound, count in zip(DURATION_BUCKETS, buckets):
+                    sample(f"{name}_bucket", (('endpoint', kind), ('le', f"{bound:g}")), count)
+                sample(f"{name}_bucket", (('endpoint', kind), ('le', '+Inf')), buckets[-2])
+                sample(f"{name}_sum", (('endpoint', kind),), round(buckets[-1], 6))
+                sample(f"{name}_count", (('endpoint', kind),), buckets[-2])
+            counter('jne_request_phase_seconds_total', "Seconds spent per request phase.",
+                    [((('endpoint', k), ('phase', p)), round(s, 6)) for (k, p), s in sorted(self.phases.items())])
+            for key, name, help_text in (('bytes', 'jne_response_bytes_total', "Response body bytes received."),
+                                         ('retries', 'jne_retries_total', "Retried attempts."),
+                                         ('errors', 'jne_errors_total', "Requests that ended in an error.")):
+                counter(name, help_text,
+                        [((('endpoint', k),), n) for (k, total), n in sorted(self.totals.items()) if total == key])
+            counter('jne_cache_total', "Cache lookups by result.",
+                    [((('endpoint', k), ('result', r)), n) for (k, r), n in sorted(self.cache.items())])
+        stages = sorted(summary['stages'].items())
+        counter('jne_stage_seconds_total', "Busy seconds per pipeline stage, summed across threads.",
+                [((('stage', name),), float(stage['seconds'])) for name, stage in stages])
+        counter('jne_stage_calls_total', "Calls per pipeline stage.",
+                [((('stage', name),), stage['calls']) for name, stage in stages])
+        counter('jne_run_duration_seconds', "Wall time of the last run.", [((), float(summary['wall']))], 'gauge')
+        counter('jne_run_timestamp_seconds', "Start of the last run (Unix time).",
+                [((), float(round(self.started)))], 'gauge')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def write_textfile(path, text):
+    """Atomic write, so the textfile collector never reads a partial file."""
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(text, encoding='utf-8')
+    os.replace(tmp, path)
+
+
+_NULL_CONTEXT = _NullContext()
+NULL_TRACER = Tracer()
+
+_POOL_CLASSES = None
+
+
+def _timed_pool_classes():
+    """HTTP(S) connection pools whose connections report timings to the current span."""
+    global _POOL_CLASSES
+    if _POOL_CLASSES is not None:
+        return _POOL_CLASSES
+    import socket
+
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class TimedMixin:
+        def _new_conn(self):
+            span = current_span()
+            host = getattr(self, '_dns_host', None)
+            if span is None or host is None:
+                return super()._new_conn()
+            start = time.perf_counter()
+            try:
+                # Resolve here so DNS and TCP connect are timed separately; TLS still uses self.host
+                self._dns_host = socket.getaddrinfo(host, self.port, type=socket.SOCK_STREAM)[0][4][0]
+            except OSError:
+                pass  # let urllib3 raise its usual NameResolutionError
+            resolved = time.perf_counter()
+            try:
+                return super()._new_conn()
+            finally:
+                self._dns_host = host
+                span.add('dns', resolved - start)
+                span.add('connect', time.perf_counter() - resolved)
+
+        def connect(self):
+            span = current_span()
+            if span is None:
+                return super().connect()
+            before = span.get('dns', 0.0) + span.get('connect', 0.0)
+            start = time.perf_counter()
+            super().connect()
+            if isinstance(self, HTTPSConnection):
+                opened = span.get('dns', 0.0) + span.get('connect', 0.0) - before
+                span.add('tls', max(0.0, time.perf_counter() - start - opened))
+
+    class TimedHTTPConnection(TimedMixin, HTTPConnection):
+        pass
+
+    class TimedHTTPSConnection(TimedMixin, HTTPSConnection):
+        pass
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    _POOL_CLASSES = {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+    return _POOL_CLASSES
@@ -0,0 +1,427 @@
+"""Analyze k6 ``--out json`` results and flag regressions between runs.
+
+Streams the NDJSON written by
+
+    k6 run --out json=results.json load-tests/baseline.js
+
+line by line (plain or .gz, any size) into fixed-size HDR-style histograms,
+so memory stays constant: one histogram per endpoint (the ``name`` tag:
+vote, ranking, ...) plus one per endpoint and time window. Only
+http_req_duration, http_req_waiting and http_req_failed points are parsed;
+other lines are skipped on a byte match before any JSON decoding.
+
+Each run is saved as a compact summary (percentiles plus the sparse
+histogram counts, so runs can be merged or re-queried later) in
+load-tests/results/<run>.json. The run is then checked against:
+
+  * the scenario's SLOs: the "Expected Results" block of its header
+    (e.g. baseline.js: vote p95 < 200 ms, ranking p95 < 500 ms), falling
+    back to its k6 ``thresholds`` and then to those two defaults;
+  * a baseline run: p95/p99 more than ``--tolerance`` slower, or a higher
+    error rate, per endpoint.
+
+The exit status is 1 when anything is flagged, so CI can gate on it.
+
+    python k6_analyze.py results.json --scenario load-tests/baseline.js \\
+        --baseline load-tests/results/baseline-main.json
+"""
+import argparse
+import gzip
+import json
+import math
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / 'load-tests' / 'results'
+
+DEFAULT_SLO = {'vote': {95: 200.0}, 'ranking': {95: 500.0}}
+PERCENTILES = (50, 95, 99)
+DURATION, WAITING, FAILED = 'http_req_duration', 'http_req_waiting', 'http_req_failed'
+_WANTED = tuple(f'"metric":"{m}"'.encode() for m in (DURATION, WAITING, FAILED))
+
+
+class Histogram:
+    """HDR histogram of millisecond values, recorded in integer microseconds.
+
+    Values from 1 us to ``highest`` (k6's 60 s default timeout) are kept to
+    ``significant`` decimal digits (the same bucket layout as HdrHistogram),
+    in a flat list whose size only depends on those two settings.
+    """
+
+    def __init__(self, significant=2, highest=60_000_000):
+        largest_single_unit = 2 * 10 ** significant
+        self.sub_half_magnitude = max(0, math.ceil(math.log2(largest_single_unit)) - 1)
+        self.sub_count = 1 << (self.sub_half_magnitude + 1)
+        self.sub_half = self.sub_count // 2
+        self.sub_mask = self.sub_count - 1
+        self.highest = highest
+        buckets = 1
+        smallest_untrackable = self.sub_count
+        while smallest_untrackable <= highest:
+            smallest_untrackable <<= 1
+            buckets += 1
+        self.counts = [0] * ((buckets + 1) * self.sub_half)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0
+
+    def _index(self, value):
+        bucket = (value | self.sub_mask).bit_length() - (self.sub_half_magnitude + 1)
+        sub = value >> bucket
+        return ((bucket + 1) << self.sub_half_magnitude) + sub - self.sub_half
+
+    def _value(self, index):
+        bucket = (index >> self.sub_half_magnitude) - 1
+        sub = (index & (self.sub_half - 1)) + self.sub_half
+        if bucket < 0:
+            sub -= self.sub_half
+            bucket = 0
+        lowest = sub << bucket
+        return lowest + (1 << bucket) - 1  # highest value equivalent to the bucket
+
+    def record(self, ms, count=1):
+        value = min(max(int(ms * 1000), 0), self.highest)
+        self.counts[self._index(value)] += count
+        self.total += count
+        self.sum += ms * count
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        """Value (ms) at or below which ``p`` percent of the recorded values fall."""
+        if not self.total:
+            return None
+        target = max(1, math.ceil(self.total * p / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._value(index), self.max) / 1000
+        return self.max / 1000
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total += other.total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def summary(self):
+        stats = {'count': self.total, 'mean': round(self.sum / self.total, 3) if self.total else None,
+                 'max': self.max / 1000}
+        for p in PERCENTILES:
+            stats[f'p{p}'] = self.percentile(p)
+        return stats
+
+    def sparse(self):
+        return {str(i): c for i, c in enumerate(self.counts) if c}
+
+    @classmethod
+    def from_sparse(cls, counts, total_sum=0.0, maximum=60_000_000):
+        histogram = cls()
+        for index, count in counts.items():
+            histogram.counts[int(index)] = count
+            histogram.total += count
+        histogram.sum = total_sum
+        histogram.max = maximum
+        return histogram
+
+
+class _Clock:
+    """RFC 3339 timestamp -> epoch seconds, memoized per second."""
+
+    def __init__(self):
+        self.key = None
+        self.epoch = None
+
+    def __call__(self, stamp):
+        # '2026-01-14T10:55:26.123456789-05:00' -> ('2026-01-14T10:55:26', '-05:00')
+        head, rest = stamp[:19], stamp[19:]
+        zone = rest.lstrip('.0123456789') or 'Z'
+        key = (head, zone)
+        if key != self.key:
+            self.key = key
+            self.epoch = datetime.fromisoformat(head + ('+00:00' if zone == 'Z' else zone)).timestamp()
+        return self.epoch
+
+
+class Run:
+    """Aggregates of one k6 run."""
+
+    def __init__(self, window=60):
+        self.window = window
+        self.durations = {}
+        self.waiting = {}
+        self.windows = {}
+        self.requests = {}
+        self.failures = {}
+        self.start = None
+        self.end = None
+        self.lines = 0
+
+    def _histogram(self, table, key):
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = Histogram()
+        return histogram
+
+    @staticmethod
+    def endpoint(tags):
+        name = tags.get('name')
+        if name and '://' not in name:
+            return name
+        url = tags.get('url') or name or 'unknown'
+        path = url.split('://', 1)[-1].split('/', 1)[-1].split('?', 1)[0]
+        return f"{tags.get('method', 'GET')} /{path}"
+
+    def feed(self, lines):
+        clock = _Clock()
+        for line in lines:
+            self.lines += 1
+            if b'"type":"Point"' not in line or not any(wanted in line for wanted in _WANTED):
+                continue
+            try:
+                point = json.loads(line)
+                data = point['data']
+                metric = point['metric']
+                endpoint = self.endpoint(data.get('tags') or {})
+                value = float(data['value'])
+            except (ValueError, KeyError, TypeError):
+                continue
+
+            if metric == FAILED:
+                self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+                if value:
+                    self.failures[endpoint] = self.failures.get(endpoint, 0) + 1
+            elif metric == WAITING:
+                self._histogram(self.waiting, endpoint).record(value)
+            else:
+                self._histogram(self.durations, endpoint).record(value)
+                epoch = clock(data['time'])
+                if self.start is None or epoch < self.start:
+                    self.start = epoch
+                if self.end is None or epoch > self.end:
+                    self.end = epoch
+                bucket = int(epoch // self.window) * self.window
+                self._histogram(self.windows, (endpoint, bucket)).record(value)
+
+    def summary(self, run_id, source=None, scenario=None):
+        endpoints = {}
+        for endpoint, histogram in sorted(self.durations.items()):
+            requests = self.requests.get(endpoint, histogram.total)
+            failed = self.failures.get(endpoint, 0)
+            waiting = self.waiting.get(endpoint)
+            endpoints[endpoint] = {
+                **histogram.summary(),
+                'error_rate': round(failed / requests, 5) if requests else 0.0,
+                'ttfb_p95': waiting.percentile(95) if waiting else None,
+                'histogram': histogram.sparse(),
+                'sum': histogram.sum,
+            }
+        windows = {}
+        for (endpoint, bucket), histogram in sorted(self.windows.items()):
+            windows.setdefault(endpoint, []).append(
+                [int(bucket - self.start // self.window * self.window), histogram.total]
+                + [histogram.percentile(p) for p in PERCENTILES])
+        return {
+            'run': run_id, 'source': source, 'scenario': scenario,
+            'analyzedAt': int(time.time()), 'start': self.start, 'end': self.end,
+            'window': self.window, 'lines': self.lines,
+            'endpoints': endpoints,
+            'windows': windows,
+        }
+
+
+def open_results(path):
+    path = str(path)
+    if path == '-':
+        return sys.stdin.buffer
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb', buffering=1 << 20)
+
+
+# --- SLOs and regressions ---
+
+_HEADER_SLO = re.compile(r'Response time < (\d+(?:\.\d+)?)\s*ms for (\w+)[^(\n]*\(p(\d+)\)')
+_K6_THRESHOLD = re.compile(r"'?http_req_duration(?:\{name:(\w+)\})?'?:\s*\[([^\]]*)\]")
+_K6_PERCENTILE = re.compile(r"p\((\d+)\)\s*<\s*(\d+(?:\.\d+)?)")
+_K6_FAILED = re.compile(r"'?http_req_failed'?:\s*\[\s*'rate\s*<\s*(\d*\.?\d+)'")
+_HEADER_ERRORS = re.compile(r'(?:error rate\s*<\s*(\d+(?:\.\d+)?)\s*%|(\d+(?:\.\d+)?)\s*% error rate)', re.I)
+_K6_SPREAD = re.compile(r"\.\.\.\s*\w+\.thresholds")
+_JS_IMPORT = re.compile(r"from\s+'(\.{1,2}/[^']+)'")
+
+
+def _k6_thresholds(text):
+    """Latency SLOs and http_req_failed rate declared in a k6 script's own thresholds."""
+    slo = {}
+    for name, rules in _K6_THRESHOLD.findall(text):
+        for percentile, limit in _K6_PERCENTILE.findall(rules):
+            slo.setdefault(name or '*', {})[int(percentile)] = float(limit)
+    failed = _K6_FAILED.search(text)
+    return slo, float(failed.group(1)) if failed else None
+
+
+def _endpoint_of(word):
+    word = word.lower()
+    return 'vote' if word.startswith('vote') else 'ranking' if word.startswith('ranking') else word
+
+
+def scenario_slo(path):
+    """({endpoint or '*': {percentile: max ms}}, max error rate) for a scenario file.
+
+    Without a scenario the baseline SLOs apply (vote p95 < 200 ms, ranking
+    p95 < 500 ms). Scenarios without latency targets (stress, spike) only
+    get their error-rate threshold and the baseline-run comparison.
+
+    Targets in the header's "Expected Results" win over k6 thresholds, and
+    thresholds spread from an imported module (``...baseConfig.thresholds``
+    from config.js) count unless the scenario overrides them. The error
+    rate is None when no target is found anywhere.
+    """
+    if not path:
+        return {name: dict(limits) for name, limits in DEFAULT_SLO.items()}, None
+    path = Path(path)
+    text = path.read_text(encoding='utf-8')
+    header = text.split('*/', 1)[0]
+
+    slo, failed = {}, None
+    if _K6_SPREAD.search(text):
+        for module in _JS_IMPORT.findall(text):
+            try:
+                base_slo, base_failed = _k6_thresholds((path.parent / module).read_text(encoding='utf-8'))
+            except OSError:
+                continue
+            for name, limits in base_slo.items():
+                slo.setdefault(name, {}).update(limits)
+            failed = base_failed if base_failed is not None else failed
+    own_slo, own_failed = _k6_thresholds(text)
+    for name, limits in own_slo.items():
+        slo.setdefault(name, {}).update(limits)
+    failed = own_failed if own_failed is not None else failed
+
+    header_slo = {}
+    for limit, word, percentile in _HEADER_SLO.findall(header):
+        header_slo.setdefault(_endpoint_of(word), {})[int(percentile)] = float(limit)
+    header_errors = _HEADER_ERRORS.search(header)
+    if header_errors:
+        failed = float(header_errors.group(1) or header_errors.group(2)) / 100
+    return header_slo or slo, failed
+
+
+def check(summary, slo, max_error_rate=None, baseline=None, tolerance=0.10, min_count=50):
+    """List of human-readable regression flags (empty when the run is clean)."""
+    flags = []
+    for endpoint, stats in summary['endpoints'].items():
+        limits = {**slo.get('*', {}), **slo.get(endpoint, {})}
+        for percentile, limit in sorted(limits.items()):
+            value = stats.get(f'p{percentile}')
+            if value is None and stats['count']:
+                value = Histogram.from_sparse(stats['histogram'], stats['sum']).percentile(percentile)
+            if value is not None and value >= limit:
+                flags.append(f"{endpoint}: p{percentile} {value:.0f} ms breaks SLO < {limit:.0f} ms")
+        # "0% error rate" means none at all; k6-style targets are strict upper bounds
+        if max_error_rate is not None and (stats['error_rate'] > 0 if max_error_rate == 0
+                                           else stats['error_rate'] >= max_error_rate):
+            target = '= 0%' if max_error_rate == 0 else f"< {max_error_rate:.2%}"
+            flags.append(f"{endpoint}: error rate {stats['error_rate']:.2%} breaks SLO {target}")
+
+    if baseline:
+        for endpoint, stats in summary['endpoints'].items():
+            before = baseline['endpoints'].get(endpoint)
+            if not before or stats['count'] < min_count or before['count'] < min_count:
+                continue
+            for key in ('p95', 'p99'):
+                if before[key] and stats[key] and stats[key] > before[key] * (1 + tolerance):
+                    flags.append(f"{endpoint}: {key} {stats[key]:.0f} ms vs {before[key]:.0f} ms in "
+                                 f"{baseline['run']} (+{(stats[key] / before[key] - 1) * 100:.0f}%)")
+            if stats['error_rate'] > before['error_rate'] + 0.005:
+                flags.append(f"{endpoint}: error rate {stats['error_rate']:.2%} vs "
+                             f"{before['error_rate']:.2%} in {baseline['run']}")
+    return flags
+
+
+def save_summary(summary, results_dir=RESULTS_DIR):
+    results_dir = Path(results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    path = results_dir / f"{summary['run']}.json"
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, separators=(',', ':'))
+    os.replace(tmp, path)
+    return path
+
+
+def load_summary(ref, results_dir=RESULTS_DIR):
+    path = Path(ref)
+    if not path.exists():
+        path = Path(results_dir) / f"{ref}.json"
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _fmt(value):
+    return '-' if value is None else f"{value:.0f}"
+
+
+def print_report(summary, show_windows=False):
+    duration = (summary['end'] - summary['start']) if summary['start'] is not None else 0
+    print(f"Run {summary['run']}: {summary['lines']} lines, {duration / 60:.1f} min\n")
+    print(f"{'endpoint':<28} {'reqs':>8} {'err%':>6} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7} {'ttfb95':>7}")
+    for endpoint, stats in summary['endpoints'].items():
+        print(f"{endpoint[:28]:<28} {stats['count']:>8} {stats['error_rate'] * 100:>6.2f} "
+              f"{_fmt(stats['p50']):>7} {_fmt(stats['p95']):>7} {_fmt(stats['p99']):>7} "
+              f"{_fmt(stats['max']):>7} {_fmt(stats['ttfb_p95']):>7}")
+    if show_windows:
+        for endpoint, rows in summary['windows'].items():
+            print(f"\n{endpoint} per {summary['window']}s window (offset, reqs, p50, p95, p99):")
+            for offset, count, *values in rows:
+                print(f"  +{offset:>6}s {count:>7} " + ' '.join(f"{_fmt(v):>7}" for v in values))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize k6 NDJSON output and flag regressions.")
+    parser.add_argument('results', help="k6 --out json file (.gz accepted, '-' for stdin)")
+    parser.add_argument('--scenario', default=None, help="Scenario file whose SLOs apply (e.g. load-tests/baseline.js)")
+    parser.add_argument('--run-id', default=None, help="Name of the stored summary (default: file name + date)")
+    parser.add_argument('--baseline', default=None, help="Run id or summary file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="Allowed p95/p99 slowdown vs the baseline (default: %(default)s)")
+    parser.add_argument('--window', type=int, default=60, help="Time window in seconds (default: %(default)s)")
+    parser.add_argument('--results-dir', default=str(RESULTS_DIR), help="Summary store (default: %(default)s)")
+    parser.add_argument('--windows', action='store_true', help="Print per-window percentiles")
+    parser.add_argument('--no-save', action='store_true', help="Don't store the summary")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    run = Run(args.window)
+    with open_results(args.results) as lines:
+        run.feed(lines)
+    run_id = args.run_id or f"{Path(args.results).name.split('.')[0]}-{datetime.now():%Y%m%d_%H%M%S}"
+    summary = run.summary(run_id, str(args.results), args.scenario)
+
+    print_report(summary, args.windows)
+    if not args.no_save:
+        print(f"\n[OK] Summary saved to {save_summary(summary, args.results_dir)}")
+    print(f"[OK] Analyzed in {time.perf_counter() - start:.1f}s")
+
+    baseline = load_summary(args.baseline, args.results_dir) if args.baseline else None
+    slo, max_error_rate = scenario_slo(args.scenario)
+    if args.scenario and max_error_rate is None:
+        print(f"\n[!] No error-rate target found in {args.scenario}: the error-rate SLO is unknown, not checked")
+    flags = check(summary, slo, max_error_rate, baseline, args.tolerance)
+    if flags:
+        print("\nREGRESSIONS:")
+        for flag in flags:
+            print(f"  ✗ {flag}")
+        sys.exit(1)
+    print("\n✓ No regressions")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Responsive, content-hashed image assets for the party icons and candidate photos.
+
+Every source under public/iconos_partidos and public/fotos_candidatos is
+transcoded on a process pool into WebP and AVIF at a few widths (never
+upscaled), with EXIF/ICC/XMP metadata stripped. Output files are named
+after a hash of their own bytes, so they can be served with
+``Cache-Control: immutable``:
+
+    public/img/iconos_partidos/FuerzaPopular.128.3f2a9c1e0b.webp
+
+public/img/manifest.json maps each original public URL to its variants
+so the frontend can build ``<picture>``/``srcset`` markup:
+
+    {"/iconos_partidos/FuerzaPopular.jpg": {"width": 512, "height": 512,
+      "sha256": "...", "sources": {"avif": [{"w": 64, "src": "/img/..."}], ...}}}
+
+Runs are incremental: a source whose sha256 (and the encoder settings)
+match the manifest is not decoded again. Outputs no longer referenced by
+the manifest are deleted.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PUBLIC_DIR = ROOT / 'public'
+OUTPUT_DIR = PUBLIC_DIR / 'img'
+MANIFEST_NAME = 'manifest.json'
+
+SOURCE_DIRS = ('iconos_partidos', 'fotos_candidatos')
+SOURCE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif'}
+
+# Icons are shown small (chips, cards); photos go up to the full-width poster
+WIDTHS = {
+    'iconos_partidos': (64, 128, 256),
+    'fotos_candidatos': (160, 320, 640, 960),
+}
+FORMATS = ('avif', 'webp')
+QUALITY = {'avif': 55, 'webp': 78}
+HASH_LENGTH = 10
+
+
+def settings_fingerprint(formats=FORMATS, widths=WIDTHS, quality=QUALITY):
+    """Changes whenever a re-encode of every source would be needed."""
+    settings = {'formats': list(formats), 'widths': widths, 'quality': quality, 'hash': HASH_LENGTH}
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def find_sources(public_dir=PUBLIC_DIR, dirs=SOURCE_DIRS):
+    """(public URL, path, group) for every raster image under the source dirs."""
+    public_dir = Path(public_dir)
+    for group in dirs:
+        for path in sorted((public_dir / group).rglob('*')):
+            if path.is_file() and path.suffix.lower() in SOURCE_EXTENSIONS:
+                yield '/' + path.relative_to(public_dir).as_posix(), path, group
+
+
+def target_widths(width, widths):
+    """Requested widths that don't upscale, plus the original when it is smaller."""
+    chosen = [w for w in widths if w < width]
+    if len(chosen) < len(widths):
+        chosen.append(width)
+    return chosen
+
+
+def _encode(image, fmt):
+    from io import BytesIO
+
+    buffer = BytesIO()
+    if fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=QUALITY['webp'], method=6)
+    elif fmt == 'avif':
+        image.save(buffer, 'AVIF', quality=QUALITY['avif'], speed=6)
+    else:
+        raise ValueError(f"Unsupported format: {fmt!r}")
+    return buffer.getvalue()
+
+
+def transcode(url, path, group, output_dir, formats=FORMATS, widths=WIDTHS):
+    """Worker: write every variant of one source and return its manifest entry."""
+    from PIL import Image, ImageOps
+
+    sha = file_sha256(path)
+    with Image.open(path) as original:
+        animated = getattr(original, 'n_frames', 1) > 1
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P', 'PA') else 'RGB')
+    image.info = {}  # drop EXIF/ICC/XMP carried over from the source
+    if image.mode == 'RGBA' and image.getextrema()[3][0] == 255:
+        image = image.convert('RGB')
+
+    entry = {'width': image.width, 'height': image.height, 'sha256': sha, 'sources': {}}
+    if animated:
+        # Animated posters are served as-is; a still frame would change the page
+        entry['animated'] = True
+        return url, entry
+
+    relative = Path(url).relative_to('/' + group).with_suffix('')
+    target_dir = Path(output_dir) / group / relative.parent
+    target_dir.mkdir(parents=True, exist_ok=True)
+    public_root = Path(output_dir).parent
+
+    for width in target_widths(image.width, widths[group]):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            data = _encode(resized, fmt)
+            digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+            out = target_dir / f"{relative.name}.{width}.{digest}.{fmt}"
+            if not out.exists():
+                tmp = out.with_name(out.name + '.tmp')
+                tmp.write_bytes(data)
+                os.replace(tmp, out)
+            entry['sources'].setdefault(fmt, []).append({
+                'w': width, 'h': height, 'bytes': len(data),
+                'src': '/' + out.relative_to(public_root).as_posix(),
+            })
+    return url, entry
+
+
+def load_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp, path)
+
+
+def _up_to_date(entry, sha, public_dir):
+    if not entry or entry.get('sha256') != sha:
+        return False
+    return all((public_dir / variant['src'].lstrip('/')).exists()
+               for variants in entry.get('sources', {}).values() for variant in variants)
+
+
+def prune(output_dir, manifest, public_dir):
+    """Delete generated files the manifest no longer points at."""
+    keep = {public_dir / v['src'].lstrip('/')
+            for entry in manifest.values() for variants in entry['sources'].values() for v in variants}
+    removed = 0
+    for path in Path(output_dir).rglob('*'):
+        if path.is_file() and path.name != MANIFEST_NAME and path not in keep:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def optimize(public_dir=PUBLIC_DIR, output_dir=None, workers=None, force=False,
+             formats=FORMATS, do_prune=True):
+    """Bring public/img up to date; returns (manifest, stats)."""
+    public_dir = Path(public_dir)
+    output_dir = Path(output_dir) if output_dir else public_dir / OUTPUT_DIR.name
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / MANIFEST_NAME
+
+    previous = load_manifest(manifest_path)
+    fingerprint = settings_fingerprint(formats)
+    old_images = previous.get('images', {}) if previous.get('settings') == fingerprint and not force else {}
+
+    images = {}
+    pending = []
+    for url, path, group in find_sources(public_dir):
+        entry = old_images.get(url)
+        if _up_to_date(entry, file_sha256(path), public_dir):
+            images[url] = entry
+        else:
+            pending.append((url, path, group))
+
+    stats = {'sources': len(images) + len(pending), 'skipped': len(images), 'encoded': 0, 'failed': 0}
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(transcode, url, path, group, output_dir, formats): url
+                       for url, path, group in pending}
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    url, entry = future.result()
+                except Exception as e:
+                    print(f"  ✗ {url}: {e}")
+                    stats['failed'] += 1
+                    # Keep serving the last good variants; without a sha256 the entry is
+                    # never up to date, so the next run retries it even if only settings changed
+                    if url in previous.get('images', {}):
+                        images[url] = dict(previous['images'][url], sha256=None)
+                    continue
+                images[url] = entry
+                stats['encoded'] += 1
+                print(f"  ✓ {url}")
+
+    manifest = {'settings': fingerprint, 'images': dict(sorted(images.items()))}
+    save_manifest(manifest_path, manifest)
+    stats['pruned'] = prune(output_dir, images, public_dir) if do_prune else 0
+    return manifest, stats
+
+
+def _total_bytes(images, public_dir):
+    """Original bytes vs. the smallest encoding of each image's largest variant."""
+    original = optimized = 0
+    for url, entry in images.items():
+        size = (public_dir / url.lstrip('/')).stat().st_size
+        variants = [v for vs in entry['sources'].values() for v in vs]
+        largest = max((v['w'] for v in variants), default=None)
+        original += size
+        optimized += min((v['bytes'] for v in variants if v['w'] == largest), default=size)
+    return original, optimized
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcode icons and candidate photos into responsive WebP/AVIF assets.")
+    parser.add_argument('--public-dir', default=str(PUBLIC_DIR), help="Vite public/ directory (default: %(default)s)")
+    parser.add_argument('--output-dir', default=None, help="Where variants and manifest.json go (default: <public-dir>/img)")
+    parser.add_argument('--workers', type=int, default=None, help="Encoder processes (default: one per CPU)")
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS),
+                        help="Formats to generate (default: %(default)s)")
+    parser.add_argument('--force', action='store_true', help="Re-encode every source even if unchanged")
+    parser.add_argument('--no-prune', action='store_true', help="Keep variants no longer listed in the manifest")
+    args = parser.parse_args(argv)
+
+    public_dir = Path(args.public_dir)
+    start = time.perf_counter()
+    manifest, stats = optimize(public_dir, args.output_dir, args.workers, args.force,
+                               tuple(args.formats), not args.no_prune)
+    original, optimized = _total_bytes(manifest['images'], public_dir)
+
+    print(f"\n[OK] {stats['sources']} sources: {stats['encoded']} encoded, "
+          f"{stats['skipped']} unchanged, {stats['failed']} failed, {stats['pruned']} stale files removed")
+    if original:
+        print(f"[OK] Largest variant bytes: {original / 1024:.0f} KB -> {optimized / 1024:.0f} KB "
+              f"({100 * optimized / original:.0f}%)")
+    print(f"[OK] Done in {time.perf_counter() - start:.1f}s")
+    return manifest
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""Monte Carlo simulator for generateSmartPair() and the Elo update.
+
+Replays the pairing of src/services/pairGenerationService.ts (coverage
+phase, then adaptive "similar rating" phase, then random attempts, then a
+possibly repeated random pair) together with the local Elo update of
+sessionService / api/elo.ts, for many synthetic sessions at once. Every
+session is one row of NumPy arrays, and each vote is one vectorized step
+over all rows.
+
+Voters answer according to a preference model over hidden per-session
+utilities:
+
+    bt             P(a beats b) = logistic(u_a - u_b)           (Bradley-Terry)
+    thurstone      P(a beats b) = Phi((u_a - u_b) / sqrt(2))
+    deterministic  the higher utility always wins
+    random         coin flip (no signal; a floor for the metrics)
+
+Utilities mix a consensus component shared by every voter (or by one of
+``--factions`` voter groups) with a personal one (``--consensus`` sets the
+share), scaled by ``--spread``.
+
+Reported per configuration:
+    rho@N          mean Spearman correlation between the session's Elo
+                   ranking and its true utilities after N votes
+    votes_to_rho   median / p90 votes until rho first reaches ``--target``
+    top_k_stable   median / p90 votes after which the top-k set never changed
+    us_per_pair    CPU time per pair selection, vectorized (amortized over
+                   sessions) and for a scalar port of the TS code
+
+    python pair_simulator.py --sessions 200000 --k 16 24 32 40 --nearby 1 3 5
+"""
+import argparse
+import itertools
+import json
+import math
+import random
+import time
+
+import numpy as np
+
+# Keep in sync with src/lib/gameConstants.ts
+ELO_K = 32
+INITIAL_ELO = 1200
+MAX_PAIR_SELECTION_ATTEMPTS = 100
+NEARBY_RANGE = 3
+PRELIMINARY_GOAL = 15
+RECOMMENDED_GOAL = 30
+
+MODELS = ('bt', 'thurstone', 'deterministic', 'random')
+
+
+def default_candidate_count():
+    try:
+        from elo_ranking import load_candidates
+        return len(load_candidates()) or 36
+    except OSError:
+        return 36
+
+
+# --- Synthetic voters ---
+
+def utilities(rng, sessions, n, spread=1.5, consensus=0.7, factions=1):
+    """(S, N) hidden utilities: shared (per faction) plus personal components."""
+    shared = rng.standard_normal((factions, n))[rng.integers(0, factions, sessions)]
+    personal = rng.standard_normal((sessions, n))
+    return spread * (math.sqrt(consensus) * shared + math.sqrt(1 - consensus) * personal)
+
+
+def a_wins(rng, model, diff):
+    """Vote outcomes for utility differences u_a - u_b."""
+    if model == 'bt':
+        p = 1 / (1 + np.exp(-diff))
+    elif model == 'thurstone':
+        p = 0.5 * (1 + np.vectorize(math.erf)(diff / 2))
+    elif model == 'deterministic':
+        return diff > 0
+    elif model == 'random':
+        p = np.full(diff.shape, 0.5)
+    else:
+        raise ValueError(f"Unknown preference model: {model!r}")
+    return rng.random(diff.shape) < p
+
+
+# --- Vectorized pair generation ---
+
+class PairSpace:
+    """Index of the N*(N-1)/2 unordered pairs."""
+
+    def __init__(self, n):
+        self.n = n
+        self.size = n * (n - 1) // 2
+        self.index = np.full((n, n), -1, dtype=np.int32)
+        first, second = np.triu_indices(n, 1)
+        self.index[first, second] = np.arange(self.size)
+        self.index[second, first] = np.arange(self.size)
+
+
+def _two_smallest(keys):
+    picked = np.argpartition(keys, 1, axis=1)[:, :2]
+    return picked[:, 0], picked[:, 1]
+
+
+def select_pairs(rng, space, seen, appearances, ratings, nearby=NEARBY_RANGE,
+                 attempts=MAX_PAIR_SELECTION_ATTEMPTS, coverage=True):
+    """One generateSmartPair() call per session row; returns (a, b, phase) arrays.
+
+    ``phase`` is 0 coverage, 1 adaptive, 2 random, 3 fallback. ``seen`` is
+    reset in place for rows that have seen every pair, like buildContext().
+    """
+    sessions, n = appearances.shape
+    full = seen.sum(axis=1) >= space.size
+    seen[full] = False
+
+    a = np.zeros(sessions, dtype=np.int64)
+    b = np.zeros(sessions, dtype=np.int64)
+    phase = np.full(sessions, -1, dtype=np.int8)
+
+    if coverage:
+        unseen = appearances == 0
+        count = unseen.sum(axis=1)
+        # Candidates never shown are in no seen pair, so the first attempt always succeeds
+        both = np.flatnonzero(count >= 2)
+        if len(both):
+            keys = rng.random((len(both), n))
+            keys[~unseen[both]] = 2
+            a[both], b[both] = _two_smallest(keys)
+            phase[both] = 0
+        one = np.flatnonzero(count == 1)
+        if len(one):
+            keys = rng.random((len(one), n))
+            keys[unseen[one]] = 2
+            a[one] = unseen[one].argmax(axis=1)
+            b[one] = keys.argmin(axis=1)
+            phase[one] = 0
+
+    rows = np.flatnonzero(phase < 0)
+    if len(rows):
+        # Adaptive: scan the rating order for the first unseen pair within ``nearby`` places
+        order = np.argsort(-ratings[rows], axis=1, kind='stable')
+        first, second = zip(*[(i, i + o) for i in range(n - 1) for o in range(1, nearby + 1) if i + o < n])
+        first, second = order[:, list(first)], order[:, list(second)]
+        pair_ids = space.index[first, second]
+        available = ~np.take_along_axis(seen[rows], pair_ids, axis=1)
+        found = available.any(axis=1)
+        pick = available.argmax(axis=1)
+        hit = rows[found]
+        a[hit] = first[found, pick[found]]
+        b[hit] = second[found, pick[found]]
+        phase[hit] = 1
+
+    rows = np.flatnonzero(phase < 0)
+    if len(rows):
+        # Random attempts, then whatever the first attempt drew
+        first = rng.integers(0, n, (len(rows), attempts))
+        second = rng.integers(0, n - 1, (len(rows), attempts))
+        second += second >= first
+        available = ~np.take_along_axis(seen[rows], space.index[first, second], axis=1)
+        found = available.any(axis=1)
+        pick = np.where(found, available.argmax(axis=1), 0)
+        a[rows] = first[np.arange(len(rows)), pick]
+        b[rows] = second[np.arange(len(rows)), pick]
+        phase[rows] = np.where(found, 2, 3)
+
+    return a, b, phase
+
+
+def update_elo(ratings, winners, losers, k=ELO_K):
+    """updateEloRatings() from sessionService.ts for one vote per row, in place."""
+    rows = np.arange(len(ratings))
+    rating_a, rating_b = ratings[rows, winners], ratings[rows, losers]
+    expected_a = 1 / (1 + np.power(10.0, (rating_b - rating_a) / 400))
+    expected_b = 1 / (1 + np.power(10.0, (rating_a - rating_b) / 400))
+    ratings[rows, winners] = rating_a + k * (1 - expected_a)
+    ratings[rows, losers] = rating_b + k * (0 - expected_b)
+
+
+def _centered_ranks(values):
+    ranks = np.argsort(np.argsort(values, axis=1, kind='stable'), axis=1).astype(np.float64)
+    ranks -= ranks.mean(axis=1, keepdims=True)
+    return ranks / np.sqrt((ranks ** 2).sum(axis=1, keepdims=True))
+
+
+def spearman(x, y_ranks):
+    """Row-wise Spearman correlation of ``x`` with precomputed _centered_ranks(y)."""
+    return (_centered_ranks(x) * y_ranks).sum(axis=1)
+
+
+def simulate(sessions=20000, n=36, votes=60, k=ELO_K, nearby=NEARBY_RANGE,
+             attempts=MAX_PAIR_SELECTION_ATTEMPTS, coverage=True, model='bt', spread=1.5,
+             consensus=0.7, factions=1, target=0.5, top_k=5, seed=0):
+    """Run one configuration; returns per-session metrics and curves."""
+    rng = np.random.default_rng(seed)
+    space = PairSpace(n)
+    truth = utilities(rng, sessions, n, spread, consensus, factions)
+    truth_ranks = _centered_ranks(truth)
+    ratings = np.full((sessions, n), float(INITIAL_ELO))
+    seen = np.zeros((sessions, space.size), dtype=bool)
+    appearances = np.zeros((sessions, n), dtype=np.int32)
+    rows = np.arange(sessions)
+
+    rho_curve = np.zeros(votes)
+    phases = np.zeros((votes, 4), dtype=np.int64)
+    reached = np.full(sessions, -1)
+    last_change = np.zeros(sessions, dtype=np.int64)
+    top = np.zeros((sessions, n), dtype=bool)
+    select_time = 0.0
+
+    for vote in range(votes):
+        start = time.perf_counter()
+        a, b, phase = select_pairs(rng, space, seen, appearances, ratings, nearby, attempts, coverage)
+        select_time += time.perf_counter() - start
+
+        seen[rows, space.index[a, b]] = True
+        np.add.at(appearances, (rows, a), 1)
+        np.add.at(appearances, (rows, b), 1)
+        phases[vote] = np.bincount(phase, minlength=4)
+
+        won = a_wins(rng, model, truth[rows, a] - truth[rows, b])
+        update_elo(ratings, np.where(won, a, b), np.where(won, b, a), k)
+
+        rho = spearman(ratings, truth_ranks)
+        rho_curve[vote] = rho.mean()
+        reached[(reached < 0) & (rho >= target)] = vote + 1
+
+        current = np.zeros_like(top)
+        np.put_along_axis(current, np.argpartition(-ratings, top_k - 1, axis=1)[:, :top_k], True, axis=1)
+        last_change[(current != top).any(axis=1)] = vote + 1
+        top = current
+
+    return {
+        'rho_curve': rho_curve,
+        'votes_to_rho': reached,
+        'top_k_stable': last_change,
+        'phases': phases,
+        'us_per_pair': select_time / (sessions * votes) * 1e6,
+    }
+
+
+# --- Scalar reference (one session, one pair at a time, like the browser) ---
+
+def select_pair_scalar(n, seen, appearances, ratings, nearby=NEARBY_RANGE,
+                       attempts=MAX_PAIR_SELECTION_ATTEMPTS, coverage=True):
+    """Straight port of generateSmartPair() over candidate indices; returns (a, b)."""
+    total = n * (n - 1) // 2
+    if len(seen) >= total:
+        seen.clear()
+
+    def pair_id(x, y):
+        return (x, y) if x < y else (y, x)
+
+    def two_random(pool):
+        first = int(random.random() * len(pool))
+        second = int(random.random() * (len(pool) - 1))
+        if second >= first:
+            second += 1
+        return pool[first], pool[second]
+
+    candidates = list(range(n))
+    if coverage:
+        unseen = [c for c in candidates if appearances[c] == 0]
+        if len(unseen) >= 2:
+            for _ in range(min(attempts, len(unseen) * 2)):
+                x, y = two_random(unseen)
+                if pair_id(x, y) not in seen:
+                    return x, y
+        elif len(unseen) == 1:
+            others = [c for c in candidates if appearances[c] > 0]
+            random.shuffle(others)
+            for y in others:
+                if pair_id(unseen[0], y) not in seen:
+                    return unseen[0], y
+
+    ordered = sorted(candidates, key=lambda c: -ratings[c])
+    for i in range(n - 1):
+        for offset in range(1, nearby + 1):
+            j = i + offset
+            if j >= n:
+                break
+            if pair_id(ordered[i], ordered[j]) not in seen:
+                return ordered[i], ordered[j]
+
+    for _ in range(attempts):
+        x, y = two_random(candidates)
+        if pair_id(x, y) not in seen:
+            return x, y
+    return two_random(candidates)
+
+
+def scalar_us_per_pair(n, votes, nearby, attempts, coverage, sessions=200, seed=0):
+    """CPU time per scalar pair selection over ``sessions`` short random-vote sessions."""
+    random.seed(seed)
+    elapsed, calls = 0.0, 0
+    for _ in range(sessions):
+        seen, appearances, ratings = set(), [0] * n, [float(INITIAL_ELO)] * n
+        for _ in range(votes):
+            start = time.perf_counter()
+            x, y = select_pair_scalar(n, seen, appearances, ratings, nearby, attempts, coverage)
+            elapsed += time.perf_counter() - start
+            calls += 1
+            seen.add((x, y) if x < y else (y, x))
+            appearances[x] += 1
+            appearances[y] += 1
+            winner, loser = (x, y) if random.random() < 0.5 else (y, x)
+            expected_w = 1 / (1 + math.pow(10, (ratings[loser] - ratings[winner]) / 400))
+            expected_l = 1 / (1 + math.pow(10, (ratings[winner] - ratings[loser]) / 400))
+            ratings[winner] += ELO_K * (1 - expected_w)
+            ratings[loser] += ELO_K * (0 - expected_l)
+    return elapsed / calls * 1e6
+
+
+# --- Reporting ---
+
+def _quantiles(values, votes):
+    done = values[(values > 0) & (values <= votes)]
+    if not len(done):
+        return None, None, 0.0
+    return int(np.median(done)), int(np.percentile(done, 90)), len(done) / len(values)
+
+
+def summarize(config, result, votes):
+    median, p90, share = _quantiles(result['votes_to_rho'], votes)
+    # A top-k set that last changed on the final vote hasn't settled yet
+    stable = result['top_k_stable'].copy()
+    stable[stable >= votes] = -1
+    stable_median, stable_p90, stable_share = _quantiles(stable, votes)
+    curve = result['rho_curve']
+    phases = result['phases'].sum(axis=0)
+    return {
+        **config,
+        'rho': {n: round(float(curve[n - 1]), 4) for n in (PRELIMINARY_GOAL, RECOMMENDED_GOAL, votes) if n <= votes},
+        'votes_to_rho': {'median': median, 'p90': p90, 'reached': round(share, 4)},
+        'top_k_stable': {'median': stable_median, 'p90': stable_p90, 'settled': round(stable_share, 4)},
+        'phases': dict(zip(('coverage', 'adaptive', 'random', 'fallback'),
+                           (round(float(p) / phases.sum(), 4) for p in phases))),
+        'us_per_pair': round(result['us_per_pair'], 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate generateSmartPair() + Elo over synthetic sessions.")
+    parser.add_argument('--sessions', type=int, default=20000, help="Synthetic sessions per configuration")
+    parser.add_argument('--batch', type=int, default=20000, help="Sessions simulated per NumPy batch")
+    parser.add_argument('--candidates', type=int, default=None,
+                        help="Number of candidates (default: api/candidates-data.ts)")
+    parser.add_argument('--votes', type=int, default=60, help="Votes per session (default: %(default)s)")
+    parser.add_argument('--k', type=float, nargs='+', default=[ELO_K], help="ELO_K values to try")
+    parser.add_argument('--nearby', type=int, nargs='+', default=[NEARBY_RANGE], help="NEARBY_RANGE values")
+    parser.add_argument('--attempts', type=int, nargs='+', default=[MAX_PAIR_SELECTION_ATTEMPTS],
+                        help="MAX_PAIR_SELECTION_ATTEMPTS values")
+    parser.add_argument('--no-coverage', action='store_true', help="Also try without the coverage phase")
+    parser.add_argument('--model', choices=MODELS, default='bt', help="Voter preference model")
+    parser.add_argument('--spread', type=float, default=1.5, help="Std-dev of utilities (logits)")
+    parser.add_argument('--consensus', type=float, default=0.7, help="Share of utility common to all voters")
+    parser.add_argument('--factions', type=int, default=1, help="Voter groups with their own consensus")
+    parser.add_argument('--target', type=float, default=0.5, help="Spearman rho counted as converged")
+    parser.add_argument('--top-k', type=int, default=5, help="Top-k set watched for stability")
+    parser.add_argument('--scalar-sessions', type=int, default=200,
+                        help="Sessions timed with the scalar port (0 skips it)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', default=None, help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    n = args.candidates or default_candidate_count()
+    coverages = (True, False) if args.no_coverage else (True,)
+    results = []
+    print(f"{n} candidates, {args.sessions} sessions x {args.votes} votes, model={args.model}\n")
+    print(f"{'K':>5} {'near':>4} {'att':>4} {'cov':>3} | {'rho@15':>6} {'rho@30':>6} | "
+          f"{'to rho':>9} | {'top-k':>9} | {'us/pair':>7} {'scalar':>7}")
+
+    for k, nearby, attempts, coverage in itertools.product(args.k, args.nearby, args.attempts, coverages):
+        batches = []
+        for offset in range(0, args.sessions, args.batch):
+            size = min(args.batch, args.sessions - offset)
+            batches.append(simulate(size, n, args.votes, k, nearby, attempts, coverage, args.model,
+                                    args.spread, args.consensus, args.factions, args.target,
+                                    args.top_k, seed=args.seed + offset))
+        weights = np.array([len(r['votes_to_rho']) for r in batches], dtype=np.float64)
+        merged = {
+            'rho_curve': np.average([r['rho_curve'] for r in batches], axis=0, weights=weights),
+            'votes_to_rho': np.concatenate([r['votes_to_rho'] for r in batches]),
+            'top_k_stable': np.concatenate([r['top_k_stable'] for r in batches]),
+            'phases': sum(r['phases'] for r in batches),
+            'us_per_pair': float(np.average([r['us_per_pair'] for r in batches], weights=weights)),
+        }
+        config = {'k': k, 'nearby': nearby, 'attempts': attempts, 'coverage': coverage}
+        summary = summarize(config, merged, args.votes)
+        if args.scalar_sessions:
+            summary['scalar_us_per_pair'] = round(
+                scalar_us_per_pair(n, args.votes, nearby, attempts, coverage, args.scalar_sessions, args.seed), 3)
+        results.append(summary)
+
+        rho = summary['rho']
+        to_rho, stable = summary['votes_to_rho'], summary['top_k_stable']
+        print(f"{k:>5g} {nearby:>4} {attempts:>4} {'yes' if coverage else 'no':>3} | "
+              f"{rho.get(PRELIMINARY_GOAL, float('nan')):6.3f} {rho.get(RECOMMENDED_GOAL, float('nan')):6.3f} | "
+              f"{str(to_rho['median']):>4}/{str(to_rho['p90']):<4} | {str(stable['median']):>4}/{str(stable['p90']):<4} | "
+              f"{summary['us_per_pair']:7.2f} {summary.get('scalar_us_per_pair', float('nan')):7.1f}")
+
+    print(f"\nto rho: median/p90 votes until Spearman >= {args.target}; "
+          f"top-k: median/p90 votes after which the top {args.top_k} never changed")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'candidates': n, 'sessions': args.sessions, 'votes': args.votes, 'model': args.model,
+                       'results': results}, f, indent=1)
+        print(f"[OK] Results written to {args.json}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""One entry point for the data pipeline, run as an incremental DAG.
+
+    fetch ──> extract ──> export
+      │          └──────> search
+      └─────> codegen
+    icons                           (independent: run alongside fetch)
+    images
+
+Stages:
+    fetch    hojas de vida into the response cache + snapshot   extract_JNE.py --fetch-only
+    extract  cache -> <out>.ndjson, offline                      extract_JNE.py --offline
+    export   <out>.ndjson -> csv / xlsx / parquet                jne_sinks.py
+    search   <out>.ndjson -> public/data/search-index.bin        search_index.py
+    codegen  cache -> src/data/domains/*.ts                      generate_domains.py
+    icons    party symbols -> scripts/iconos_partidos            download_party_icons_v2.py
+    images   public/ icons + photos -> public/img                optimize_images.py
+
+Each stage has a fingerprint of its inputs (file sizes and mtimes, its
+script and every scripts/ module that script imports, the options that
+change its output and the output digest of the stages it depends on). A stage whose fingerprint matches its last successful run and
+whose outputs exist is skipped; fetch and icons additionally expire after
+a day / a week, since their real input is the JNE. Stages run as
+subprocesses (logs in scripts/.pipeline/logs/), independent ones in
+parallel, so this file only imports the standard library and a no-op run
+finishes in well under a second.
+
+Usage:
+    python pipeline.py                      # everything that is out of date
+    python pipeline.py codegen              # one target and what it depends on
+    python pipeline.py export --formats csv xlsx parquet
+    python pipeline.py fetch icons --force  # re-run even if up to date
+    python pipeline.py --status
+    python pipeline.py --dry-run
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPTS_DIR.parent
+STATE_DIR = SCRIPTS_DIR / '.pipeline'
+CACHE_DIR = SCRIPTS_DIR / '.jne_cache'  # jne_cache.DEFAULT_CACHE_DIR, without importing it
+DEFAULT_OUTPUT = SCRIPTS_DIR / 'candidatos_jne'
+SEARCH_INDEX = ROOT / 'public' / 'data' / 'search-index.bin'
+DAY = 24 * 3600
+
+Stage = namedtuple('Stage', 'name deps script args inputs params outputs digest max_age cwd clean',
+                   defaults=(None, None, SCRIPTS_DIR, False))
+
+
+# --- Fingerprints ---
+
+def _stat_entries(path):
+    """(relative name, size, mtime_ns) for a file or every file under a directory."""
+    path = Path(path)
+    try:
+        if path.is_file():
+            st = path.stat()
+            return [(path.name, st.st_size, st.st_mtime_ns)]
+    except OSError:
+        return [(path.name, 'missing')]
+    if not path.is_dir():
+        return [(path.name, 'missing')]
+    entries = []
+    for folder, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for name in sorted(files):
+            if name.startswith('.'):
+                continue
+            full = os.path.join(folder, name)
+            st = os.stat(full)
+            entries.append((os.path.relpath(full, path), st.st_size, st.st_mtime_ns))
+    return entries
+
+
+def _sha(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_digest(cache_dir):
+    """Content digest of the response cache: which object each idHojaVida points to."""
+    try:
+        with open(Path(cache_dir) / 'index.json', encoding='utf-8') as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return _sha(sorted((key, entry.get('sha256')) for key, entry in index.items()))
+
+
+_IMPORT = re.compile(r"^\s*(?:from|import)\s+(\w+)", re.M)
+
+
+def local_modules(script):
+    """``script`` plus the scripts/ modules it imports, transitively (found by scanning, not importing)."""
+    found, pending = [], [SCRIPTS_DIR / script]
+    while pending:
+        path = pending.pop()
+        if path in found or not path.is_file():
+            continue
+        found.append(path)
+        pending.extend(SCRIPTS_DIR / f"{name}.py" for name in _IMPORT.findall(path.read_text(encoding='utf-8')))
+    return sorted(found)
+
+
+def fingerprint(stage, opts, state):
+    return _sha({
+        'params': stage.params(opts),
+        'code': [_stat_entries(path) for path in local_modules(stage.script)],
+        'inputs': [_stat_entries(path) for path in stage.inputs(opts)],
+        'deps': {dep: state.get(dep, {}).get('output') for dep in stage.deps},
+    })
+
+
+# --- Stages ---
+
+def _candidates_args(opts):
+    return ['--candidates', str(opts.candidates)] if opts.candidates else []
+
+
+def _candidates_input(opts):
+    # The built-in presidential list lives in extract_JNE.py itself
+    return [Path(opts.candidates) if opts.candidates else SCRIPTS_DIR / 'extract_JNE.py']
+
+
+STAGES = {stage.name: stage for stage in (
+    Stage('fetch', (), 'extract_JNE.py',
+          args=lambda o: ['--fetch-only', '--workers', str(o.workers), '--rate', str(o.rate)] + _candidates_args(o),
+          inputs=_candidates_input,
+          params=lambda o: {'candidates': o.candidates},  # not --rate/--workers: they don't change the data
+          outputs=lambda o: [CACHE_DIR / 'index.json'],
+          digest=lambda o: cache_digest(CACHE_DIR),
+          max_age=DAY),
+    Stage('extract', ('fetch',), 'extract_JNE.py',
+          args=lambda o: ['--offline', '--no-snapshot', '--formats', 'ndjson', '--output', str(o.output)]
+                         + _candidates_args(o),
+          inputs=_candidates_input,
+          params=lambda o: {'candidates': o.candidates, 'output': o.output},
+          outputs=lambda o: [Path(f"{o.output}.ndjson")],
+          digest=lambda o: file_digest(f"{o.output}.ndjson"),
+          clean=True),
+    Stage('export', ('extract',), 'jne_sinks.py',
+          args=lambda o: [f"{o.output}.ndjson", '--formats', *o.formats],
+          inputs=lambda o: [],
+          params=lambda o: {'output': o.output, 'formats': sorted(o.formats)},
+          outputs=lambda o: [Path(f"{o.output}.{fmt}") for fmt in o.formats],
+          clean=True),
+    Stage('search', ('extract',), 'search_index.py',
+          args=lambda o: ['build', f"{o.output}.ndjson", '--output', str(SEARCH_INDEX)],
+          inputs=lambda o: [],
+          params=lambda o: {'output': o.output},
+          outputs=lambda o: [SEARCH_INDEX]),
+    Stage('codegen', ('fetch',), 'generate_domains.py',
+          args=_candidates_args,
+          inputs=lambda o: [],
+          params=lambda o: {'candidates': o.candidates},
+          outputs=lambda o: [ROOT / 'src' / 'data' / 'domains']),
+    Stage('icons', (), 'download_party_icons_v2.py',
+          args=lambda o: [],
+          inputs=lambda o: [],
+          params=lambda o: {},
+          outputs=lambda o: [SCRIPTS_DIR / 'iconos_partidos'],
+          max_age=7 * DAY),
+    Stage('images', (), 'optimize_images.py',
+          args=lambda o: [],
+          inputs=lambda o: [ROOT / 'public' / 'iconos_partidos', ROOT / 'public' / 'fotos_candidatos'],
+          params=lambda o: {},
+          outputs=lambda o: [ROOT / 'public' / 'img' / 'manifest.json']),
+)}
+
+
+# --- State ---
+
+def load_state(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(state, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def stale_reason(stage, opts, state, now=None):
+    """Why ``stage`` has to run, or None when it is up to date."""
+    record = state.get(stage.name)
+    if not record:
+        return 'never run'
+    if record.get('fingerprint') != fingerprint(stage, opts, state):
+        return 'inputs changed'
+    if not all(path.exists() for path in stage.outputs(opts)):
+        return 'outputs missing'
+    if stage.max_age and (now or time.time()) - record.get('finished', 0) > stage.max_age:
+        return f"older than {stage.max_age / 3600:.0f}h"
+    return None
+
+
+def closure(targets):
+    """Targets plus every stage they depend on, in DAG order."""
+    selected = set()
+
+    def visit(name):
+        if name not in selected:
+            selected.add(name)
+            for dep in STAGES[name].deps:
+                visit(dep)
+
+    for target in targets:
+        visit(target)
+    return [name for name in STAGES if name in selected]
+
+
+# --- Running ---
+
+def run_stage(stage, opts, log_dir):
+    """Run one stage as a subprocess; returns (returncode, seconds, log path)."""
+    if stage.clean:
+        for path in stage.outputs(opts):
+            Path(path).unlink(missing_ok=True)
+    log_dir.mkdir(parents=True, exist_ok=True)
+    log_path = log_dir / f"{stage.name}.log"
+    command = [sys.executable, str(SCRIPTS_DIR / stage.script), *stage.args(opts)]
+    start = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        log.write('$ ' + ' '.join(command) + '\n\n')
+        log.flush()
+        env = dict(os.environ, PYTHONUNBUFFERED='1', PYTHONIOENCODING='utf-8')
+        code = subprocess.run(command, cwd=stage.cwd, stdout=log, stderr=subprocess.STDOUT, env=env).returncode
+    return code, time.perf_counter() - start, log_path
+
+
+def _tail(path, lines=15):
+    with open(path, encoding='utf-8', errors='replace') as f:
+        return ''.join(f.readlines()[-lines:])
+
+
+def run(targets, opts, state_path, force=(), jobs=2, dry_run=False):
+    """Bring ``targets`` up to date; returns {stage: 'ran' | 'skipped' | 'failed' | 'blocked'}."""
+    state = load_state(state_path)
+    pending = closure(targets)
+    results = {}
+    running = {}
+
+    def ready(name):
+        return all(results.get(dep) in ('ran', 'skipped') for dep in STAGES[name].deps)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name in list(pending):
+                deps = STAGES[name].deps
+                if any(results.get(dep) in ('failed', 'blocked') for dep in deps):
+                    pending.remove(name)
+                    results[name] = 'blocked'
+                    print(f"[!] {name}: skipped, {', '.join(d for d in deps if results[d] != 'ran')} failed")
+                    continue
+                if not ready(name):
+                    continue
+                pending.remove(name)
+                stage = STAGES[name]
+                reason = 'forced' if name in force else None
+                if dry_run and any(results.get(dep) == 'ran' for dep in deps):
+                    reason = reason or 'upstream changes'
+                reason = reason or stale_reason(stage, opts, state)
+                if reason is None:
+                    results[name] = 'skipped'
+                    print(f"[=] {name}: up to date")
+                    continue
+                if dry_run:
+                    results[name] = 'ran'
+                    print(f"[>] {name}: would run ({reason})")
+                    continue
+                print(f"[>] {name}: running ({reason}), log: {os.path.relpath(STATE_DIR / 'logs' / f'{name}.log')}",
+                      flush=True)
+                future = pool.submit(run_stage, stage, opts, STATE_DIR / 'logs')
+                running[future] = (name, fingerprint(stage, opts, state))
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, used = running.pop(future)
+                stage = STAGES[name]
+                code, seconds, log_path = future.result()
+                if code != 0:
+                    results[name] = 'failed'
+                    print(f"[✗] {name}: exit {code} after {seconds:.1f}s\n{_tail(log_path)}")
+                    continue
+                results[name] = 'ran'
+                state[name] = {
+                    'fingerprint': used,
+                    'output': stage.digest(opts) if stage.digest else _sha(
+                        [_stat_entries(path) for path in stage.outputs(opts)]),
+                    'finished': time.time(),
+                    'seconds': round(seconds, 2),
+                }
+                save_state(state, state_path)
+                print(f"[OK] {name}: done in {seconds:.1f}s")
+    return results
+
+
+def print_status(opts, state_path):
+    state = load_state(state_path)
+    now = time.time()
+    for name, stage in STAGES.items():
+        record = state.get(name, {})
+        reason = stale_reason(stage, opts, state, now)
+        when = (f"last run {(now - record['finished']) / 3600:.1f}h ago in {record['seconds']}s"
+                if record else '')
+        print(f"{name:<8} {'up to date' if reason is None else reason:<18} {when}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the JNE data pipeline incrementally.")
+    parser.add_argument('targets', nargs='*', metavar='STAGE',
+                        help=f"Stages to bring up to date, with their dependencies (default: all of {', '.join(STAGES)})")
+    parser.add_argument('--force', action='store_true', help="Run the named targets even if they are up to date")
+    parser.add_argument('--dry-run', action='store_true', help="Only show what would run")
+    parser.add_argument('--status', action='store_true', help="Show each stage's state and exit")
+    parser.add_argument('-j', '--jobs', type=int, default=3, help="Stages run in parallel (default: %(default)s)")
+    parser.add_argument('--candidates', default=None,
+                        help="NDJSON from jne_discovery.py (default: built-in presidential list)")
+    parser.add_argument('--output', default=str(DEFAULT_OUTPUT),
+                        help="Basename of the extract/export files (default: %(default)s)")
+    parser.add_argument('--formats', nargs='+', choices=('csv', 'xlsx', 'parquet'), default=['csv', 'xlsx'],
+                        help="Export formats (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=8, help="Fetch workers (default: %(default)s)")
+    parser.add_argument('--rate', type=float, default=4.0, help="Max requests per second to the JNE (default: %(default)s)")
+    parser.add_argument('--state', default=str(STATE_DIR / 'state.json'), help="State file (default: %(default)s)")
+    args = parser.parse_args(argv)
+    unknown = [t for t in args.targets if t not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+
+    if args.candidates:
+        args.candidates = str(Path(args.candidates).resolve())
+    args.output = str(Path(args.output).resolve())
+    state_path = Path(args.state)
+    if args.status:
+        return print_status(args, state_path)
+
+    targets = args.targets or list(STAGES)
+    start = time.perf_counter()
+    results = run(targets, args, state_path, force=set(targets) if args.force else (),
+                  jobs=args.jobs, dry_run=args.dry_run)
+    ran = [name for name, result in results.items() if result == 'ran']
+    failed = [name for name, result in results.items() if result in ('failed', 'blocked')]
+    print(f"\n[OK] {len(ran)} {'would run' if args.dry_run else 'ran'}, "
+          f"{len(results) - len(ran) - len(failed)} up to date, "
+          f"{len(failed)} failed in {time.perf_counter() - start:.1f}s")
+    if failed:
+        sys.exit(1)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+"""Compact candidate search index built from extract_JNE.py output.
+
+CandidatePicker and the compare views scan every candidate on each
+keystroke. This builds, once per extraction, an index the frontend can
+query by lookup instead:
+
+  * text: names, party, lugar_nacimiento, universities and previous
+    elected offices, accent-folded and lower-cased ("Peñalosa" and
+    "PENALOSA" both become "penalosa"). Every word is indexed under its
+    one- and two-letter prefixes (``^p``, ``^pe``) and its trigrams
+    (``pen``, ``ena``, ...). A query word of one or two letters reads one
+    prefix list; a longer word intersects its trigram lists. Postings are
+    ``doc * 8 + field`` so a hit also says where it matched (0 name,
+    1 party, 2 birthplace, 3 university, 4 previous office). Positions are
+    not stored, so the trigrams of a long query word may be found in
+    different words of one field: matches are a (rarely larger) superset
+    of the exact ones, which a client can confirm against the doc.
+  * facets: one int32 array per numeric column (income, property counts,
+    sentence counts), aligned with the doc list, plus the doc order sorted
+    by that value so a range filter is two binary searches.
+
+Binary layout (``.bin``, little-endian):
+
+    b'CSIX' u16 version u16 0 u32 header_bytes
+    header (UTF-8 JSON, padded to 4 bytes):
+        {"docs": [[id, name, party, candidatura], ...], "fields": [...],
+         "grams": [...sorted...], "postings": {"offset": o, "bytes": n},
+         "offsets": {"offset": o, "count": len(grams) + 1},
+         "facets": {name: {"values": o, "order": o, "orderType": "u16" | "u32"}}}
+    body, 4-byte aligned sections at the header's offsets (relative to
+    the body start): gram offsets (u32), postings as delta-encoded LEB128
+    varints, then per facet int32 values and u16/u32 sorted order
+
+``--format json`` writes the same content as plain JSON (postings as
+delta lists) for debugging or for clients without a binary decoder.
+
+Usage:
+    python search_index.py build candidatos_jne.ndjson
+    python search_index.py query "san marcos" --where "ingreso_total>=100000" --where "num_sentencias_penales=0"
+"""
+import argparse
+import bisect
+import json
+import os
+import re
+import struct
+import sys
+import time
+import unicodedata
+from array import array
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_SOURCE = Path(__file__).resolve().parent / 'candidatos_jne.ndjson'
+DEFAULT_OUTPUT = ROOT / 'public' / 'data' / 'search-index.bin'
+
+MAGIC = b'CSIX'
+VERSION = 1
+FIELDS = ('name', 'party', 'birthplace', 'university', 'office')
+FACETS = ('ingreso_total', 'num_bienes_inmuebles', 'num_vehiculos',
+          'num_sentencias_penales', 'num_sentencias_civiles')
+MISSING = -1  # facet value for candidates without data
+STOPWORDS = frozenset({'a', 'al', 'de', 'del', 'e', 'el', 'en', 'la', 'las', 'los', 'por', 'y'})
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def fold(text):
+    """Lower-case, accent-free, punctuation-free version of ``text``."""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return _NON_WORD.sub(' ', text).strip()
+
+
+def words(text):
+    return [w for w in fold(text).split() if w not in STOPWORDS]
+
+
+def grams(word):
+    """Index keys for one folded word: 1-2 letter prefixes and trigrams."""
+    keys = {'^' + word[:1], '^' + word[:2]}
+    keys.update(word[i:i + 3] for i in range(len(word) - 2))
+    return keys
+
+
+def query_grams(word):
+    """Keys whose postings all contain any field with a word matching ``word``."""
+    return ['^' + word] if len(word) < 3 else [word[i:i + 3] for i in range(len(word) - 2)]
+
+
+def _field_texts(row):
+    """Searchable text per field (FIELDS order) for one extract_JNE.py row."""
+    name = ' '.join(filter(None, (row.get('Persona'), row.get('nombres'),
+                                  row.get('apellido_paterno'), row.get('apellido_materno'))))
+    universities = row.get('educacion_universitaria') or ''
+    # "UNIVERSIDAD X - CARRERA (Concluido) | ..." -> institution and degree, without the status
+    universities = re.sub(r'\((?:Concluido|En curso)\)', ' ', universities)
+    place = row.get('lugar_nacimiento') or ''
+    return (name, row.get('Partido') or '', place.replace(' - ', ' '), universities,
+            row.get('cargos_eleccion_previos') or '')
+
+
+def _facet_value(row, column):
+    value = row.get(column)
+    if value in (None, ''):
+        return MISSING
+    return int(round(float(value)))
+
+
+def _doc_id(row, slug_for):
+    return slug_for({'id': str(row.get('ID_HojaVida') or ''), 'persona': row.get('Persona') or '', 'api': ''})
+
+
+def load_rows(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build(rows):
+    """Index dict (docs, postings {gram: [doc * 8 + field, ...]}, facets) for extract_JNE rows."""
+    from generate_domains import slug_for  # doc ids are the frontend candidate ids
+
+    docs, postings = [], {}
+    facets = {column: [] for column in FACETS}
+    seen = set()
+    for row in rows:
+        key = row.get('ID_HojaVida') or row.get('Persona')
+        if key in seen:
+            continue
+        seen.add(key)
+        doc = len(docs)
+        docs.append([_doc_id(row, slug_for), row.get('Persona') or '', row.get('Partido') or '', row.get('Candidatura') or ''])
+        for field, text in enumerate(_field_texts(row)):
+            entry = doc * 8 + field
+            for gram in {gram for word in words(text) for gram in grams(word)}:
+                postings.setdefault(gram, []).append(entry)
+        for column in FACETS:
+            facets[column].append(_facet_value(row, column))
+    for entries in postings.values():
+        entries.sort()
+    return {'docs': docs, 'fields': list(FIELDS), 'postings': dict(sorted(postings.items())), 'facets': facets}
+
+
+def _delta(entries):
+    previous = 0
+    for entry in entries:
+        yield entry - previous
+        previous = entry
+
+
+def _varints(values, out):
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+
+def _order(values):
+    return sorted(range(len(values)), key=values.__getitem__)
+
+
+def encode_binary(index):
+    grams_list = list(index['postings'])
+    postings = bytearray()
+    offsets = array('I', [0])
+    for key in grams_list:
+        _varints(_delta(index['postings'][key]), postings)
+        offsets.append(len(postings))
+    order_type = 'H' if len(index['docs']) <= 0xFFFF else 'I'
+
+    sections = [offsets.tobytes(), bytes(postings)]
+    facet_meta = {}
+    for column, values in index['facets'].items():
+        facet_meta[column] = {'values': len(sections), 'order': len(sections) + 1,
+                              'orderType': 'u16' if order_type == 'H' else 'u32'}
+        sections += [array('i', values).tobytes(), array(order_type, _order(values)).tobytes()]
+
+    body, positions = bytearray(), []
+    for section in sections:
+        body += b'\0' * (-len(body) % 4)
+        positions.append(len(body))
+        body += section
+
+    header = json.dumps({
+        'docs': index['docs'], 'fields': index['fields'], 'grams': grams_list,
+        'offsets': {'offset': positions[0], 'count': len(offsets)},
+        'postings': {'offset': positions[1], 'bytes': len(postings)},
+        'facets': {column: {'values': positions[meta['values']], 'order': positions[meta['order']],
+                            'orderType': meta['orderType']} for column, meta in facet_meta.items()},
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    header += b' ' * (-len(header) % 4)
+    return MAGIC + struct.pack('<HHI', VERSION, 0, len(header)) + header + bytes(body)
+
+
+def encode_json(index):
+    return json.dumps({
+        'version': VERSION, 'docs': index['docs'], 'fields': index['fields'],
+        'postings': {key: list(_delta(entries)) for key, entries in index['postings'].items()},
+        'facets': {column: {'values': values, 'order': _order(values)} for column, values in index['facets'].items()},
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def write_index(index, path, fmt=None):
+    path = Path(path)
+    fmt = fmt or ('json' if path.suffix == '.json' else 'bin')
+    data = encode_json(index) if fmt == 'json' else encode_binary(index)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return len(data)
+
+
+class SearchIndex:
+    """Reader for either format; also the reference for the frontend's query logic."""
+
+    def __init__(self, docs, fields, postings, facets, orders):
+        self.docs = docs
+        self.fields = fields
+        self.postings = postings  # gram -> decoder returning [doc * 8 + field]
+        self.facets = facets      # column -> values by doc
+        self.orders = orders      # column -> docs sorted by value
+
+    @classmethod
+    def load(cls, path):
+        data = Path(path).read_bytes()
+        if data[:4] != MAGIC:
+            index = json.loads(data)
+            postings = {key: _undelta(deltas) for key, deltas in index['postings'].items()}
+            return cls(index['docs'], index['fields'], postings,
+                       {c: f['values'] for c, f in index['facets'].items()},
+                       {c: f['order'] for c, f in index['facets'].items()})
+
+        version, _, header_bytes = struct.unpack_from('<HHI', data, 4)
+        if version != VERSION:
+            raise ValueError(f"Unsupported search index version {version}")
+        header = json.loads(data[12:12 + header_bytes])
+        body = 12 + header_bytes
+        start, count = body + header['offsets']['offset'], header['offsets']['count']
+        offsets = array('I', data[start:start + 4 * count])
+        base = body + header['postings']['offset']
+        postings = {key: (base + offsets[i], base + offsets[i + 1]) for i, key in enumerate(header['grams'])}
+        n = len(header['docs'])
+        facets, orders = {}, {}
+        for column, meta in header['facets'].items():
+            start = body + meta['values']
+            facets[column] = array('i', data[start:start + 4 * n])
+            width = 2 if meta['orderType'] == 'u16' else 4
+            start = body + meta['order']
+            orders[column] = array('H' if width == 2 else 'I', data[start:start + width * n])
+        index = cls(header['docs'], header['fields'], postings, facets, orders)
+        index._data = data
+        return index
+
+    def _size(self, key):
+        span = self.postings[key]
+        return len(span) if isinstance(span, list) else span[1] - span[0]
+
+    def _entries(self, key):
+        span = self.postings.get(key)
+        if span is None:
+            return []
+        if isinstance(span, list):
+            return span
+        return _undelta(_read_varints(self._data, *span))
+
+    def match(self, word):
+        """{doc: best (lowest) field} for docs with a field holding every gram of ``word``.
+
+        Postings are per field, not per word: for a word of four or more
+        letters the trigrams may come from different words of the same
+        field ("torres" matches "torre de mares"), so this is a superset of the
+        exact substring matches. Prefix queries are exact.
+        """
+        keys = query_grams(word)
+        if any(key not in self.postings for key in keys):
+            return {}
+        entries = None
+        for key in sorted(keys, key=self._size):  # rarest list first keeps the working set small
+            hits = self._entries(key)
+            entries = set(hits) if entries is None else entries.intersection(hits)
+            if not entries:
+                return {}
+        result = {}
+        for entry in sorted(entries, reverse=True):
+            result[entry >> 3] = entry & 7
+        return result
+
+    def facet_range(self, column, low=None, high=None):
+        """Docs whose ``column`` value is within [low, high] (MISSING excluded)."""
+        values, order = self.facets[column], self.orders[column]
+        low = MISSING + 1 if low is None else max(low, MISSING + 1)
+        start = bisect.bisect_left(order, low, key=values.__getitem__)
+        end = len(order) if high is None else bisect.bisect_right(order, high, lo=start, key=values.__getitem__)
+        return set(order[start:end])
+
+    def search(self, query='', where=(), limit=20):
+        """[(doc, best field)] for every query word (AND) and facet range, names first."""
+        matches = None
+        for word in words(query):
+            hits = self.match(word)
+            matches = hits if matches is None else {d: max(f, hits[d]) for d, f in matches.items() if d in hits}
+        if matches is None:
+            matches = {doc: len(self.fields) for doc in range(len(self.docs))}
+        for column, low, high in where:
+            allowed = self.facet_range(column, low, high)
+            matches = {d: f for d, f in matches.items() if d in allowed}
+        return sorted(matches.items(), key=lambda item: (item[1], self.docs[item[0]][1]))[:limit]
+
+
+def _read_varints(data, start, end):
+    values, value, shift = [], 0, 0
+    for byte in data[start:end]:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value, shift = 0, 0
+    return values
+
+
+def _undelta(deltas):
+    total, out = 0, []
+    for delta in deltas:
+        total += delta
+        out.append(total)
+    return out
+
+
+_WHERE = re.compile(r'^(\w+)\s*(>=|<=|=)\s*(-?\d+(?:\.\d+)?)$')
+
+
+def parse_where(text):
+    match = _WHERE.match(text.strip())
+    if not match or match.group(1) not in FACETS:
+        raise argparse.ArgumentTypeError(f"expected <facet>(>=|<=|=)<number> with a facet in {', '.join(FACETS)}")
+    column, op, value = match.group(1), match.group(2), int(round(float(match.group(3))))
+    return column, (value if op in ('>=', '=') else None), (value if op in ('<=', '=') else None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the compact candidate search index.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_cmd = commands.add_parser('build', help="Build the index from extract_JNE.py NDJSON")
+    build_cmd.add_argument('source', nargs='?', default=str(DEFAULT_SOURCE), help="NDJSON rows (default: %(default)s)")
+    build_cmd.add_argument('--output', default=str(DEFAULT_OUTPUT), help="Index file (default: %(default)s)")
+    build_cmd.add_argument('--format', choices=('bin', 'json'), default=None,
+                           help="Asset format (default: from the output extension, .json or binary)")
+
+    query = commands.add_parser('query', help="Search an index (reference implementation)")
+    query.add_argument('text', nargs='?', default='')
+    query.add_argument('--index', default=str(DEFAULT_OUTPUT), help="Index file (default: %(default)s)")
+    query.add_argument('--where', type=parse_where, action='append', default=[],
+                       help="Facet filter such as ingreso_total>=100000 (repeatable)")
+    query.add_argument('--limit', type=int, default=20, help="Max results (default: %(default)s)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'query':
+        index = SearchIndex.load(args.index)
+        start = time.perf_counter()
+        results = index.search(args.text, args.where, args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        for doc, field in results:
+            doc_id, name, party, position = index.docs[doc]
+            where = index.fields[field] if field < len(index.fields) else '-'
+            print(f"{doc_id:<28} {name:<30} {party[:30]:<30} {position:<20} ({where})")
+        print(f"{len(results)} results in {elapsed:.2f} ms", file=sys.stderr)
+        return results
+
+    start = time.perf_counter()
+    index = build(load_rows(args.source))
+    size = write_index(index, args.output, args.format)
+    print(f"[OK] {len(index['docs'])} candidates, {len(index['postings'])} keys, "
+          f"{sum(map(len, index['postings'].values()))} postings")
+    print(f"[OK] Search index saved to {args.output} ({size / 1024:.1f} KB) in {time.perf_counter() - start:.1f}s")
+    return index
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Compact per-vote JSON blobs into day-partitioned, indexed segment files.
+
+BlobStorageAdapter.saveVote() writes one tiny object per vote
+(sessions/<sessionId>/votes/<timestamp>-<suffix>.json), so reading a
+history is a list plus one fetch per vote. This tool streams those records
+from a local copy of the blob store into one segment per UTC day:
+
+    <log-dir>/manifest.json             segments, per-session watermarks
+    <log-dir>/<YYYYMMDD>-<n>.npy        fixed 16-byte records, sorted by
+                                        (session, timestamp, blob key)
+    <log-dir>/<YYYYMMDD>-<n>.json       {"candidates": [...], "sessions": {id: [offset, count]}}
+
+A rewritten day gets a new version <n>; the manifest, replaced atomically
+together with the watermarks, is the only pointer to the current files, so
+a crash mid-compaction leaves the previous state intact and never stores a
+vote twice. Superseded and orphaned segment files are deleted afterwards.
+
+Records are (timestamp, session, winner, loser) with the candidate and
+session ids dictionary-encoded against the segment's own index, so a
+segment is self-contained and memory-mapped on read. Pulling one session
+is a dict lookup and an array slice per segment; scanning everything is
+one sequential read per day.
+
+Runs are incremental: per session, the manifest keeps a watermark (the
+newest compacted blob key) and the keys compacted within WINDOW_MS behind
+it. Blobs in that window that were not compacted yet, i.e. late writes or
+same-millisecond keys with a smaller random suffix, are still picked up;
+only the days new votes fall on are rewritten.
+
+    python vote_compactor.py compact blob-export/ --log-dir vote-log/
+    python vote_compactor.py history vote-log/ <sessionId>
+    python vote_compactor.py stats vote-log/
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+RECORD = np.dtype([('timestamp', '<i8'), ('session', '<u4'), ('winner', '<u2'), ('loser', '<u2')])
+MANIFEST_NAME = 'manifest.json'
+WINDOW_MS = 10 * 60 * 1000  # how late a blob may land behind the watermark and still be compacted
+
+
+def day_of(timestamp_ms):
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).strftime('%Y%m%d')
+
+
+def _write_json(path, data):
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def key_time(key):
+    """Timestamp (ms) a <timestamp>-<suffix>.json blob key starts with, 0 if it has none."""
+    head = key.split('-', 1)[0]
+    return int(head) if head.isdigit() else 0
+
+
+def _watermark(entry):
+    """(key, compacted keys in the window) of a manifest watermark; old manifests hold the key only."""
+    if isinstance(entry, dict):
+        return entry['key'], set(entry['recent'])
+    return entry or '', None
+
+
+def iter_blob_votes(blob_dir, watermarks=None):
+    """Yield (sessionId, blob key, vote dict) for blobs not compacted yet per each session's watermark."""
+    watermarks = watermarks or {}
+    sessions_dir = Path(blob_dir) / 'sessions'
+    with os.scandir(sessions_dir) as sessions:
+        for session in sessions:
+            votes_path = os.path.join(session.path, 'votes')
+            if not session.is_dir() or not os.path.isdir(votes_path):
+                continue
+            after, recent = _watermark(watermarks.get(session.name))
+            cutoff = key_time(after) - WINDOW_MS
+            for name in sorted(os.listdir(votes_path)):
+                if not name.endswith('.json'):
+                    continue
+                if name <= after and (recent is None or name in recent or key_time(name) < cutoff):
+                    continue
+                try:
+                    with open(os.path.join(votes_path, name), encoding='utf-8') as f:
+                        vote = json.load(f)
+                    vote = {'winnerId': str(vote['winnerId']), 'loserId': str(vote['loserId']),
+                            'timestamp': int(vote['timestamp'])}
+                except (ValueError, KeyError, TypeError):
+                    continue
+                yield session.name, name, vote
+
+
+class Segment:
+    """One day of votes: a memory-mapped record array plus its index."""
+
+    def __init__(self, root, day, name=None):
+        self.day = day
+        name = name or day
+        self.records = np.load(Path(root) / f"{name}.npy", mmap_mode='r')
+        with open(Path(root) / f"{name}.json", encoding='utf-8') as f:
+            index = json.load(f)
+        self.candidates = index['candidates']
+        self.session_ids = list(index['sessions'])
+        self.sessions = index['sessions']
+
+    def history(self, session_id):
+        span = self.sessions.get(session_id)
+        if not span:
+            return self.records[:0]
+        offset, count = span
+        return self.records[offset:offset + count]
+
+    def decode(self, records):
+        return [{'winnerId': self.candidates[r['winner']], 'loserId': self.candidates[r['loser']],
+                 'timestamp': int(r['timestamp'])} for r in records]
+
+    def votes(self):
+        """Every vote of the day as (sessionId, VoteRecord), in (session, time) order."""
+        for session_id, (offset, count) in self.sessions.items():
+            for vote in self.decode(self.records[offset:offset + count]):
+                yield session_id, vote
+
+
+def write_segment(root, name, votes):
+    """Write segment files ``<name>.npy/.json`` from [(sessionId, blob key, vote)]; returns the row count."""
+    votes.sort(key=lambda v: (v[0], v[2]['timestamp'], v[1]))
+    candidates, sessions = {}, {}
+    records = np.empty(len(votes), dtype=RECORD)
+    for row, (session_id, _, vote) in enumerate(votes):
+        span = sessions.setdefault(session_id, [row, 0])
+        span[1] += 1
+        records[row] = (vote['timestamp'], len(sessions) - 1,
+                        candidates.setdefault(vote['winnerId'], len(candidates)),
+                        candidates.setdefault(vote['loserId'], len(candidates)))
+    if len(candidates) > np.iinfo(RECORD['winner']).max:
+        raise ValueError(f"{name}: {len(candidates)} candidate ids do not fit the segment dictionary")
+    root = Path(root)
+    tmp = root / f"{name}.npy.tmp"
+    with open(tmp, 'wb') as f:
+        np.save(f, records)
+    os.replace(tmp, root / f"{name}.npy")
+    _write_json(root / f"{name}.json", {'candidates': list(candidates), 'sessions': sessions})
+    return len(records)
+
+
+class VoteLog:
+    """Reader (and incremental writer) for a compacted vote log directory."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        try:
+            with open(self.root / MANIFEST_NAME, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {'segments': {}, 'watermarks': {}}
+        self._segments = {}
+
+    @staticmethod
+    def exists(root):
+        return (Path(root) / MANIFEST_NAME).exists()
+
+    def days(self):
+        return sorted(self.manifest['segments'])
+
+    def segment(self, day):
+        if day not in self._segments:
+            self._segments[day] = Segment(self.root, day, self.manifest['segments'][day].get('file'))
+        return self._segments[day]
+
+    def history(self, session_id):
+        """One session's votes, sorted like BlobStorageAdapter.getVotes()."""
+        votes = []
+        for day in self.days():
+            segment = self.segment(day)
+            votes.extend(segment.decode(segment.history(session_id)))
+        return votes
+
+    def sessions(self):
+        """{sessionId: [VoteRecord, ...]} for every session, in timestamp order."""
+        sessions = {}
+        for day in self.days():
+            for session_id, vote in self.segment(day).votes():
+                sessions.setdefault(session_id, []).append(vote)
+        return sessions
+
+    def _sweep(self):
+        """Delete segment files the manifest no longer points at (superseded or from a crashed run)."""
+        live = {entry.get('file', day) for day, entry in self.manifest['segments'].items()}
+        for path in self.root.iterdir():
+            if path.suffix in ('.npy', '.json', '.tmp') and path.name != MANIFEST_NAME \
+                    and path.name.split('.', 1)[0] not in live:
+                path.unlink(missing_ok=True)
+
+    def scan(self):
+        """Yield (day, records, candidates, session ids) per segment for vectorized consumers."""
+        for day in self.days():
+            segment = self.segment(day)
+            yield day, segment.records, segment.candidates, segment.session_ids
+
+    def compact(self, blob_dir, delete_sources=False):
+        """Fold new blobs from ``blob_dir`` into the log; returns stats."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        watermarks = self.manifest['watermarks']
+        new = {}
+        sources = []
+        compacted = {}
+        for session_id, key, vote in iter_blob_votes(blob_dir, watermarks):
+            new.setdefault(day_of(vote['timestamp']), []).append((session_id, key, vote))
+            compacted.setdefault(session_id, []).append(key)
+            sources.append(Path(blob_dir) / 'sessions' / session_id / 'votes' / key)
+        for session_id, keys in compacted.items():
+            after, recent = _watermark(watermarks.get(session_id))
+            latest = max([after, *keys])
+            cutoff = key_time(latest) - WINDOW_MS
+            window = {key for key in (recent or set()) | set(keys) if key_time(key) >= cutoff}
+            watermarks[session_id] = {'key': latest, 'recent': sorted(window)}
+
+        rows = 0
+        for day, votes in sorted(new.items()):
+            entry = self.manifest['segments'].get(day)
+            if entry:
+                # Merge with what the day already holds (blob keys are not kept; order is stable)
+                old = self.segment(day)
+                votes = [(sid, '', vote) for sid, vote in old.votes()] + votes
+                self._segments.pop(day)
+            version = (entry or {}).get('version', 0) + 1
+            name = f"{day}-{version}"
+            count = write_segment(self.root, name, votes)
+            self.manifest['segments'][day] = {'votes': count, 'version': version, 'file': name}
+            rows += len(new[day])
+
+        self.manifest['updatedAt'] = int(time.time() * 1000)
+        _write_json(self.root / MANIFEST_NAME, self.manifest)
+        self._sweep()
+
+        if delete_sources:
+            for path in sources:
+                path.unlink(missing_ok=True)
+        return {'votes': rows, 'days': sorted(new), 'sessions': len({v[0] for d in new.values() for v in d})}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compact per-vote blobs into indexed day segments.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    compact = commands.add_parser('compact', help="Fold new vote blobs into the log")
+    compact.add_argument('blob_dir', help="Local copy of the blob store (containing sessions/<id>/votes/)")
+    compact.add_argument('--log-dir', default='vote-log', help="Compacted log directory (default: %(default)s)")
+    compact.add_argument('--delete-sources', action='store_true',
+                         help="Delete the blobs once they are in a segment")
+
+    history = commands.add_parser('history', help="Print one session's votes as JSON")
+    history.add_argument('log_dir')
+    history.add_argument('session_id')
+
+    stats = commands.add_parser('stats', help="Segments and vote counts")
+    stats.add_argument('log_dir')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'history':
+        start = time.perf_counter()
+        votes = VoteLog(args.log_dir).history(args.session_id)
+        print(json.dumps(votes, ensure_ascii=False, indent=1))
+        print(f"{len(votes)} votes in {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+        return votes
+
+    if args.command == 'stats':
+        log = VoteLog(args.log_dir)
+        total = 0
+        for day in log.days():
+            segment = log.segment(day)
+            total += len(segment.records)
+            print(f"{day}: {len(segment.records):8d} votes  {len(segment.sessions):6d} sessions  "
+                  f"{len(segment.candidates):4d} candidates")
+        print(f"Total: {total} votes in {len(log.days())} segments")
+        return
+
+    start = time.perf_counter()
+    result = VoteLog(args.log_dir).compact(args.blob_dir, args.delete_sources)
+    print(f"[OK] {result['votes']} new votes from {result['sessions']} sessions "
+          f"into {len(result['days'])} day segments ({time.perf_counter() - start:.1f}s)")
+    return result
+
+
+if __name__ == "__main__":
+    main()